@@ -0,0 +1,331 @@
+# name file: ai_modules/bulk_enroll.py
+"""
+Enroll many employees at once from a folder or a ZIP archive.
+
+Layout: one folder of photos per employee plus a CSV manifest at the root
+    dataset/
+        manifest.csv      columns: folder,name,code,email,department
+        E1001/front.jpg
+        E1001/side.jpg
+        E1002/...
+The folder column is optional and defaults to the employee code.
+
+Usage (from the project root):
+    python -m ai_modules.bulk_enroll dataset/ --report report.csv
+    python -m ai_modules.bulk_enroll dataset.zip --workers 4 --dry-run
+"""
+import argparse
+import csv
+import io
+import os
+import posixpath
+import sys
+import time
+import zipfile
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+# Add project path for database modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database_modules.employee_crud import add_employees_bulk, get_existing_employee_codes, enrollment_lock
+from ai_modules.face_gallery import FaceGallery, DEFAULT_TOLERANCE
+from ai_modules.enrollment import ENROLL_WORKERS, encode_photo, combine_encodings
+from ai_modules.shared_gallery import get_shared_gallery
+
+MANIFEST_NAME = "manifest.csv"
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+REPORT_FIELDS = ["folder", "name", "code", "status", "employee_id", "images", "faces_used", "reason"]
+
+
+class EnrollmentSource:
+    """
+    A dataset folder or ZIP archive.
+    Only the path is pickled, so worker processes open the archive themselves
+    and read their own photos (no image bytes go through the pool).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.is_zip = os.path.isfile(path) and zipfile.is_zipfile(path)
+        if not self.is_zip and not os.path.isdir(path):
+            raise ValueError(f"Not a folder or ZIP archive: '{path}'")
+        self._zip = None
+        self.root = self._find_root() if self.is_zip else ""
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['_zip'] = None
+        return state
+
+    def _archive(self):
+        if self._zip is None:
+            self._zip = zipfile.ZipFile(self.path)
+        return self._zip
+
+    def _find_root(self):
+        """Archives made with "compress folder" wrap everything in one top-level folder"""
+        manifests = [name for name in self._archive().namelist()
+                     if posixpath.basename(name).lower() == MANIFEST_NAME]
+        if not manifests:
+            return ""
+        root = posixpath.dirname(min(manifests, key=len))
+        return root + "/" if root else ""
+
+    def has_manifest(self):
+        if self.is_zip:
+            return (self.root + MANIFEST_NAME) in self._archive().namelist()
+        return os.path.isfile(os.path.join(self.path, MANIFEST_NAME))
+
+    def read(self, relative_path):
+        if self.is_zip:
+            return self._archive().read(self.root + relative_path)
+        with open(os.path.join(self.path, relative_path), "rb") as f:
+            return f.read()
+
+    def image_index(self):
+        """{folder: [relative photo paths]} for every employee folder, in one pass"""
+        index = {}
+        if self.is_zip:
+            for name in self._archive().namelist():
+                if not name.startswith(self.root) or name.endswith("/"):
+                    continue
+                parts = name[len(self.root):].split("/")
+                if len(parts) == 2 and parts[1].lower().endswith(IMAGE_EXTENSIONS):
+                    index.setdefault(parts[0], []).append("/".join(parts))
+        else:
+            for entry in os.scandir(self.path):
+                if entry.is_dir():
+                    index[entry.name] = [
+                        f"{entry.name}/{name}" for name in os.listdir(entry.path)
+                        if name.lower().endswith(IMAGE_EXTENSIONS)
+                    ]
+
+        for photos in index.values():
+            photos.sort()
+        return index
+
+
+def read_manifest(source, manifest_path=None):
+    """Manifest rows as dicts (folder, name, code, email, department)"""
+    if manifest_path:
+        with open(manifest_path, "rb") as f:
+            data = f.read()
+    elif source.has_manifest():
+        data = source.read(MANIFEST_NAME)
+    else:
+        raise ValueError(f"No {MANIFEST_NAME} found in '{source.path}'")
+
+    # utf-8-sig: manifests saved from Excel start with a BOM
+    reader = csv.DictReader(io.StringIO(data.decode("utf-8-sig")))
+    people = []
+    for row in reader:
+        row = {(key or "").strip().lower(): (value or "").strip() for key, value in row.items()}
+        people.append({
+            "folder": row.get("folder") or row.get("code", ""),
+            "name": row.get("name", ""),
+            "code": row.get("code", ""),
+            "email": row.get("email", ""),
+            "department": row.get("department") or "General",
+        })
+    return people
+
+
+def encode_person(source, photos):
+    """
+    Worker-process stage: one encoding from a person's photos.
+    Photos without exactly one usable face (size, blur, pose) are skipped
+    and outliers are left out of the average.
+    Returns (encoding or None, photos used, notes).
+    """
+    encodings = []
+    notes = []
+
+    for photo in photos:
+        try:
+            encoding, reason = encode_photo(source.read(photo))
+        except Exception as e:
+            encoding, reason = None, str(e)
+
+        if encoding is None:
+            notes.append(f"{posixpath.basename(photo)}: {reason}")
+        else:
+            encodings.append(encoding)
+
+    encoding, outliers = combine_encodings(encodings)
+    if outliers:
+        notes.append(f"{outliers} photo(s) did not match the others")
+    if encoding is None:
+        return None, 0, notes
+    return encoding.astype(np.float32), len(encodings) - outliers, notes
+
+
+def _fail(entry, status, reason):
+    entry['status'] = status
+    entry['reason'] = reason
+
+
+def _check_and_insert(report, encodings, tolerance, dry_run):
+    """Batch duplicate check (exact search) and bulk insert of the accepted entries"""
+    # 3. Batch duplicate check
+    accepted = [entry for entry in report if entry['status'] == "pending"]
+    if accepted:
+        matrix = np.stack([encodings[id(entry)] for entry in accepted])
+
+        # Against everyone already enrolled: one exact search for the whole batch
+        # (the approximate index could miss a real duplicate)
+        known_ids, known_dist = get_shared_gallery().search_ids(matrix, k=1, exact=True)
+        if known_ids.size:
+            for row, entry in enumerate(accepted):
+                if known_ids[row, 0] >= 0 and known_dist[row, 0] <= tolerance:
+                    _fail(entry, "duplicate",
+                          f"face matches employee #{int(known_ids[row, 0])} (distance {known_dist[row, 0]:.3f})")
+
+        # Within the batch: the first occurrence wins
+        batch = FaceGallery(np.arange(len(accepted)), [entry['code'] for entry in accepted], matrix,
+                            index_backend="exact")
+        rows, dist = batch.search_ids(matrix, k=min(3, len(accepted)))
+        for row, entry in enumerate(accepted):
+            for other, distance in zip(rows[row], dist[row]):
+                if 0 <= other < row and distance <= tolerance:
+                    _fail(entry, "duplicate",
+                          f"same face as {accepted[other]['code']} in this batch (distance {distance:.3f})")
+                    break
+
+    # 4. Bulk insert
+    accepted = [entry for entry in report if entry['status'] == "pending"]
+    if dry_run:
+        for entry in accepted:
+            entry['status'] = "ok (dry run)"
+    elif accepted:
+        employees = [dict(entry, encoding=encodings[id(entry)]) for entry in accepted]
+        for entry, (employee_id, error) in zip(accepted, add_employees_bulk(employees)):
+            if employee_id is None:
+                _fail(entry, "failed", error)
+            else:
+                entry['status'] = "added"
+                entry['employee_id'] = employee_id
+
+
+def enroll_from_source(path, manifest_path=None, workers=ENROLL_WORKERS, tolerance=DEFAULT_TOLERANCE,
+                       dry_run=False, progress=None, pool=None):
+    """
+    Enroll every employee of a dataset folder/ZIP.
+    1. manifest checks (missing fields, repeated or existing codes, no photos)
+    2. photos decoded and encoded in a process pool across all cores
+    3. duplicate faces checked in one batch (exact search) against the
+       gallery, and against the other people of the same batch
+    4. accepted employees inserted in bulk
+    progress: optional callback(done, total) during encoding.
+    pool: process pool to encode in (e.g. the web app's shared face pool);
+    by default one with `workers` processes is started for this run.
+    Returns the report: one dict per manifest row (REPORT_FIELDS).
+    """
+    source = EnrollmentSource(path)
+    photos_by_folder = source.image_index()
+
+    report = []
+    for person in read_manifest(source, manifest_path):
+        photos = photos_by_folder.get(person['folder'], [])
+        report.append(dict(person, status="pending", employee_id=None, images=len(photos),
+                           faces_used=0, reason="", _photos=photos))
+
+    # 1. Manifest checks
+    existing_codes = get_existing_employee_codes([entry['code'] for entry in report if entry['code']])
+    seen_codes = set()
+    for entry in report:
+        if not entry['name'] or not entry['code']:
+            _fail(entry, "failed", "missing name or code")
+        elif entry['code'] in seen_codes:
+            _fail(entry, "failed", "code repeated in manifest")
+        elif entry['code'] in existing_codes:
+            _fail(entry, "failed", "employee code already exists")
+        elif not entry['_photos']:
+            _fail(entry, "failed", f"no photos in folder '{entry['folder']}'")
+        seen_codes.add(entry['code'])
+
+    # 2. Encoding (process pool)
+    todo = [entry for entry in report if entry['status'] == "pending"]
+    encodings = {}
+    start = time.perf_counter()
+
+    if todo:
+        own_pool = pool is None
+        if own_pool:
+            pool = ProcessPoolExecutor(max_workers=max(1, workers))
+        try:
+            futures = {pool.submit(encode_person, source, entry['_photos']): entry for entry in todo}
+            for done, future in enumerate(as_completed(futures), 1):
+                entry = futures[future]
+                try:
+                    encoding, used, notes = future.result()
+                except Exception as e:
+                    encoding, used, notes = None, 0, [str(e)]
+
+                entry['faces_used'] = used
+                entry['reason'] = "; ".join(notes)
+                if encoding is None:
+                    _fail(entry, "failed", "no usable face: " + entry['reason'])
+                else:
+                    encodings[id(entry)] = encoding
+
+                if progress:
+                    progress(done, len(todo))
+        finally:
+            if own_pool:
+                pool.shutdown()
+
+    print(f"🔄 Encoded {len(encodings)}/{len(todo)} employees in {time.perf_counter() - start:.1f}s.")
+
+    # 3. + 4. under the enrollment lock: a single enrollment running at the
+    # same time cannot slip the same face in between the check and the insert
+    with enrollment_lock():
+        _check_and_insert(report, encodings, tolerance, dry_run)
+
+    for entry in report:
+        del entry['_photos']
+    return report
+
+
+def summarize(report):
+    """Counts per status, e.g. {'added': 1980, 'duplicate': 12, 'failed': 8}"""
+    return dict(Counter(entry['status'] for entry in report))
+
+
+def write_report(report, f):
+    """Write the per-person report as CSV to an open text file"""
+    writer = csv.DictWriter(f, fieldnames=REPORT_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    writer.writerows(report)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", help="dataset folder or ZIP archive")
+    parser.add_argument("--manifest", help=f"CSV manifest (default: {MANIFEST_NAME} inside the source)")
+    parser.add_argument("--workers", type=int, default=ENROLL_WORKERS)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--report", help="write the per-person report to this CSV file")
+    parser.add_argument("--dry-run", action="store_true", help="encode and check only, insert nothing")
+    args = parser.parse_args()
+
+    def show_progress(done, total):
+        if done == total or done % 50 == 0:
+            print(f"   {done}/{total} encoded")
+
+    report = enroll_from_source(args.source, args.manifest, args.workers, args.tolerance,
+                                args.dry_run, progress=show_progress)
+
+    if args.report:
+        with open(args.report, "w", newline="", encoding="utf-8") as f:
+            write_report(report, f)
+        print(f"📄 Report written to {args.report}")
+    else:
+        for entry in report:
+            if entry['status'] not in ("added", "ok (dry run)"):
+                print(f"❌ {entry['code'] or entry['folder']}: {entry['status']} - {entry['reason']}")
+
+    print(f"✅ Done: {summarize(report)}")
+    sys.exit(0 if all(entry['status'] in ("added", "ok (dry run)") for entry in report) else 1)
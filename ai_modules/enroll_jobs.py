@@ -0,0 +1,69 @@
+# name file: ai_modules/enroll_jobs.py
+import io
+import os
+import shutil
+import sys
+import time
+
+# Add project path for database modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai_modules.bulk_enroll import enroll_from_source, summarize, write_report
+from ai_modules.face_gallery import DEFAULT_TOLERANCE
+from ai_modules.job_queue import JobQueue
+from ai_modules.worker_pool import get_face_pool
+
+# Bulk enrollments running at the same time (photos are encoded in the face worker pool)
+ENROLL_JOB_THREADS = int(os.environ.get("ENROLL_JOB_THREADS", "1"))
+# Queued + running enrollments; further uploads are refused until one finishes
+ENROLL_JOB_MAX_PENDING = int(os.environ.get("ENROLL_JOB_MAX_PENDING", "5"))
+# Finished jobs (and their reports) are forgotten after this long
+ENROLL_JOB_KEEP_SECONDS = int(os.environ.get("ENROLL_JOB_KEEP_SECONDS", "3600"))
+
+# File names inside a job's upload folder (the manifest is optional)
+ENROLL_ARCHIVE_NAME = "archive.zip"
+ENROLL_MANIFEST_NAME = "manifest.csv"
+
+
+class EnrollJobQueue(JobQueue):
+    """
+    Background bulk enrollments from an uploaded ZIP archive.
+    submit(upload_dir, dry_run) returns a job id at once; upload_dir is a
+    private folder holding ENROLL_ARCHIVE_NAME (and ENROLL_MANIFEST_NAME if
+    given). The enrollment runs on a job thread with its photos encoded in
+    the shared face worker pool, and the folder is deleted when it ends. The result holds the report, its summary and the CSV report.
+    """
+
+    def __init__(self, threads=ENROLL_JOB_THREADS, max_pending=ENROLL_JOB_MAX_PENDING,
+                 keep_seconds=ENROLL_JOB_KEEP_SECONDS, tolerance=DEFAULT_TOLERANCE):
+        super().__init__(threads, max_pending, keep_seconds, name="EnrollJob")
+        self.tolerance = tolerance
+
+    def _run(self, job_id, upload_dir, dry_run=False):
+        start = time.perf_counter()
+        archive_path = os.path.join(upload_dir, ENROLL_ARCHIVE_NAME)
+        manifest_path = os.path.join(upload_dir, ENROLL_MANIFEST_NAME)
+        if not os.path.exists(manifest_path):
+            manifest_path = None
+        try:
+            self._update(job_id, status="running", stage="checking", progress=2)
+
+            # Encoding progress maps to 5-90%
+            def progress(done, total):
+                self._update(job_id, stage="saving" if done == total else "encoding",
+                             progress=5 + int(85 * done / total))
+
+            report = enroll_from_source(archive_path, manifest_path, tolerance=self.tolerance,
+                                        dry_run=dry_run, progress=progress, pool=get_face_pool())
+            buffer = io.StringIO()
+            write_report(report, buffer)
+
+            result = {"report": report, "summary": summarize(report), "report_csv": buffer.getvalue()}
+            self._update(job_id, status="done", stage="done", progress=100, result=result, finished=time.time())
+            print(f"📦 Bulk enrollment {job_id[:8]}: {result['summary']} in {time.perf_counter() - start:.1f}s")
+
+        except Exception as e:
+            print(f"❌ Bulk enrollment {job_id[:8]} failed: {e}")
+            self._update(job_id, status="failed", error=str(e), finished=time.time())
+        finally:
+            shutil.rmtree(upload_dir, ignore_errors=True)
@@ -0,0 +1,134 @@
+# name file: ai_modules/enrollment.py
+import math
+import os
+
+import cv2
+import numpy as np
+import face_recognition
+
+from .image_io import decode_image_rgb
+from .worker_pool import get_face_pool
+
+# Encoding processes of the bulk enrollment CLI (all cores by default)
+ENROLL_WORKERS = int(os.environ.get("ENROLL_WORKERS", str(os.cpu_count() or 4)))
+
+# Photos are shrunk to this size (longest side) before detection
+ENROLL_MAX_IMAGE_SIDE = int(os.environ.get("ENROLL_MAX_IMAGE_SIDE", "1024"))
+
+# Quality gates, checked before the (expensive) encoding:
+# smallest face box side in pixels, sharpness (variance of the Laplacian
+# of the face at 160x160), and head pose (nose offset from the eye midpoint
+# in eye distances, and eye-line tilt in degrees)
+ENROLL_MIN_FACE_SIZE = int(os.environ.get("ENROLL_MIN_FACE_SIZE", "80"))
+ENROLL_BLUR_THRESHOLD = float(os.environ.get("ENROLL_BLUR_THRESHOLD", "60"))
+ENROLL_MAX_YAW = float(os.environ.get("ENROLL_MAX_YAW", "0.35"))
+ENROLL_MAX_ROLL = float(os.environ.get("ENROLL_MAX_ROLL", "25"))
+
+# Encodings further than this from the most central one are outliers
+# (another person, a bad crop) and are left out of the average
+ENROLL_OUTLIER_DISTANCE = float(os.environ.get("ENROLL_OUTLIER_DISTANCE", "0.45"))
+
+_QUALITY_SIZE = 160
+
+
+def check_face_quality(rgb, box):
+    """Reason the face is unusable for enrollment, or None if it passes"""
+    top, right, bottom, left = box
+    if min(bottom - top, right - left) < ENROLL_MIN_FACE_SIZE:
+        return f"face too small ({right - left}x{bottom - top}px)"
+
+    face = rgb[max(top, 0):bottom, max(left, 0):right]
+    gray = cv2.cvtColor(cv2.resize(face, (_QUALITY_SIZE, _QUALITY_SIZE)), cv2.COLOR_RGB2GRAY)
+    sharpness = cv2.Laplacian(gray, cv2.CV_64F).var()
+    if sharpness < ENROLL_BLUR_THRESHOLD:
+        return f"too blurry (sharpness {sharpness:.0f})"
+
+    # 5-point landmarks are cheap: two points per eye and the nose tip
+    landmarks = face_recognition.face_landmarks(rgb, [box], model="small")
+    if landmarks:
+        points = landmarks[0]
+        eyes = sorted([np.mean(points['left_eye'], axis=0), np.mean(points['right_eye'], axis=0)], key=lambda p: p[0])
+        axis = eyes[1] - eyes[0]
+        eye_distance = float(np.linalg.norm(axis)) or 1.0
+
+        roll = math.degrees(math.atan2(axis[1], axis[0]))
+        if abs(roll) > ENROLL_MAX_ROLL:
+            return f"head tilted ({roll:.0f}°)"
+
+        nose = np.asarray(points['nose_tip'][0], dtype=np.float64)
+        yaw = float(np.dot(nose - (eyes[0] + eyes[1]) / 2, axis / eye_distance)) / eye_distance
+        if abs(yaw) > ENROLL_MAX_YAW:
+            return "face turned away from the camera"
+
+    return None
+
+
+def encode_photo(data, max_side=ENROLL_MAX_IMAGE_SIDE):
+    """
+    Worker-process stage for one enrollment photo:
+    decode + downscale -> detect -> quality checks -> encode.
+    Returns (encoding or None, reason it was rejected or None).
+    """
+    try:
+        rgb = decode_image_rgb(data, max_side)
+    except ValueError as e:
+        return None, str(e)
+
+    boxes = face_recognition.face_locations(rgb)
+    if len(boxes) != 1:
+        return None, "no face found" if not boxes else f"{len(boxes)} faces in photo"
+
+    reason = check_face_quality(rgb, boxes[0])
+    if reason:
+        return None, reason
+
+    # The box is known: encode without detecting again
+    return face_recognition.face_encodings(rgb, boxes)[0], None
+
+
+def combine_encodings(encodings, max_distance=ENROLL_OUTLIER_DISTANCE):
+    """
+    Average of the encodings after outlier rejection.
+    With 3+ photos, encodings further than max_distance from the medoid
+    (the one closest to all others) are dropped.
+    Returns (mean encoding or None, number of outliers dropped).
+    """
+    if len(encodings) == 0:
+        return None, 0
+
+    matrix = np.asarray(encodings, dtype=np.float64)
+    if len(matrix) < 3:
+        return matrix.mean(axis=0), 0
+
+    distances = np.linalg.norm(matrix[:, None, :] - matrix[None, :, :], axis=2)
+    medoid = int(np.argmin(distances.sum(axis=1)))
+    keep = distances[medoid] <= max_distance
+
+    return matrix[keep].mean(axis=0), int(len(matrix) - keep.sum())
+
+
+def encode_photos(photos):
+    """
+    Encode a person's photos (encoded image bytes) in parallel on the shared
+    pool, then average them without outliers.
+    Returns (encoding or None, photos used, notes about rejected photos).
+    """
+    futures = [get_face_pool().submit(encode_photo, data) for data in photos]
+
+    encodings = []
+    notes = []
+    for number, future in enumerate(futures, 1):
+        try:
+            encoding, reason = future.result()
+        except Exception as e:
+            encoding, reason = None, str(e)
+
+        if encoding is None:
+            notes.append(f"photo {number}: {reason}")
+        else:
+            encodings.append(encoding)
+
+    encoding, outliers = combine_encodings(encodings)
+    if outliers:
+        notes.append(f"{outliers} photo(s) did not match the others")
+    return encoding, len(encodings) - outliers, notes
@@ -6,9 +6,9 @@ import sys
 # إضافة المسار الرئيسي للمشروع لكي نستطيع استدعاء ملفات قاعدة البيانات
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from database_modules.student_crud import add_new_student
+from database_modules.employee_crud import add_new_employee
 
-def register_new_student(image_path, name, student_code, email):
+def register_new_employee(image_path, name, code, email, department="General"):
     """
     دالة شاملة تقوم بالتالي:
     1. تحميل الصورة
@@ -44,11 +44,14 @@ def register_new_student(image_path, name, student_code, email):
         student_face_encoding = face_encodings[0]
         
         # 3. إرسال البيانات للحفظ في قاعدة البيانات
-        # نستدعي الدالة التي كتبناها سابقاً في student_crud
-        result = add_new_student(name, student_code, email, student_face_encoding)
+        # نستدعي الدالة التي كتبناها سابقاً في employee_crud
+        result = add_new_employee(name, code, email, student_face_encoding, department)
         
         return result
 
     except Exception as e:
         print(f"❌ An error occurred while processing the image: {e}")
-        return False
\ No newline at end of file
+        return False
+
+# Old name, kept for existing scripts (for many people see ai_modules/bulk_enroll.py)
+register_new_student = register_new_employee
@@ -0,0 +1,268 @@
+# name file: ai_modules/face_gallery.py
+import threading
+import numpy as np
+from .face_index import ExactIndex, build_index, choose_backend
+
+# Size of a dlib face embedding
+ENCODING_DIM = 128
+
+# Same threshold used by compare_faces() everywhere in the project
+DEFAULT_TOLERANCE = 0.5
+
+# Compact the matrix once this share of its rows are removed/replaced
+_COMPACT_RATIO = 0.25
+
+
+class _GalleryState:
+    """Immutable snapshot read by matching threads (swapped as one reference)"""
+
+    def __init__(self, encodings, sq_norms, ids, names, alive, index):
+        self.encodings = encodings
+        self.sq_norms = sq_norms
+        self.ids = ids
+        self.names = names
+        self.alive = alive  # None = every row is live
+        self.index = index
+
+
+class FaceGallery:
+    """
+    All known face encodings in one contiguous float32 (N x 128) matrix,
+    with parallel id/name arrays.
+    A whole batch of probe faces is matched with a single matrix product,
+    instead of calling compare_faces() + face_distance() per face.
+
+    upsert()/remove() apply small deltas while other threads keep matching:
+    new rows are appended into spare capacity, removed rows are masked, and
+    the new snapshot is published with a single reference swap.
+    """
+
+    def __init__(self, ids=None, names=None, encodings=None, index_backend=None):
+        if encodings is None or len(encodings) == 0:
+            encodings = np.empty((0, ENCODING_DIM), dtype=np.float32)
+
+        encodings = np.ascontiguousarray(encodings, dtype=np.float32).reshape(-1, ENCODING_DIM)
+        ids = np.asarray(ids if ids is not None else [], dtype=np.int64)
+        names = np.asarray(names if names is not None else [], dtype=object)
+
+        if not (len(ids) == len(names) == len(encodings)):
+            raise ValueError("ids, names and encodings must have the same length")
+
+        self.index_backend = index_backend
+        self._lock = threading.Lock()  # serializes writers only
+        self._row_of = {}
+        self._count = 0
+        self._dead = 0
+        self._load(ids, names, encodings)
+
+    def _load(self, ids, names, encodings):
+        """(Re)build buffers and index from scratch"""
+        # Cached squared norms: ||p - g||^2 = ||p||^2 + ||g||^2 - 2 p.g
+        sq_norms = np.einsum("ij,ij->i", encodings, encodings)
+
+        # The first snapshot can wrap the caller's matrix (e.g. a memory map)
+        # directly; spare capacity is only allocated on the first upsert
+        self._encodings_buf = encodings
+        self._sq_buf = sq_norms
+        self._ids_buf = ids
+        self._names_buf = names
+        self._count = len(ids)
+        self._dead = 0
+        self._row_of = {int(employee_id): row for row, employee_id in enumerate(ids)}
+
+        index = build_index(encodings, sq_norms, backend=self.index_backend)
+        self._state = _GalleryState(encodings, sq_norms, ids, names, None, index)
+
+    # --- Read side (lock-free, works on one snapshot) ---
+
+    @property
+    def encodings(self):
+        return self._state.encodings
+
+    @property
+    def ids(self):
+        return self._state.ids
+
+    @property
+    def names(self):
+        return self._state.names
+
+    @property
+    def index(self):
+        return self._state.index
+
+    def __len__(self):
+        return self._count - self._dead
+
+    def distances(self, probes):
+        """Euclidean distance matrix (M probes x N rows); removed rows are inf"""
+        state = self._state
+        probes = np.asarray(probes, dtype=np.float32).reshape(-1, ENCODING_DIM)
+        probe_sq = np.einsum("ij,ij->i", probes, probes)
+
+        sq = probe_sq[:, None] + state.sq_norms[None, :] - 2.0 * (probes @ state.encodings.T)
+        np.maximum(sq, 0.0, out=sq)  # float32 rounding can go slightly negative
+        if state.alive is not None:
+            sq[:, ~state.alive] = np.inf
+        return np.sqrt(sq, out=sq)
+
+    def search(self, probes, k=1, exact=False, _state=None):
+        """
+        Top-k nearest known faces for every probe, through the configured index
+        (exact=True: brute force over every row, e.g. for duplicate checks where
+        the approximate index's recall is not good enough).
+        Returns (indices, distances), both shaped (M, k) and sorted by distance.
+        Missing neighbours are padded with -1 / inf.
+        """
+        state = _state or self._state
+        probes = np.asarray(probes, dtype=np.float32).reshape(-1, ENCODING_DIM)
+        k = min(k, len(state.ids))
+
+        if k == 0:
+            empty = np.empty((len(probes), 0))
+            return empty.astype(np.int64), empty.astype(np.float32)
+
+        if exact and state.index.name != "exact":
+            return ExactIndex(state.encodings, state.sq_norms, state.alive).search(probes, k)
+        return state.index.search(probes, k)
+
+    def search_ids(self, probes, k=1, exact=False):
+        """Same as search() but returns employee ids (-1 = no neighbour)"""
+        state = self._state
+        indices, dist = self.search(probes, k, exact=exact, _state=state)
+        if indices.size == 0:
+            return indices, dist
+        return np.where(indices >= 0, state.ids[np.maximum(indices, 0)], -1), dist
+
+    def identify(self, probes, tolerance=DEFAULT_TOLERANCE):
+        """
+        Best match for every probe face.
+        Returns a list of (employee_id, name, distance); id is None and
+        name is "Unknown" when nothing is within tolerance.
+        """
+        state = self._state
+        probes = np.asarray(probes, dtype=np.float32).reshape(-1, ENCODING_DIM)
+        results = []
+
+        if len(probes) == 0:
+            return results
+
+        indices, dist = self.search(probes, k=1, _state=state)
+
+        for row in range(len(probes)):
+            found = indices.shape[1] and indices[row, 0] >= 0
+            if found and dist[row, 0] <= tolerance:
+                best = indices[row, 0]
+                results.append((int(state.ids[best]), state.names[best], float(dist[row, 0])))
+            else:
+                results.append((None, "Unknown", float(dist[row, 0]) if found else None))
+
+        return results
+
+    def nearest(self, probe, k=1, exact=False):
+        """Top-k known faces for one probe: [(employee_id, name, distance)], nearest first"""
+        state = self._state
+        indices, dist = self.search([probe], k, exact=exact, _state=state)
+        return [
+            (int(state.ids[index]), state.names[index], float(distance))
+            for index, distance in zip(indices[0], dist[0])
+            if index >= 0
+        ]
+
+    def live_rows(self):
+        """(ids, names, encodings) of the live rows of the current snapshot (copies)"""
+        state = self._state
+        if state.alive is None:
+            return state.ids.copy(), state.names.copy(), np.array(state.encodings)
+        return state.ids[state.alive], state.names[state.alive], state.encodings[state.alive]
+
+    def employee_ids(self):
+        """Set of employee ids currently in the gallery"""
+        with self._lock:
+            return set(self._row_of)
+
+    # --- Write side (delta updates) ---
+
+    def _reserve(self, extra):
+        """Make room for `extra` appended rows (amortized doubling)"""
+        needed = self._count + extra
+        if needed <= len(self._encodings_buf) and self._encodings_buf.flags.writeable:
+            return
+
+        capacity = max(needed, 2 * len(self._encodings_buf), 64)
+        encodings = np.empty((capacity, ENCODING_DIM), dtype=np.float32)
+        sq_norms = np.empty(capacity, dtype=np.float32)
+        ids = np.full(capacity, -1, dtype=np.int64)
+        names = np.empty(capacity, dtype=object)
+
+        encodings[:self._count] = self._encodings_buf[:self._count]
+        sq_norms[:self._count] = self._sq_buf[:self._count]
+        ids[:self._count] = self._ids_buf[:self._count]
+        names[:self._count] = self._names_buf[:self._count]
+
+        self._encodings_buf, self._sq_buf, self._ids_buf, self._names_buf = encodings, sq_norms, ids, names
+
+    def apply_changes(self, upserts=(), removed_ids=()):
+        """
+        Apply a delta: `upserts` is a list of dicts with id/name/encoding
+        (new or changed employees), `removed_ids` are deleted employees.
+        Existing rows are never modified in place, so readers holding the
+        previous snapshot are unaffected. An id repeated in `upserts`
+        keeps its last copy.
+        """
+        upserts = list({int(employee['id']): employee for employee in upserts}.values())
+        with self._lock:
+            state = self._state
+            alive = state.alive.copy() if state.alive is not None else np.ones(self._count, dtype=bool)
+
+            stale = [int(e['id']) for e in upserts] + [int(i) for i in removed_ids]
+            for employee_id in stale:
+                row = self._row_of.pop(employee_id, None)
+                if row is not None and alive[row]:
+                    alive[row] = False
+                    self._dead += 1
+
+            start = self._count
+            if upserts:
+                self._reserve(len(upserts))
+                for row, employee in enumerate(upserts, start=start):
+                    vector = np.asarray(employee['encoding'], dtype=np.float32)
+                    self._encodings_buf[row] = vector
+                    self._sq_buf[row] = vector @ vector
+                    self._ids_buf[row] = employee['id']
+                    self._names_buf[row] = employee['name']
+                    self._row_of[int(employee['id'])] = row
+                self._count += len(upserts)
+                alive = np.concatenate([alive, np.ones(len(upserts), dtype=bool)])
+
+            count = self._count
+            live = count - self._dead
+            wanted_backend = choose_backend(live, self.index_backend)
+
+            if self._dead > _COMPACT_RATIO * max(count, 1) or wanted_backend != state.index.name:
+                # Too many holes, or the gallery crossed the exact/approximate
+                # threshold: rebuild once from the live rows
+                keep = np.flatnonzero(alive)
+                self._load(
+                    self._ids_buf[keep].copy(),
+                    self._names_buf[keep].copy(),
+                    self._encodings_buf[keep].copy(),
+                )
+                return
+
+            encodings = self._encodings_buf[:count]
+            sq_norms = self._sq_buf[:count]
+            mask = None if self._dead == 0 else alive
+            index = state.index.extended(encodings, sq_norms, mask, added_rows=np.arange(start, count))
+
+            self._state = _GalleryState(
+                encodings, sq_norms, self._ids_buf[:count], self._names_buf[:count], mask, index
+            )
+
+    def upsert(self, employee_id, name, encoding):
+        """Add or replace a single employee"""
+        self.apply_changes(upserts=[{"id": employee_id, "name": name, "encoding": encoding}])
+
+    def remove(self, employee_id):
+        """Remove a single employee"""
+        self.apply_changes(removed_ids=[employee_id])
@@ -0,0 +1,202 @@
+# name file: ai_modules/face_index.py
+import os
+import numpy as np
+
+# Backend selection (exact | ivf) and the recall/latency knobs
+FACE_INDEX_BACKEND = os.environ.get("FACE_INDEX_BACKEND", "ivf").strip().lower()
+FACE_INDEX_NPROBE = max(1, int(os.environ.get("FACE_INDEX_NPROBE", "8")))  # 1..number of partitions
+FACE_INDEX_NLIST = int(os.environ.get("FACE_INDEX_NLIST", "0"))  # 0 = sqrt(N)
+
+# Below this many faces an exact scan is already fast, so approximate
+# search is never used
+FACE_INDEX_MIN_SIZE = int(os.environ.get("FACE_INDEX_MIN_SIZE", "5000"))
+
+_KMEANS_ITERATIONS = 10
+_KMEANS_SAMPLES_PER_LIST = 64
+_CHUNK_ROWS = 8192
+
+
+def _squared_distances(probes, probe_sq, vectors, vector_sq):
+    sq = probe_sq[:, None] + vector_sq[None, :] - 2.0 * (probes @ vectors.T)
+    np.maximum(sq, 0.0, out=sq)
+    return sq
+
+
+def _top_k(sq, k):
+    """Indices and distances of the k smallest entries of every row, sorted"""
+    if k < sq.shape[1]:
+        top = np.argpartition(sq, k - 1, axis=1)[:, :k]
+    else:
+        top = np.broadcast_to(np.arange(sq.shape[1]), sq.shape).copy()
+
+    top_sq = np.take_along_axis(sq, top, axis=1)
+    order = np.argsort(top_sq, axis=1)
+    top = np.take_along_axis(top, order, axis=1)
+    dist = np.sqrt(np.take_along_axis(top_sq, order, axis=1))
+
+    # Removed rows are masked with inf and never reported as neighbours
+    top[np.isinf(dist)] = -1
+    return top, dist
+
+
+def _nearest_centroid(vectors, centroids):
+    """Assign every vector to its closest centroid (chunked to bound memory)"""
+    centroid_sq = np.einsum("ij,ij->i", centroids, centroids)
+    labels = np.empty(len(vectors), dtype=np.int64)
+
+    for start in range(0, len(vectors), _CHUNK_ROWS):
+        chunk = vectors[start:start + _CHUNK_ROWS]
+        # ||c||^2 - 2 v.c is enough to rank centroids for a fixed v
+        scores = centroid_sq[None, :] - 2.0 * (chunk @ centroids.T)
+        labels[start:start + _CHUNK_ROWS] = np.argmin(scores, axis=1)
+
+    return labels
+
+
+class ExactIndex:
+    """Brute-force search over the whole matrix (always 100% recall)"""
+
+    name = "exact"
+
+    def __init__(self, encodings, sq_norms, alive=None):
+        self.encodings = encodings
+        self.sq_norms = sq_norms
+        self.alive = alive  # None = every row is live
+
+    def extended(self, encodings, sq_norms, alive, added_rows=()):
+        """Index over a grown/masked matrix (nothing to recompute for a scan)"""
+        return ExactIndex(encodings, sq_norms, alive)
+
+    def search(self, probes, k=1):
+        probe_sq = np.einsum("ij,ij->i", probes, probes)
+        sq = _squared_distances(probes, probe_sq, self.encodings, self.sq_norms)
+        if self.alive is not None:
+            sq[:, ~self.alive] = np.inf
+        return _top_k(sq, min(k, sq.shape[1]))
+
+
+class IVFIndex:
+    """
+    Inverted-file index: encodings are partitioned with k-means and a probe
+    is only compared against the n_probe closest partitions.
+    Larger n_probe = better recall, slower search.
+    """
+
+    name = "ivf"
+
+    def __init__(self, encodings, sq_norms, n_lists=0, n_probe=FACE_INDEX_NPROBE, seed=0):
+        self.encodings = encodings
+        self.sq_norms = sq_norms
+        self.n_probe = n_probe
+        self.alive = None
+
+        count = len(encodings)
+        if n_lists <= 0:
+            n_lists = int(np.sqrt(count))
+        self.n_lists = max(1, min(n_lists, count))
+
+        self.centroids = self._train(seed)
+        labels = _nearest_centroid(encodings, self.centroids)
+        order = np.argsort(labels, kind="stable")
+        bounds = np.searchsorted(labels[order], np.arange(self.n_lists + 1))
+        self.lists = [order[bounds[i]:bounds[i + 1]] for i in range(self.n_lists)]
+
+    def _train(self, seed):
+        rng = np.random.default_rng(seed)
+        count = len(self.encodings)
+
+        sample_size = min(count, self.n_lists * _KMEANS_SAMPLES_PER_LIST)
+        sample = self.encodings[rng.choice(count, sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, self.n_lists, replace=False)].copy()
+
+        for _ in range(_KMEANS_ITERATIONS):
+            labels = _nearest_centroid(sample, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            counts = np.bincount(labels, minlength=self.n_lists)
+
+            filled = counts > 0
+            centroids[filled] = sums[filled] / counts[filled, None]
+            # Re-seed empty partitions with random sample points
+            if not filled.all():
+                centroids[~filled] = sample[rng.choice(sample_size, int((~filled).sum()))]
+
+        return centroids
+
+    def extended(self, encodings, sq_norms, alive, added_rows=()):
+        """
+        Index over a grown/masked matrix without re-training:
+        added rows go to their nearest partition, removed rows are masked.
+        Only the partitions that received rows are copied.
+        """
+        index = IVFIndex.__new__(IVFIndex)
+        index.encodings = encodings
+        index.sq_norms = sq_norms
+        index.n_probe = self.n_probe
+        index.n_lists = self.n_lists
+        index.centroids = self.centroids
+        index.alive = alive
+        index.lists = list(self.lists)
+
+        added_rows = np.asarray(added_rows, dtype=np.int64)
+        if len(added_rows):
+            labels = _nearest_centroid(encodings[added_rows], self.centroids)
+            for label in np.unique(labels):
+                index.lists[label] = np.concatenate([index.lists[label], added_rows[labels == label]])
+
+        return index
+
+    def search(self, probes, k=1):
+        n_probe = max(1, min(self.n_probe, self.n_lists))
+        probe_sq = np.einsum("ij,ij->i", probes, probes)
+
+        centroid_sq = np.einsum("ij,ij->i", self.centroids, self.centroids)
+        scores = centroid_sq[None, :] - 2.0 * (probes @ self.centroids.T)
+        nearest_lists = np.argpartition(scores, n_probe - 1, axis=1)[:, :n_probe]
+
+        indices = np.full((len(probes), k), -1, dtype=np.int64)
+        distances = np.full((len(probes), k), np.inf, dtype=np.float32)
+
+        for row in range(len(probes)):
+            candidates = np.concatenate([self.lists[i] for i in nearest_lists[row]])
+            if self.alive is not None:
+                candidates = candidates[self.alive[candidates]]
+            if len(candidates) == 0:
+                continue
+
+            sq = _squared_distances(probes[row:row + 1], probe_sq[row:row + 1],
+                                    self.encodings[candidates], self.sq_norms[candidates])
+            top, dist = _top_k(sq, min(k, len(candidates)))
+            indices[row, :top.shape[1]] = candidates[top[0]]
+            distances[row, :top.shape[1]] = dist[0]
+
+        return indices, distances
+
+
+def choose_backend(count, backend=None, min_size=None):
+    """Name of the backend build_index() would use for a gallery of this size"""
+    backend = (backend or FACE_INDEX_BACKEND).lower()
+    min_size = FACE_INDEX_MIN_SIZE if min_size is None else min_size
+
+    if backend not in ("exact", "ivf"):
+        raise ValueError(f"Unknown face index backend: '{backend}'")
+
+    if backend == "exact" or count < max(min_size, 1):
+        return "exact"
+    return backend
+
+
+def build_index(encodings, sq_norms, backend=None, n_probe=None, n_lists=None, min_size=None):
+    """
+    Pick a search backend for the gallery.
+    Falls back to ExactIndex when the gallery is smaller than min_size.
+    """
+    if choose_backend(len(encodings), backend, min_size) == "exact":
+        return ExactIndex(encodings, sq_norms)
+
+    return IVFIndex(
+        encodings,
+        sq_norms,
+        n_lists=FACE_INDEX_NLIST if n_lists is None else n_lists,
+        n_probe=FACE_INDEX_NPROBE if n_probe is None else n_probe,
+    )
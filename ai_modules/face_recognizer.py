@@ -1,16 +1,21 @@
 # name file: ai_modules/face_recognizer.py
 import cv2
-import face_recognition
 import numpy as np
 import sys
 import os
+import time
 from os import environ
 
 # Add project path for database modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 try:
-    from database_modules.employee_crud import get_all_employees
-    from database_modules.attendance_logger import mark_attendance
+    from database_modules.attendance_writer import get_attendance_writer
+    from database_modules.storage import STORAGE_BACKEND
+    from utils.notifications import stop_notification_dispatcher
+    from ai_modules.face_gallery import DEFAULT_TOLERANCE
+    from ai_modules.gallery_cache import load_cached_gallery, CACHE_DIR
+    from ai_modules.gallery_sync import GallerySync
+    from ai_modules.recognition_pipeline import RecognitionPipeline
 except ImportError as e:
     print(f"❌ Import Error: {e}")
     print("Ensure you are running from the project root.")
@@ -25,6 +30,61 @@ try:
 except ImportError:
     print("ℹ️  picamera2 not available, will try OpenCV backends.")
 
+# Seconds between two per-stage throughput reports
+STATS_INTERVAL = 10
+
+# Motion gate: share of changed pixels that counts as motion
+MOTION_THRESHOLD = float(environ.get("MOTION_THRESHOLD", "0.01"))
+# Keep detecting this long after the last motion (people standing still)
+MOTION_HOLD_SECONDS = float(environ.get("MOTION_HOLD_SECONDS", "3"))
+# Without motion for this long, the camera is only read IDLE_FPS times a second
+IDLE_AFTER_SECONDS = float(environ.get("IDLE_AFTER_SECONDS", "10"))
+IDLE_FPS = float(environ.get("IDLE_FPS", "2"))
+
+class MotionGate:
+    """
+    Cheap frame-difference gate in front of face detection.
+    Each (already downscaled) frame is blurred to a tiny grayscale image and
+    compared with a running-average background; detection is skipped while
+    nothing changes. After a quiet period the capture rate drops to IDLE_FPS.
+    """
+    def __init__(self, threshold=MOTION_THRESHOLD, hold_seconds=MOTION_HOLD_SECONDS,
+                 idle_after=IDLE_AFTER_SECONDS, idle_fps=IDLE_FPS):
+        self.threshold = threshold
+        self.hold_seconds = hold_seconds
+        self.idle_after = idle_after
+        self.idle_fps = idle_fps
+        self._background = None
+        self._last_motion = time.time()
+
+    def has_motion(self, small_frame):
+        gray = cv2.cvtColor(cv2.resize(small_frame, (80, 60)), cv2.COLOR_BGR2GRAY)
+        gray = cv2.GaussianBlur(gray, (5, 5), 0).astype(np.float32)
+
+        if self._background is None:
+            self._background = gray
+            return True
+
+        diff = cv2.absdiff(gray, self._background)
+        # Slowly adapt to lighting changes
+        cv2.accumulateWeighted(gray, self._background, 0.1)
+        changed = np.count_nonzero(diff > 25) / diff.size
+        return changed >= self.threshold
+
+    def should_detect(self, small_frame, faces_in_view=False):
+        """True when the frame is worth running face detection on"""
+        now = time.time()
+        if self.has_motion(small_frame) or faces_in_view:
+            self._last_motion = now
+            return True
+        return now - self._last_motion < self.hold_seconds
+
+    def capture_delay(self):
+        """Seconds the capture thread should sleep between frames"""
+        if time.time() - self._last_motion >= self.idle_after:
+            return 1.0 / self.idle_fps
+        return 0.0
+
 class PiCameraWrapper:
     """Wrapper to make Picamera2 behave like cv2.VideoCapture"""
     def __init__(self):
@@ -118,45 +178,40 @@ def get_camera():
 def start_recognition_camera():
     print("\n🔵 STARTING FACE RECOGNITION (Version 4.0 - Picamera2)")
     
-    # 1. Check Credentials FIRST
-    url = environ.get('SUPABASE_URL', '').strip()
-    key = environ.get('SUPABASE_KEY', '').strip()
-    
-    if not url or not key:
-        print("\n❌ CRITICAL ERROR: Supabase credentials missing!")
-        print("➡️  Please edit your .env file: 'nano .env'")
-        return
+    # 1. Check Credentials FIRST (a local SQLite store needs none)
+    if STORAGE_BACKEND == "supabase":
+        url = environ.get('SUPABASE_URL', '').strip()
+        key = environ.get('SUPABASE_KEY', '').strip()
 
-    if not url.startswith("http"):
-        print(f"\n❌ CRITICAL ERROR: Invalid Supabase URL: '{url}'")
-        print("➡️  The URL must start with 'https://'")
-        return
+        if not url or not key:
+            print("\n❌ CRITICAL ERROR: Supabase credentials missing!")
+            print("➡️  Please edit your .env file: 'nano .env'")
+            return
+
+        if not url.startswith("http"):
+            print(f"\n❌ CRITICAL ERROR: Invalid Supabase URL: '{url}'")
+            print("➡️  The URL must start with 'https://'")
+            return
 
     # Loading message
-    print("⏳ Loading employee data from database...")
-    
-    try:
-        employees_data = get_all_employees()
-    except Exception as e:
-        print(f"❌ Database Error: {e}")
-        return
+    print("⏳ Loading employee data from local cache...")
     
-    known_face_encodings = []
-    known_face_names = []
-    known_face_ids = [] 
+    # Start from the local cache (no network); changes since the last run are
+    # streamed in page by page by GallerySync while the camera starts
+    gallery, watermark = load_cached_gallery()
     
-    for employee in employees_data:
-        known_face_encodings.append(employee['encoding'])
-        known_face_names.append(employee['name'])
-        known_face_ids.append(employee['id'])
+    print(f"✅ System Ready: Loaded {len(gallery)} employees (syncing in background).")
     
-    print(f"✅ System Ready: Loaded {len(known_face_names)} employees.")
+    # Also picks up employees added/edited/deleted from the web UI while running
+    gallery_sync = GallerySync(gallery, watermark, initial_sync=True, cache_dir=CACHE_DIR)
+    gallery_sync.start()
     
     # 2. Initialize Camera
     video_capture = get_camera()
     
     if video_capture is None:
         print("❌ CRITICAL ERROR: Could not open any camera.")
+        gallery_sync.stop()
         return
 
     print("📷 Camera Started.")
@@ -164,66 +219,58 @@ def start_recognition_camera():
     
     window_name = 'Smart Attendance System'
 
+    # Repeats are rejected in memory; new marks are written in batches
+    attendance_writer = get_attendance_writer()
+
+    def on_match(employee_id, name):
+        # Runs on the pipeline's attendance thread, not the display loop
+        if attendance_writer.mark(employee_id):
+            print(f"🔔 Notification: {name} is present!")
+
+    pipeline = RecognitionPipeline(video_capture, gallery, on_match, tolerance=DEFAULT_TOLERANCE, gate=MotionGate())
+    pipeline.start()
+
+    shown_id = 0
+    last_report = time.time()
+
     while True:
-        ret, frame = video_capture.read()
-        if not ret:
+        if pipeline.failed:
             print("❌ Error: Could not read frame.")
             break
 
-        try:
-            small_frame = cv2.resize(frame, (0, 0), fx=0.25, fy=0.25)
-        except Exception:
-            continue
-            
-        rgb_small_frame = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
+        frame_id, frame = pipeline.latest_frame()
 
-        face_locations = face_recognition.face_locations(rgb_small_frame)
-        face_encodings = face_recognition.face_encodings(rgb_small_frame, face_locations)
+        if frame is not None and frame_id != shown_id:
+            shown_id = frame_id
+            # Draw the newest recognition result on the newest frame
+            frame = frame.copy()
+            for (top, right, bottom, left), name in pipeline.latest_faces():
+                color = (0, 255, 0) if name != "Unknown" else (0, 0, 255)
+                
+                cv2.rectangle(frame, (left, top), (right, bottom), color, 2)
+                cv2.rectangle(frame, (left, bottom - 35), (right, bottom), color, cv2.FILLED)
+                cv2.putText(frame, name, (left + 6, bottom - 6), cv2.FONT_HERSHEY_DUPLEX, 0.7, (255, 255, 255), 1)
 
-        face_names = []
+            cv2.imshow(window_name, frame)
+            pipeline.stats.tick("display")
 
-        for face_encoding in face_encodings:
-            matches = face_recognition.compare_faces(known_face_encodings, face_encoding, tolerance=0.5)
-            name = "Unknown"
-            
-            face_distances = face_recognition.face_distance(known_face_encodings, face_encoding)
-            
-            if len(face_distances) > 0:
-                best_match_index = np.argmin(face_distances)
-                if matches[best_match_index]:
-                    name = known_face_names[best_match_index]
-                    employee_id = known_face_ids[best_match_index]
-                    
-                    is_new_attendance = mark_attendance(employee_id)
-                    
-                    if is_new_attendance:
-                        print(f"🔔 Notification: {name} is present!")
-
-            face_names.append(name)
-
-        for (top, right, bottom, left), name in zip(face_locations, face_names):
-            top *= 4
-            right *= 4
-            bottom *= 4
-            left *= 4
-
-            color = (0, 255, 0) if name != "Unknown" else (0, 0, 255)
-            
-            cv2.rectangle(frame, (left, top), (right, bottom), color, 2)
-            cv2.rectangle(frame, (left, bottom - 35), (right, bottom), color, cv2.FILLED)
-            cv2.putText(frame, name, (left + 6, bottom - 6), cv2.FONT_HERSHEY_DUPLEX, 0.7, (255, 255, 255), 1)
-
-        cv2.imshow(window_name, frame)
-
-        key = cv2.waitKey(1) & 0xFF
+        key = cv2.waitKey(5) & 0xFF
 
         if key == ord('q') or key == 27:
             print("🛑 Exiting system...")
             break
 
-        if cv2.getWindowProperty(window_name, cv2.WND_PROP_VISIBLE) < 1:
+        if shown_id and cv2.getWindowProperty(window_name, cv2.WND_PROP_VISIBLE) < 1:
             print("🛑 Window closed by user.")
             break
 
+        if time.time() - last_report >= STATS_INTERVAL:
+            print(f"📊 {pipeline.stats.summary()}")
+            last_report = time.time()
+
+    pipeline.stop()
+    attendance_writer.stop()
+    stop_notification_dispatcher()
+    gallery_sync.stop()
     video_capture.release()
     cv2.destroyAllWindows()
\ No newline at end of file
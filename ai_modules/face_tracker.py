@@ -0,0 +1,180 @@
+# name file: ai_modules/face_tracker.py
+import itertools
+import os
+import threading
+import time
+from collections import Counter, deque
+
+# Minimum box overlap to continue a track between two detections
+TRACK_IOU_THRESHOLD = float(os.environ.get("TRACK_IOU_THRESHOLD", "0.3"))
+
+# Drop a track not seen for this many seconds
+TRACK_MAX_AGE = float(os.environ.get("TRACK_MAX_AGE", "1.0"))
+
+# Re-encode a confirmed track this often to catch identity swaps
+TRACK_REFRESH_SECONDS = float(os.environ.get("TRACK_REFRESH_SECONDS", "2.0"))
+
+# Identity = most common match among the last TRACK_VOTE_WINDOW encodings,
+# once it has at least TRACK_MIN_VOTES of them
+TRACK_VOTE_WINDOW = int(os.environ.get("TRACK_VOTE_WINDOW", "5"))
+TRACK_MIN_VOTES = int(os.environ.get("TRACK_MIN_VOTES", "3"))
+
+
+def box_iou(a, b):
+    """Intersection over union of two (top, right, bottom, left) boxes"""
+    top, bottom = max(a[0], b[0]), min(a[2], b[2])
+    left, right = max(a[3], b[3]), min(a[1], b[1])
+    inter = max(0, bottom - top) * max(0, right - left)
+    area_a = (a[2] - a[0]) * (a[1] - a[3])
+    area_b = (b[2] - b[0]) * (b[1] - b[3])
+    union = area_a + area_b - inter
+    return inter / union if union > 0 else 0.0
+
+
+def _centroid_close(a, b):
+    """Fallback association for fast moves: centroids within half a face size"""
+    ay, ax = (a[0] + a[2]) / 2, (a[1] + a[3]) / 2
+    by, bx = (b[0] + b[2]) / 2, (b[1] + b[3]) / 2
+    size = max(a[2] - a[0], a[1] - a[3], 1)
+    return ((ay - by) ** 2 + (ax - bx) ** 2) ** 0.5 < 0.5 * size
+
+
+class Track:
+    """One face followed across frames"""
+
+    def __init__(self, track_id, box, now):
+        self.track_id = track_id
+        self.box = box
+        self.last_seen = now
+        self.last_encoded = None
+        self.encoding_pending = False
+        self.votes = deque(maxlen=TRACK_VOTE_WINDOW)
+        self.employee_id = None
+        self.name = "Unknown"
+        self.confirmed = False
+        self.reported = False  # attendance already handed off for this track
+
+    def needs_encoding(self, now):
+        if self.encoding_pending:
+            return False
+        if not self.confirmed:
+            return True  # still collecting votes
+        return now - self.last_encoded >= TRACK_REFRESH_SECONDS
+
+
+class FaceTracker:
+    """
+    IoU/centroid tracker. Each detection is associated with an existing track
+    or starts a new one; encoding + gallery matching only run for tracks
+    that are new, still voting, or due for a confidence refresh.
+    """
+
+    def __init__(self, iou_threshold=TRACK_IOU_THRESHOLD, max_age=TRACK_MAX_AGE):
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age
+        self.tracks = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def update(self, boxes, now=None):
+        """
+        Associate the boxes of one frame with tracks.
+        Returns (tracks, to_encode): the track of every box (same order), and
+        the tracks whose face should be encoded now (marked pending).
+        """
+        now = time.time() if now is None else now
+
+        with self._lock:
+            # Greedy association, best overlaps first
+            pairs = sorted(
+                ((box_iou(track.box, box), track_id, i)
+                 for track_id, track in self.tracks.items()
+                 for i, box in enumerate(boxes)),
+                reverse=True,
+            )
+            assigned = [None] * len(boxes)
+            used = set()
+            for iou, track_id, i in pairs:
+                if iou < self.iou_threshold:
+                    break
+                if assigned[i] is None and track_id not in used:
+                    assigned[i] = track_id
+                    used.add(track_id)
+
+            for i, box in enumerate(boxes):
+                if assigned[i] is not None:
+                    continue
+                for track_id, track in self.tracks.items():
+                    if track_id not in used and _centroid_close(track.box, box):
+                        assigned[i] = track_id
+                        used.add(track_id)
+                        break
+
+            tracks = []
+            for i, box in enumerate(boxes):
+                if assigned[i] is None:
+                    track = Track(next(self._ids), box, now)
+                    self.tracks[track.track_id] = track
+                else:
+                    track = self.tracks[assigned[i]]
+                    track.box = box
+                    track.last_seen = now
+                tracks.append(track)
+
+            # Forget faces that left the scene
+            for track_id in [t for t, track in self.tracks.items() if now - track.last_seen > self.max_age]:
+                del self.tracks[track_id]
+
+            to_encode = [track for track in tracks if track.needs_encoding(now)]
+            for track in to_encode:
+                track.encoding_pending = True
+
+            return tracks, to_encode
+
+    def add_results(self, track_ids, matches, now=None):
+        """
+        Record one gallery match per track (from FaceGallery.identify).
+        Returns tracks that just got a confirmed identity to report.
+        """
+        now = time.time() if now is None else now
+        newly_confirmed = []
+
+        with self._lock:
+            for track_id, (employee_id, name, _) in zip(track_ids, matches):
+                track = self.tracks.get(track_id)
+                if track is None:
+                    continue  # left the scene while encoding
+
+                track.encoding_pending = False
+                track.last_encoded = now
+                track.votes.append((employee_id, name))
+
+                (best_id, best_name), count = Counter(track.votes).most_common(1)[0]
+                if count < TRACK_MIN_VOTES:
+                    continue
+
+                if best_id != track.employee_id:
+                    # Identity changed: report the new person once
+                    track.reported = False
+                track.employee_id, track.name, track.confirmed = best_id, best_name, True
+
+                if best_id is not None and not track.reported:
+                    track.reported = True
+                    newly_confirmed.append(track)
+
+        return newly_confirmed
+
+    def unreport(self, track_id):
+        """Report a track's identity again on its next vote (hand-off failed)"""
+        with self._lock:
+            track = self.tracks.get(track_id)
+            if track is not None:
+                track.reported = False
+
+    def release(self, track_ids):
+        """Clear the pending flag of tracks whose encoding failed"""
+        with self._lock:
+            for track_id in track_ids:
+                track = self.tracks.get(track_id)
+                if track is not None:
+                    track.encoding_pending = False
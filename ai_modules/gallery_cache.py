@@ -0,0 +1,203 @@
+# name file: ai_modules/gallery_cache.py
+import datetime
+import json
+import os
+import re
+import sys
+import numpy as np
+
+# Add project path for database modules
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_DIR)
+
+from database_modules.employee_crud import get_employees_updated_since, get_employee_ids
+from ai_modules.face_gallery import FaceGallery, ENCODING_DIM
+
+# On-disk copy of the gallery: a memory-mapped .npy matrix + id/name sidecar
+CACHE_DIR = os.environ.get("GALLERY_CACHE_DIR", os.path.join(PROJECT_DIR, "cache", "gallery"))
+ENCODINGS_FILE = "encodings.npy"
+META_FILE = "meta.json"
+CACHE_VERSION = 1
+
+# Rows changed up to this many seconds before the watermark are read again:
+# updated_at is stamped when the writing transaction starts (Postgres now()),
+# so a row committed after a sync can carry an older time than the watermark
+GALLERY_SYNC_OVERLAP_SECONDS = float(os.environ.get("GALLERY_SYNC_OVERLAP_SECONDS", "120"))
+
+_TIMESTAMP = re.compile(r"(\d{4}-\d\d-\d\d)[T ](\d\d:\d\d:\d\d)(?:\.\d+)?(.*)$")
+
+
+def overlap_since(watermark, seconds=GALLERY_SYNC_OVERLAP_SECONDS):
+    """
+    Lower bound (inclusive) for the next "changed since" query: the watermark
+    minus the overlap, in the watermark's own format and time zone.
+    Unparseable watermarks are returned unchanged.
+    """
+    match = _TIMESTAMP.match(watermark or "")
+    if not match or seconds <= 0:
+        return watermark
+    date, time, zone = match.groups()
+    moment = datetime.datetime.fromisoformat(f"{date}T{time}") - datetime.timedelta(seconds=seconds)
+    return moment.strftime("%Y-%m-%dT%H:%M:%S") + zone
+
+
+def load_cache(cache_dir=CACHE_DIR):
+    """
+    Load the cached gallery without copying the encodings (np.load mmap).
+    Returns a dict with ids, names, encodings and watermark, or None.
+    """
+    meta_path = os.path.join(cache_dir, META_FILE)
+    encodings_path = os.path.join(cache_dir, ENCODINGS_FILE)
+
+    if not (os.path.exists(meta_path) and os.path.exists(encodings_path)):
+        return None
+
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+
+        if meta.get("version") != CACHE_VERSION:
+            print("ℹ️  Gallery cache format changed, ignoring old cache.")
+            return None
+
+        encodings = np.load(encodings_path, mmap_mode="r")
+        if encodings.shape != (len(meta["ids"]), ENCODING_DIM) or encodings.dtype != np.float32:
+            print("⚠️ Gallery cache is inconsistent, ignoring it.")
+            return None
+
+        return {
+            "ids": meta["ids"],
+            "names": meta["names"],
+            "encodings": encodings,
+            "watermark": meta.get("watermark"),
+        }
+    except Exception as e:
+        print(f"⚠️ Could not read gallery cache: {e}")
+        return None
+
+
+def save_cache(ids, names, encodings, watermark, cache_dir=CACHE_DIR):
+    """Write the gallery to disk atomically (temp files + rename)"""
+    os.makedirs(cache_dir, exist_ok=True)
+
+    encodings_path = os.path.join(cache_dir, ENCODINGS_FILE)
+    meta_path = os.path.join(cache_dir, META_FILE)
+
+    # np.save appends ".npy" to names without it, so keep the extension last.
+    # Per-process names: the camera and the web app may share one cache.
+    tmp_encodings = os.path.join(cache_dir, f"encodings.{os.getpid()}.tmp.npy")
+    tmp_meta = f"{meta_path}.{os.getpid()}.tmp"
+
+    np.save(tmp_encodings, np.ascontiguousarray(encodings, dtype=np.float32).reshape(-1, ENCODING_DIM))
+    with open(tmp_meta, "w", encoding="utf-8") as f:
+        json.dump({
+            "version": CACHE_VERSION,
+            "watermark": watermark,
+            "ids": [int(i) for i in ids],
+            "names": [str(n) for n in names],
+        }, f)
+
+    # Replace the matrix first: a crash in between leaves a shape mismatch,
+    # which load_cache() rejects
+    os.replace(tmp_encodings, encodings_path)
+    os.replace(tmp_meta, meta_path)
+
+
+def merge_changes(cached, changed, current_ids):
+    """
+    Apply changed rows and deletions to the cached gallery.
+    Returns (ids, names, encodings, watermark, dirty).
+    """
+    alive = set(current_ids) if current_ids is not None else None
+    # The overlap can return a row twice: the last copy wins
+    changed = list({employee['id']: employee for employee in changed}.values())
+    if alive is not None:
+        changed = [employee for employee in changed if employee['id'] in alive]
+    changed_ids = {employee['id'] for employee in changed}
+
+    keep = [
+        row for row, employee_id in enumerate(cached["ids"])
+        if employee_id not in changed_ids and (alive is None or employee_id in alive)
+    ]
+
+    watermark = cached["watermark"]
+    for employee in changed:
+        updated_at = employee.get('updated_at')
+        if updated_at and (watermark is None or updated_at > watermark):
+            watermark = updated_at
+
+    if not changed and len(keep) == len(cached["ids"]):
+        # Nothing changed: keep the memory-mapped matrix as is (zero copy)
+        return cached["ids"], cached["names"], cached["encodings"], watermark, False
+
+    encodings = np.empty((len(keep) + len(changed), ENCODING_DIM), dtype=np.float32)
+    encodings[:len(keep)] = cached["encodings"][keep]
+    for row, employee in enumerate(changed, start=len(keep)):
+        encodings[row] = employee['encoding']
+
+    ids = [cached["ids"][row] for row in keep] + [employee['id'] for employee in changed]
+    names = [cached["names"][row] for row in keep] + [employee['name'] for employee in changed]
+
+    return ids, names, encodings, watermark, True
+
+
+def load_gallery(cache_dir=CACHE_DIR, index_backend=None):
+    """
+    Build the FaceGallery for the recognizer.
+    Only rows changed since the cached `updated_at` watermark are downloaded;
+    if the database is unreachable the cached gallery is used as is.
+    Returns (gallery, watermark) so a GallerySync can continue from there.
+    """
+    cached = load_cache(cache_dir) or {
+        "ids": [],
+        "names": [],
+        "encodings": np.empty((0, ENCODING_DIM), dtype=np.float32),
+        "watermark": None,
+    }
+
+    try:
+        changed = get_employees_updated_since(overlap_since(cached["watermark"]))
+        if cached["watermark"]:
+            current_ids = get_employee_ids()
+        else:
+            # A full download already is the complete list of employees
+            current_ids = [employee['id'] for employee in changed]
+    except Exception as e:
+        if not cached["ids"]:
+            raise
+        print(f"⚠️ Database unreachable ({e}), using cached gallery.")
+        gallery = FaceGallery(cached["ids"], cached["names"], cached["encodings"], index_backend=index_backend)
+        return gallery, cached["watermark"]
+
+    ids, names, encodings, watermark, dirty = merge_changes(cached, changed, current_ids)
+    print(f"ℹ️  Gallery sync: {len(changed)} new/updated, {len(ids)} total.")
+
+    if dirty:
+        # Release the old memory map before its file gets replaced (Windows)
+        cached["encodings"] = None
+        try:
+            save_cache(ids, names, encodings, watermark, cache_dir)
+        except Exception as e:
+            print(f"⚠️ Could not write gallery cache: {e}")
+
+    return FaceGallery(ids, names, encodings, index_backend=index_backend), watermark
+
+
+def load_cached_gallery(cache_dir=CACHE_DIR, index_backend=None):
+    """
+    Gallery from the local cache only (no network, memory-mapped).
+    Returns (gallery, watermark); the gallery is empty if there is no cache.
+    Used to start the camera immediately while a GallerySync fills in changes.
+    """
+    cached = load_cache(cache_dir)
+    if cached is None:
+        return FaceGallery(index_backend=index_backend), None
+
+    gallery = FaceGallery(cached["ids"], cached["names"], cached["encodings"], index_backend=index_backend)
+    return gallery, cached["watermark"]
+
+
+def save_gallery_cache(gallery, watermark, cache_dir=CACHE_DIR):
+    """Persist the live rows of a running gallery"""
+    ids, names, encodings = gallery.live_rows()
+    save_cache(ids, names, encodings, watermark, cache_dir)
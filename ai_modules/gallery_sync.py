@@ -0,0 +1,139 @@
+# name file: ai_modules/gallery_sync.py
+import os
+import sys
+import threading
+import time
+
+# Add project path for database modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database_modules.employee_crud import iter_gallery_pages, get_employee_ids
+from ai_modules.gallery_cache import save_gallery_cache, overlap_since
+
+# Seconds between two polls of the employees table
+GALLERY_SYNC_INTERVAL = float(os.environ.get("GALLERY_SYNC_INTERVAL", "30"))
+
+
+class GallerySync(threading.Thread):
+    """
+    Background thread that keeps a running FaceGallery up to date.
+    Polls `employees` for rows changed since the last `updated_at` watermark
+    (minus GALLERY_SYNC_OVERLAP_SECONDS, so late commits are not missed)
+    and for deleted ids, and applies them as deltas (no full reload).
+    Changed rows are streamed page by page, so with initial_sync=True an
+    empty or stale gallery fills in while the camera is already running.
+    Rows added locally through remember() are only removed again once a
+    deleted-ids poll that started after them no longer lists them.
+    """
+
+    def __init__(self, gallery, watermark=None, interval=GALLERY_SYNC_INTERVAL,
+                 initial_sync=False, cache_dir=None):
+        super().__init__(name="GallerySync", daemon=True)
+        self.gallery = gallery
+        self.watermark = watermark
+        self.interval = interval
+        self.initial_sync = initial_sync
+        self.cache_dir = cache_dir
+        self._stop_event = threading.Event()
+        self._sync_lock = threading.Lock()
+        # {id: updated_at} applied inside the overlap window (skipped when read again)
+        self._applied = {}
+        # {id: time.time()} of rows added through remember(), until a later poll covers them
+        self._remembered = {}
+        self._remembered_lock = threading.Lock()
+
+    def remember(self, employees):
+        """Add just-enrolled employees ({"id", "name", "encoding"}) ahead of the next poll"""
+        with self._remembered_lock:
+            now = time.time()
+            for employee in employees:
+                self._remembered[employee['id']] = now
+        self.gallery.apply_changes(upserts=employees)
+
+    def forget(self, employee_id):
+        """Drop a deleted employee ahead of the next poll"""
+        with self._remembered_lock:
+            self._remembered.pop(employee_id, None)
+        self.gallery.remove(employee_id)
+
+    def sync_once(self, removals=True):
+        """
+        Fetch and apply one delta. Returns (upserted, removed) counts.
+        removals=False only pulls new/changed rows (one indexed query when
+        nothing changed) and leaves the deleted-ids poll to the next round.
+        Safe to call from other threads while the sync thread runs.
+        """
+        with self._sync_lock:
+            return self._sync(removals)
+
+    def _sync(self, removals):
+        watermark = self.watermark
+        upserted = 0
+
+        for page in iter_gallery_pages(updated_since=overlap_since(self.watermark)):
+            changed = [
+                employee for employee in page
+                if employee.get('updated_at') is None or self._applied.get(employee['id']) != employee['updated_at']
+            ]
+            if changed:
+                self.gallery.apply_changes(upserts=changed)
+                upserted += len(changed)
+
+            # Advance only to rows actually seen, never to the local clock
+            for employee in changed:
+                updated_at = employee.get('updated_at')
+                self._applied[employee['id']] = updated_at
+                if updated_at and (watermark is None or updated_at > watermark):
+                    watermark = updated_at
+
+            if self._stop_event.is_set():
+                return upserted, 0
+
+        removed = []
+        if removals:
+            fetch_started = time.time()
+            current_ids = set(get_employee_ids())
+            with self._remembered_lock:
+                # Rows remembered after the fetch began may be missing from it
+                recent = {employee_id for employee_id, added in self._remembered.items() if added >= fetch_started}
+                self._remembered = {employee_id: self._remembered[employee_id] for employee_id in recent}
+            removed = [
+                employee_id for employee_id in self.gallery.employee_ids()
+                if employee_id not in current_ids and employee_id not in recent
+            ]
+            if removed:
+                self.gallery.apply_changes(removed_ids=removed)
+
+        # Only advance once the whole delta is applied (a failed sync is simply redone)
+        self.watermark = watermark
+        floor = overlap_since(watermark)
+        self._applied = {
+            employee_id: updated_at for employee_id, updated_at in self._applied.items()
+            if updated_at and floor and updated_at >= floor
+        }
+
+        if upserted or removed:
+            print(f"🔄 Gallery updated: {upserted} new/changed, {len(removed)} removed, {len(self.gallery)} total.")
+            if self.cache_dir:
+                try:
+                    save_gallery_cache(self.gallery, self.watermark, self.cache_dir)
+                except Exception as e:
+                    print(f"⚠️ Could not write gallery cache: {e}")
+
+        return upserted, len(removed)
+
+    def _sync_safely(self):
+        try:
+            self.sync_once()
+        except Exception as e:
+            # Network hiccup: keep the current gallery and retry next round
+            print(f"⚠️ Gallery sync failed: {e}")
+
+    def run(self):
+        if self.initial_sync:
+            self._sync_safely()
+        while not self._stop_event.wait(self.interval):
+            self._sync_safely()
+
+    def stop(self):
+        self._stop_event.set()
@@ -0,0 +1,193 @@
+# name file: ai_modules/group_scan.py
+import os
+import time
+from concurrent.futures import as_completed
+
+import cv2
+import numpy as np
+import face_recognition
+
+from .face_gallery import DEFAULT_TOLERANCE
+from .worker_pool import FACE_WORKERS, get_face_pool
+
+# Photos up to this size (longest side) are scanned in one piece
+GROUP_SCAN_SINGLE_PASS_SIDE = int(os.environ.get("GROUP_SCAN_SINGLE_PASS_SIDE", "1600"))
+# Larger photos get a coarse whole-photo pass at that size (large faces)
+# plus a detail pass over overlapping tiles (small faces). The overlap must
+# be larger than the biggest face the coarse pass can miss.
+GROUP_SCAN_TILE_SIZE = int(os.environ.get("GROUP_SCAN_TILE_SIZE", "800"))
+GROUP_SCAN_TILE_OVERLAP = int(os.environ.get("GROUP_SCAN_TILE_OVERLAP", "200"))
+# The detail pass never runs above this resolution (longest side)
+GROUP_SCAN_MAX_SIDE = int(os.environ.get("GROUP_SCAN_MAX_SIDE", "4096"))
+# HOG upsampling inside tiles: 1 finds faces down to ~40px, but is ~4x slower
+GROUP_SCAN_TILE_UPSAMPLE = int(os.environ.get("GROUP_SCAN_TILE_UPSAMPLE", "0"))
+
+# Duplicate detections (tile overlaps, both passes) are merged when their
+# IoU, or the share of the smaller box covered by the larger, exceeds these
+NMS_IOU_THRESHOLD = 0.4
+NMS_CONTAINMENT_THRESHOLD = 0.6
+
+# Context kept around each face crop sent to encoding (share of the box size)
+CROP_MARGIN = 0.5
+
+
+def detect_tile(rgb_tile, upsample):
+    """Worker-process stage: HOG detection on one tile"""
+    return face_recognition.face_locations(rgb_tile, number_of_times_to_upsample=upsample)
+
+
+def encode_crops(crops):
+    """Worker-process stage: encodings for [(face crop, box inside the crop)]"""
+    return [face_recognition.face_encodings(crop, [box])[0] for crop, box in crops]
+
+
+def tile_origins(height, width, size=GROUP_SCAN_TILE_SIZE, overlap=GROUP_SCAN_TILE_OVERLAP):
+    """Top-left corners of overlapping tiles covering the whole image"""
+    step = max(size - overlap, 1)
+
+    def starts(length):
+        points = list(range(0, max(length - size, 0) + 1, step))
+        if points[-1] + size < length:
+            points.append(length - size)
+        return points
+
+    return [(y, x) for y in starts(height) for x in starts(width)]
+
+
+def merge_detections(boxes):
+    """
+    Non-max suppression for (top, right, bottom, left) boxes.
+    Larger boxes win: a face cut by a tile edge is smaller than the same
+    face found whole in the neighbouring tile or in the coarse pass.
+    """
+    if not boxes:
+        return []
+
+    b = np.asarray(boxes, dtype=np.float64)
+    areas = (b[:, 2] - b[:, 0]) * (b[:, 1] - b[:, 3])
+    kept = []
+
+    for i in np.argsort(-areas):
+        if kept:
+            k = np.asarray(kept)
+            inter = (np.clip(np.minimum(b[k, 2], b[i, 2]) - np.maximum(b[k, 0], b[i, 0]), 0, None) *
+                     np.clip(np.minimum(b[k, 1], b[i, 1]) - np.maximum(b[k, 3], b[i, 3]), 0, None))
+            iou = inter / (areas[k] + areas[i] - inter)
+            covered = inter / max(areas[i], 1.0)
+            if np.any(iou > NMS_IOU_THRESHOLD) or np.any(covered > NMS_CONTAINMENT_THRESHOLD):
+                continue
+        kept.append(i)
+
+    return [tuple(int(round(v)) for v in b[i]) for i in kept]
+
+
+def _detection_jobs(rgb, pool):
+    """Submit the detection passes; returns [(future, scale, offset_y, offset_x)]"""
+    height, width = rgb.shape[:2]
+    long_side = max(height, width)
+
+    if long_side <= GROUP_SCAN_SINGLE_PASS_SIDE:
+        # Small photo: one pass, upsampled once like face_locations' default
+        return [(pool.submit(detect_tile, rgb, 1), 1.0, 0, 0)]
+
+    jobs = []
+
+    # Coarse pass: the whole photo, shrunk
+    coarse = GROUP_SCAN_SINGLE_PASS_SIDE / long_side
+    small = cv2.resize(rgb, (0, 0), fx=coarse, fy=coarse, interpolation=cv2.INTER_AREA)
+    jobs.append((pool.submit(detect_tile, small, 0), coarse, 0, 0))
+
+    # Detail pass: overlapping tiles at (up to) full resolution
+    fine = min(1.0, GROUP_SCAN_MAX_SIDE / long_side)
+    detail = rgb if fine == 1.0 else cv2.resize(rgb, (0, 0), fx=fine, fy=fine, interpolation=cv2.INTER_AREA)
+    size = GROUP_SCAN_TILE_SIZE
+    for y, x in tile_origins(*detail.shape[:2]):
+        tile = np.ascontiguousarray(detail[y:y + size, x:x + size])
+        jobs.append((pool.submit(detect_tile, tile, GROUP_SCAN_TILE_UPSAMPLE), fine, y, x))
+
+    return jobs
+
+
+def _crop(rgb, box):
+    """Face crop with some context, and the box in crop coordinates"""
+    top, right, bottom, left = box
+    margin = int(max(bottom - top, right - left) * CROP_MARGIN)
+    y0, x0 = max(top - margin, 0), max(left - margin, 0)
+    y1, x1 = min(bottom + margin, rgb.shape[0]), min(right + margin, rgb.shape[1])
+    crop = np.ascontiguousarray(rgb[y0:y1, x0:x1])
+    return crop, (top - y0, right - x0, bottom - y0, left - x0)
+
+
+def scan_group_photo(rgb, gallery, tolerance=DEFAULT_TOLERANCE, pool=None, progress=None):
+    """
+    Find and identify every face in a (large) group photo.
+    detect: coarse + tiled passes in parallel worker processes
+    merge:  non-max suppression across tiles and passes
+    encode: face crops split across the workers
+    match:  one vectorized gallery call for all faces
+    progress: optional callback(stage, fraction done 0..1)
+    Returns {"faces": [{"box", "employee_id", "name", "distance"}],
+             "timings": {stage: milliseconds}, "tiles": passes run}
+    """
+    pool = pool or get_face_pool()
+    report = progress or (lambda stage, fraction: None)
+    timings = {}
+    start = time.perf_counter()
+
+    # 1. Detection
+    report("detect", 0.0)
+    jobs = {future: (scale, offset_y, offset_x) for future, scale, offset_y, offset_x in _detection_jobs(rgb, pool)}
+    boxes = []
+    for done, future in enumerate(as_completed(jobs), 1):
+        scale, offset_y, offset_x = jobs[future]
+        for top, right, bottom, left in future.result():
+            boxes.append((
+                (top + offset_y) / scale, (right + offset_x) / scale,
+                (bottom + offset_y) / scale, (left + offset_x) / scale,
+            ))
+        report("detect", 0.75 * done / len(jobs))
+    timings['detect'] = (time.perf_counter() - start) * 1000
+
+    # 2. Merge
+    step = time.perf_counter()
+    boxes = merge_detections(boxes)
+    timings['merge'] = (time.perf_counter() - step) * 1000
+
+    # 3. Encode (one chunk of crops per worker)
+    step = time.perf_counter()
+    crops = [_crop(rgb, box) for box in boxes]
+    chunk = max(1, -(-len(crops) // max(1, FACE_WORKERS)))
+    futures = [pool.submit(encode_crops, crops[i:i + chunk]) for i in range(0, len(crops), chunk)]
+    encodings = []
+    for done, future in enumerate(futures, 1):
+        encodings.extend(future.result())
+        report("encode", 0.75 + 0.2 * done / len(futures))
+    timings['encode'] = (time.perf_counter() - step) * 1000
+
+    # 4. Match
+    step = time.perf_counter()
+    matches = gallery.identify(encodings, tolerance=tolerance)
+    timings['match'] = (time.perf_counter() - step) * 1000
+    timings['total'] = (time.perf_counter() - start) * 1000
+    report("match", 1.0)
+
+    faces = [
+        {"box": box, "employee_id": employee_id, "name": name, "distance": distance}
+        for box, (employee_id, name, distance) in zip(boxes, matches)
+    ]
+    return {"faces": faces, "timings": timings, "tiles": len(jobs)}
+
+
+def annotate_faces(bgr, faces):
+    """Draw boxes (green = known, red = unknown) and names onto a BGR image"""
+    # Scale line and text with the photo so they stay readable on 12 MP images
+    thickness = max(2, max(bgr.shape[:2]) // 800)
+    font_scale = 0.6 * thickness / 2
+
+    for face in faces:
+        top, right, bottom, left = face['box']
+        color = (0, 255, 0) if face['employee_id'] is not None else (0, 0, 255)
+        cv2.rectangle(bgr, (left, top), (right, bottom), color, thickness)
+        cv2.putText(bgr, face['name'], (left, bottom + int(20 * thickness / 2)),
+                    cv2.FONT_HERSHEY_DUPLEX, font_scale, (255, 255, 255), max(1, thickness // 2))
+    return bgr
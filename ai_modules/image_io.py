@@ -0,0 +1,38 @@
+# name file: ai_modules/image_io.py
+import base64
+import binascii
+
+import cv2
+import numpy as np
+
+
+def decode_image_bytes(data, max_side=None):
+    """
+    Encoded image bytes (JPEG/PNG/...) -> BGR array, without touching disk.
+    When max_side is given, larger images are shrunk so their longest
+    side fits (aspect ratio kept). Raises ValueError for unreadable data.
+    """
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    image = cv2.imdecode(buffer, cv2.IMREAD_COLOR) if buffer.size else None
+    if image is None:
+        raise ValueError("not a readable image")
+
+    if max_side:
+        scale = max_side / max(image.shape[:2])
+        if scale < 1:
+            image = cv2.resize(image, (0, 0), fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    return image
+
+
+def decode_image_rgb(data, max_side=None):
+    """Same as decode_image_bytes() but RGB, as face_recognition expects"""
+    return cv2.cvtColor(decode_image_bytes(data, max_side), cv2.COLOR_BGR2RGB)
+
+
+def data_url_bytes(data_url):
+    """Encoded image bytes of a "data:image/jpeg;base64,..." webcam capture"""
+    _, _, encoded = data_url.partition(",")
+    try:
+        return base64.b64decode(encoded or data_url, validate=False)
+    except (binascii.Error, ValueError):
+        raise ValueError("invalid base64 image")
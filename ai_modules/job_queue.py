@@ -0,0 +1,75 @@
+# name file: ai_modules/job_queue.py
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobQueue:
+    """
+    In-memory background jobs for the web app.
+    submit() returns a job id at once and a small thread pool calls
+    _run(job_id, *args) (implemented by subclasses), which reports its
+    stage and progress (0-100) through _update(). get() returns a snapshot
+    for polling. Finished jobs are forgotten after keep_seconds.
+    Jobs are per web process and lost on restart.
+    """
+
+    def __init__(self, threads, max_pending, keep_seconds, name="Job"):
+        self.max_pending = max_pending
+        self.keep_seconds = keep_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max(1, threads), thread_name_prefix=name)
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, *args):
+        """Queue a job. Returns the job id, or None if too many jobs are pending."""
+        with self._lock:
+            self._prune()
+            pending = sum(1 for job in self._jobs.values() if job['status'] in ("queued", "running"))
+            if pending >= self.max_pending:
+                return None
+
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {
+                "id": job_id,
+                "status": "queued",
+                "stage": "queued",
+                "progress": 0,
+                "created": time.time(),
+                "finished": None,
+                "error": None,
+                "result": None,
+            }
+
+        self._executor.submit(self._run, job_id, *args)
+        return job_id
+
+    def get(self, job_id):
+        """Snapshot of a job (dict), or None if unknown or expired"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job:
+                job.update(fields)
+
+    def _prune(self):
+        """Forget finished jobs older than keep_seconds (caller holds the lock)"""
+        cutoff = time.time() - self.keep_seconds
+        for job_id, job in list(self._jobs.items()):
+            if job['finished'] and job['finished'] < cutoff:
+                del self._jobs[job_id]
+                self._discard(job)
+
+    def _discard(self, job):
+        """Hook: clean up what an expired job left behind (files etc.)"""
+
+    def _run(self, job_id, *args):
+        raise NotImplementedError
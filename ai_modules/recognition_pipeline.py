@@ -0,0 +1,315 @@
+# name file: ai_modules/recognition_pipeline.py
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import face_recognition
+
+from .face_gallery import DEFAULT_TOLERANCE
+from .face_tracker import FaceTracker
+
+# Detection + encoding workers (one per Pi 4 core by default)
+PIPELINE_WORKERS = int(os.environ.get("PIPELINE_WORKERS", str(os.cpu_count() or 4)))
+
+# Frames are shrunk before HOG detection (boxes are scaled back for display)
+FRAME_SCALE = 0.25
+
+# Recognized faces waiting for the (slow, networked) attendance callback
+MATCH_QUEUE_SIZE = 64
+
+
+def detect_faces(rgb_small_frame):
+    """Worker-process stage: HOG detection on one small frame"""
+    return face_recognition.face_locations(rgb_small_frame)
+
+
+def encode_faces(rgb_small_frame, face_locations):
+    """Worker-process stage: dlib encodings for the given face boxes only"""
+    return face_recognition.face_encodings(rgb_small_frame, face_locations)
+
+
+class StageStats:
+    """Thread-safe per-stage counters, reported as items/second"""
+
+    def __init__(self, stages):
+        self._lock = threading.Lock()
+        self._counts = {stage: 0 for stage in stages}
+        self._since = time.perf_counter()
+
+    def tick(self, stage, count=1):
+        with self._lock:
+            self._counts[stage] = self._counts.get(stage, 0) + count
+
+    def rates(self):
+        """Items/second per stage since the previous call"""
+        with self._lock:
+            now = time.perf_counter()
+            elapsed = max(now - self._since, 1e-6)
+            rates = {stage: count / elapsed for stage, count in self._counts.items()}
+            self._counts = {stage: 0 for stage in self._counts}
+            self._since = now
+        return rates
+
+    def summary(self):
+        return " | ".join(f"{stage}: {rate:.1f}/s" for stage, rate in self.rates().items())
+
+
+class FrameGrabber(threading.Thread):
+    """Reads the camera as fast as it delivers and keeps only the newest frame"""
+
+    def __init__(self, camera, stats, gate=None):
+        super().__init__(name="FrameGrabber", daemon=True)
+        self.camera = camera
+        self.stats = stats
+        self.gate = gate
+        self.failed = False
+        self._lock = threading.Lock()
+        self._new_frame = threading.Condition(self._lock)
+        self._frame = None
+        self._frame_id = 0
+        self._running = True
+
+    def run(self):
+        while self._running:
+            ret, frame = self.camera.read()
+            if not ret:
+                self.failed = True
+                break
+
+            with self._new_frame:
+                self._frame = frame
+                self._frame_id += 1
+                self._new_frame.notify_all()
+            self.stats.tick("capture")
+
+            # Idle mode: read the camera less often until motion appears
+            if self.gate is not None:
+                delay = self.gate.capture_delay()
+                if delay:
+                    time.sleep(delay)
+
+        with self._new_frame:
+            self._new_frame.notify_all()
+
+    def latest(self):
+        with self._lock:
+            return self._frame_id, self._frame
+
+    def wait_newer(self, frame_id, timeout=0.5):
+        """Block until a frame newer than frame_id exists (or timeout)"""
+        with self._new_frame:
+            self._new_frame.wait_for(lambda: self._frame_id > frame_id or not self.is_alive(), timeout)
+            return self._frame_id, self._frame
+
+    def stop(self):
+        self._running = False
+
+
+class RecognitionPipeline:
+    """
+    capture -> detect -> track -> encode -> match -> attendance, each stage decoupled:
+    - FrameGrabber thread always holds the newest camera frame
+    - an optional motion gate skips detection on unchanged frames and
+      slows capture down while the scene is idle
+    - a dispatcher feeds the newest frame to a process pool, with at most
+      one frame in flight per worker (stale frames are skipped, not queued)
+    - detections are associated with tracks; only new tracks, tracks still
+      voting and tracks due for a refresh are encoded
+    - encodings are handed to a matcher thread, which searches the gallery
+      (the pool's callback thread must not block on it)
+    - a track's identity is reported once, after enough agreeing votes,
+      through a bounded queue to the attendance thread
+    Display reads latest_frame()/latest_faces() and never waits on recognition.
+    """
+
+    def __init__(self, camera, gallery, on_match, workers=PIPELINE_WORKERS, tolerance=DEFAULT_TOLERANCE, gate=None):
+        self.gallery = gallery
+        self.on_match = on_match
+        self.workers = max(1, workers)
+        self.tolerance = tolerance
+        self.stats = StageStats(["capture", "gated", "detect", "encode", "attendance", "display"])
+        self.tracker = FaceTracker()
+        self.gate = gate
+
+        self.grabber = FrameGrabber(camera, self.stats, gate)
+        self._pool = None
+        self._slots = threading.BoundedSemaphore(self.workers)
+        # Encoded faces waiting for the gallery search; at most a few
+        # batches since encode jobs are limited by the worker slots
+        self._encoded_queue = queue.Queue()
+        self._match_queue = queue.Queue(maxsize=MATCH_QUEUE_SIZE)
+        self._result_lock = threading.Lock()
+        self._detected_frame_id = 0
+        self._faces = []
+        self._running = False
+        self._threads = []
+
+    @property
+    def failed(self):
+        return self.grabber.failed
+
+    def start(self):
+        self._running = True
+        self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        self.grabber.start()
+        self._threads = [
+            threading.Thread(target=self._dispatch_loop, name="Dispatcher", daemon=True),
+            threading.Thread(target=self._match_loop, name="Matcher", daemon=True),
+            threading.Thread(target=self._attendance_loop, name="Attendance", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self._running = False
+        self.grabber.stop()
+        self._encoded_queue.put(None)
+        self._match_queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout=2)
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        self.grabber.join(timeout=2)
+
+    def latest_frame(self):
+        return self.grabber.latest()
+
+    def latest_faces(self):
+        """[(top, right, bottom, left), name] of the newest recognized frame, full-size coordinates"""
+        with self._result_lock:
+            return list(self._faces)
+
+    def _dispatch_loop(self):
+        last_id = 0
+        while self._running and not self.grabber.failed:
+            frame_id, frame = self.grabber.wait_newer(last_id)
+            if frame is None or frame_id == last_id:
+                continue
+
+            # Wait for a free worker; meanwhile newer frames replace this one
+            if not self._slots.acquire(timeout=0.5):
+                continue
+            frame_id, frame = self.grabber.latest()
+            last_id = frame_id
+
+            try:
+                small_frame = cv2.resize(frame, (0, 0), fx=FRAME_SCALE, fy=FRAME_SCALE)
+
+                if self.gate is not None and not self.gate.should_detect(small_frame, bool(self.tracker.tracks)):
+                    # Empty, unchanged scene: skip detection entirely
+                    self._slots.release()
+                    self.stats.tick("gated")
+                    self._clear_faces(frame_id)
+                    continue
+
+                rgb_small_frame = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
+                future = self._pool.submit(detect_faces, rgb_small_frame)
+            except Exception as e:
+                self._slots.release()
+                if self._running:
+                    print(f"⚠️ Pipeline dispatch error: {e}")
+                continue
+
+            future.add_done_callback(lambda f, fid=frame_id, rgb=rgb_small_frame: self._on_detected(fid, rgb, f))
+
+    def _clear_faces(self, frame_id):
+        """A gated frame has no faces: let tracks age out and clear the overlay"""
+        with self._result_lock:
+            if frame_id > self._detected_frame_id:
+                self._detected_frame_id = frame_id
+                self.tracker.update([])
+                self._faces = []
+
+    def _on_detected(self, frame_id, rgb_small_frame, future):
+        # The frame keeps its worker slot while its faces are encoded, so
+        # detect + encode jobs in flight never exceed the number of workers
+        # (this runs on the pool's callback thread, which must not block)
+        if not self._detected(frame_id, rgb_small_frame, future):
+            self._slots.release()
+
+    def _detected(self, frame_id, rgb_small_frame, future):
+        """Track the faces of a frame. Returns True if an encode job took over its slot."""
+        try:
+            face_locations = future.result()
+        except Exception as e:
+            if self._running:
+                print(f"⚠️ Detection error: {e}")
+            return False
+        self.stats.tick("detect")
+
+        with self._result_lock:
+            # Workers can finish out of order: never go back to an older frame
+            if frame_id <= self._detected_frame_id:
+                return False
+            self._detected_frame_id = frame_id
+
+            tracks, to_encode = self.tracker.update(face_locations)
+
+            scale = int(round(1 / FRAME_SCALE))
+            self._faces = [
+                (tuple(v * scale for v in track.box), track.name if track.confirmed else "Unknown")
+                for track in tracks
+            ]
+
+        if not to_encode:
+            return False
+
+        track_ids = [track.track_id for track in to_encode]
+        try:
+            encode_future = self._pool.submit(encode_faces, rgb_small_frame, [track.box for track in to_encode])
+        except Exception as e:
+            self.tracker.release(track_ids)
+            if self._running:
+                print(f"⚠️ Pipeline dispatch error: {e}")
+            return False
+
+        encode_future.add_done_callback(lambda f: self._on_encoded(track_ids, f))
+        return True
+
+    def _on_encoded(self, track_ids, future):
+        self._slots.release()
+        try:
+            face_encodings = future.result()
+        except Exception as e:
+            self.tracker.release(track_ids)
+            if self._running:
+                print(f"⚠️ Encoding error: {e}")
+            return
+        self.stats.tick("encode", len(face_encodings))
+        self._encoded_queue.put((track_ids, face_encodings))
+
+    def _match_loop(self):
+        while True:
+            item = self._encoded_queue.get()
+            if item is None:
+                break
+            track_ids, face_encodings = item
+            try:
+                # Match every new face with one matrix operation, then vote per track
+                matches = self.gallery.identify(face_encodings, tolerance=self.tolerance)
+            except Exception as e:
+                self.tracker.release(track_ids)
+                if self._running:
+                    print(f"⚠️ Matching error: {e}")
+                continue
+
+            for track in self.tracker.add_results(track_ids, matches):
+                try:
+                    self._match_queue.put_nowait((track.employee_id, track.name))
+                except queue.Full:
+                    # Attendance stage is behind; retry on the next vote
+                    self.tracker.unreport(track.track_id)
+
+    def _attendance_loop(self):
+        while True:
+            item = self._match_queue.get()
+            if item is None:
+                break
+            try:
+                self.on_match(*item)
+            except Exception as e:
+                print(f"⚠️ Attendance error: {e}")
+            self.stats.tick("attendance")
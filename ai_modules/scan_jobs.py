@@ -0,0 +1,112 @@
+# name file: ai_modules/scan_jobs.py
+import datetime
+import os
+import sys
+import time
+
+import cv2
+
+# Add project path for database modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database_modules.attendance_logger import mark_attendance_batch
+from ai_modules.face_gallery import DEFAULT_TOLERANCE
+from ai_modules.group_scan import scan_group_photo, annotate_faces
+from ai_modules.image_io import decode_image_bytes
+from ai_modules.job_queue import JobQueue
+from ai_modules.shared_gallery import get_shared_gallery
+
+# Scans running at the same time (the heavy work itself runs in the face worker pool)
+SCAN_JOB_THREADS = int(os.environ.get("SCAN_JOB_THREADS", "2"))
+# Queued + running scans; further uploads are refused until one finishes
+SCAN_JOB_MAX_PENDING = int(os.environ.get("SCAN_JOB_MAX_PENDING", "20"))
+# Finished jobs (and their annotated photos) are forgotten after this long
+SCAN_JOB_KEEP_SECONDS = int(os.environ.get("SCAN_JOB_KEEP_SECONDS", "3600"))
+
+
+class ScanJobQueue(JobQueue):
+    """
+    Background HR group scans.
+    submit(image_bytes) stores nothing but the upload and returns a job id
+    at once; a small thread pool decodes, scans (tiles in the face worker
+    pool), marks attendance with one batched write per job and saves the
+    annotated photo. get() returns the job's status, stage and progress
+    (0-100) for polling, and its result once done.
+    """
+
+    def __init__(self, output_dir, threads=SCAN_JOB_THREADS, max_pending=SCAN_JOB_MAX_PENDING,
+                 keep_seconds=SCAN_JOB_KEEP_SECONDS, tolerance=DEFAULT_TOLERANCE):
+        super().__init__(threads, max_pending, keep_seconds, name="ScanJob")
+        self.output_dir = output_dir
+        self.tolerance = tolerance
+
+    def _discard(self, job):
+        image = (job['result'] or {}).get('image')
+        if image:
+            try:
+                os.remove(os.path.join(self.output_dir, image))
+            except OSError:
+                pass
+
+    def _run(self, job_id, image_bytes):
+        start = time.perf_counter()
+        try:
+            self._update(job_id, status="running", stage="decode", progress=2)
+            bgr = decode_image_bytes(image_bytes)
+            rgb = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
+            decode_ms = (time.perf_counter() - start) * 1000
+
+            try:
+                gallery = get_shared_gallery()
+            except Exception as e:
+                # Scanning against an empty gallery would report everyone as unknown
+                raise RuntimeError(f"could not load the employees' faces: {e}") from e
+
+            # Scan progress maps to 5-90%
+            def progress(stage, fraction):
+                self._update(job_id, stage=stage, progress=5 + int(85 * fraction))
+
+            scan = scan_group_photo(rgb, gallery, tolerance=self.tolerance, progress=progress)
+            timings = {'decode': decode_ms, **scan['timings']}
+
+            # One batched attendance write for everyone recognized in the photo
+            self._update(job_id, stage="attendance", progress=90)
+            step = time.perf_counter()
+            recognized = [face for face in scan['faces'] if face['employee_id'] is not None]
+            newly_marked = mark_attendance_batch([face['employee_id'] for face in recognized])
+            timings['attendance'] = (time.perf_counter() - step) * 1000
+
+            self._update(job_id, stage="annotate", progress=95)
+            step = time.perf_counter()
+            annotate_faces(bgr, scan['faces'])
+            image_name = f"result_{datetime.datetime.now().strftime('%H%M%S')}_{job_id[:8]}.jpg"
+            cv2.imwrite(os.path.join(self.output_dir, image_name), bgr)
+            timings['annotate'] = (time.perf_counter() - step) * 1000
+
+            present = []
+            seen = set()
+            for face in recognized:
+                if face['employee_id'] in seen:
+                    continue
+                seen.add(face['employee_id'])
+                present.append({
+                    "employee_id": face['employee_id'],
+                    "name": face['name'],
+                    "newly_marked": newly_marked is not None and face['employee_id'] in newly_marked,
+                })
+
+            result = {
+                "image": image_name,
+                "present": present,
+                "faces_found": len(scan['faces']),
+                "tiles": scan['tiles'],
+                "attendance_saved": newly_marked is not None,
+                "timings": timings,
+            }
+            self._update(job_id, status="done", stage="done", progress=100, result=result, finished=time.time())
+            print(f"📸 Group scan {job_id[:8]}: {len(scan['faces'])} faces, {len(present)} known, "
+                  + ", ".join(f"{stage} {ms:.0f}ms" for stage, ms in timings.items()))
+
+        except Exception as e:
+            print(f"❌ Group scan {job_id[:8]} failed: {e}")
+            self._update(job_id, status="failed", error=str(e), finished=time.time())
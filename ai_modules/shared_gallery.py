@@ -0,0 +1,50 @@
+# name file: ai_modules/shared_gallery.py
+import threading
+
+from .gallery_cache import load_cached_gallery, CACHE_DIR
+from .gallery_sync import GallerySync
+
+_sync = None
+_lock = threading.Lock()
+
+
+def get_shared_gallery(refresh=True):
+    """
+    Process-wide FaceGallery for the web app (duplicate checks, HR scans).
+    Built once from the local cache plus the rows changed since, then kept
+    current by a background GallerySync. With refresh=True rows changed
+    since the last sync are pulled first (a single indexed query), so an
+    employee enrolled a moment ago is already searchable.
+    Raises on network errors during the first load.
+    """
+    global _sync
+    with _lock:
+        if _sync is None:
+            gallery, watermark = load_cached_gallery()
+            sync = GallerySync(gallery, watermark, cache_dir=CACHE_DIR)
+            sync.sync_once()
+            sync.start()
+            _sync = sync
+            return gallery
+
+    if refresh:
+        try:
+            _sync.sync_once(removals=False)
+        except Exception as e:
+            # Serve the last known gallery; the sync thread retries
+            print(f"⚠️ Gallery refresh failed: {e}")
+    return _sync.gallery
+
+
+def forget_employee(employee_id):
+    """Drop a deleted employee from the shared gallery (no-op if not loaded)"""
+    sync = _sync
+    if sync is not None:
+        sync.forget(employee_id)
+
+
+def remember_employees(employees):
+    """Add just-enrolled employees ({"id", "name", "encoding"}) to the shared gallery (no-op if not loaded)"""
+    sync = _sync
+    if sync is not None and employees:
+        sync.remember(employees)
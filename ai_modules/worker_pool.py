@@ -0,0 +1,20 @@
+# name file: ai_modules/worker_pool.py
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+# Face detection/encoding processes shared by the web app (all cores by
+# default); enrollment photos and group-scan tiles all run here
+FACE_WORKERS = int(os.environ.get("FACE_WORKERS", str(os.cpu_count() or 4)))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_face_pool():
+    """Process-wide pool for CPU-heavy face work, started on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=max(1, FACE_WORKERS))
+        return _pool
@@ -0,0 +1,124 @@
+# name file: benchmarks/bench_attendance_index.py
+"""
+Attendance lookups on a large local (SQLite) table, before and after the
+schema migrations: the "already marked today?" check, marking, the
+newest-first export pages and the dashboard's per-day counts.
+
+Usage:
+    python benchmarks/bench_attendance_index.py --employees 5000 --days 200   # 1M rows
+"""
+import argparse
+import datetime
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database_modules.db_manager import migration_files, migrate_sqlite
+
+
+def build_legacy_table(conn, employees, days, rng):
+    """The original schema (migration 001 only) holding employees x days marks"""
+    version, _, path = migration_files("sqlite")[0]
+    with open(path, encoding="utf-8") as f:
+        conn.executescript(f.read())
+    conn.execute(f"PRAGMA user_version = {version}")
+
+    blob = bytes(512)
+    conn.executemany(
+        "INSERT INTO employees (name, employee_code, face_encoding) VALUES (?, ?, ?)",
+        ((f"Employee {i}", f"E{i:06d}", blob) for i in range(employees))
+    )
+    first = datetime.date(2026, 1, 1) - datetime.timedelta(days=days)
+    dates = [(first + datetime.timedelta(days=d)).isoformat() for d in range(days)]
+    conn.executemany(
+        "INSERT INTO attendance (employee_id, date, time) VALUES (?, ?, ?)",
+        ((employee, date, f"{rng.randint(7, 10):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}")
+         for date in dates for employee in range(1, employees + 1))
+    )
+    conn.commit()
+    return dates
+
+
+def per_call_ms(fn, calls):
+    start = time.perf_counter()
+    for i in range(calls):
+        fn(i)
+    return (time.perf_counter() - start) * 1000 / calls
+
+
+def measure(conn, employees, dates, probes, rng, label):
+    lookups = [(rng.randint(1, employees), rng.choice(dates)) for _ in range(probes)]
+    check = per_call_ms(lambda i: conn.execute(
+        "SELECT 1 FROM attendance WHERE employee_id = ? AND date = ?", lookups[i]).fetchone(), probes)
+
+    feed_sql = ("SELECT a.time, e.name FROM attendance a LEFT JOIN employees e ON e.id = a.employee_id "
+                + ("ORDER BY a.marked_at DESC, a.id DESC LIMIT 10" if label == "after" else
+                   "ORDER BY a.date DESC, a.time DESC, a.id DESC LIMIT 10"))
+    feed = per_call_ms(lambda i: conn.execute(feed_sql).fetchall(), max(1, probes // 100))
+
+    since = dates[-8]
+    counts = per_call_ms(lambda i: conn.execute(
+        "SELECT date, COUNT(*) FROM attendance WHERE date >= ? GROUP BY date", (since,)).fetchall(),
+        max(1, probes // 100))
+
+    print(f"{label:>6} | check {check:9.3f} ms | recent feed {feed:9.3f} ms | 8-day counts {counts:8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--employees", type=int, default=5000)
+    parser.add_argument("--days", type=int, default=200)
+    parser.add_argument("--probes", type=int, default=2000, help="lookups timed after the migrations")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as folder:
+        conn = sqlite3.connect(os.path.join(folder, "bench.db"))
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+
+        start = time.perf_counter()
+        dates = build_legacy_table(conn, args.employees, args.days, rng)
+        rows = conn.execute("SELECT COUNT(*) FROM attendance").fetchone()[0]
+        print(f"📊 Attendance rows: {rows:,} ({args.employees} employees x {args.days} days), "
+              f"built in {time.perf_counter() - start:.1f} s")
+
+        # Table scans: a handful of probes is enough
+        measure(conn, args.employees, dates, max(1, args.probes // 200), rng, "before")
+
+        start = time.perf_counter()
+        migrate_sqlite(conn)
+        print(f"🔧 Migrations applied in {time.perf_counter() - start:.1f} s")
+        conn.execute("ANALYZE")
+
+        measure(conn, args.employees, dates, args.probes, rng, "after")
+
+        # Marking with the unique index: no read-before-write
+        today = "2026-01-01"
+        mark = per_call_ms(lambda i: (conn.execute(
+            "INSERT OR IGNORE INTO attendance (employee_id, date, time) VALUES (?, ?, ?)",
+            (i % args.employees + 1, today, "09:00:00")), conn.commit()), args.probes)
+        print(f"  mark | INSERT OR IGNORE + commit {mark:.3f} ms (repeats skipped by the index)")
+
+        # Newest-first export pages: keyset on (marked_at, id) vs the old OFFSET paging
+        page = 1000
+        deep = rows // 2
+        last = conn.execute("SELECT marked_at, id FROM attendance ORDER BY marked_at DESC, id DESC "
+                            "LIMIT 1 OFFSET ?", (deep,)).fetchone()
+        keyset = per_call_ms(lambda i: conn.execute(
+            "SELECT id, date, time FROM attendance WHERE (marked_at, id) < (?, ?) "
+            "ORDER BY marked_at DESC, id DESC LIMIT ?", (*last, page)).fetchall(), 20)
+        offset = per_call_ms(lambda i: conn.execute(
+            "SELECT id, date, time FROM attendance ORDER BY marked_at DESC, id DESC "
+            "LIMIT ? OFFSET ?", (page, deep)).fetchall(), 3)
+        print(f"export | page of {page} at row {deep:,}: keyset {keyset:.2f} ms | offset {offset:.2f} ms")
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
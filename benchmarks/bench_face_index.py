@@ -0,0 +1,80 @@
+# name file: benchmarks/bench_face_index.py
+"""
+Recall@1 and latency of the approximate face index against exact search.
+
+Usage:
+    python benchmarks/bench_face_index.py --size 50000 --probes 500 --nprobe 4 8 16
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ai_modules.face_gallery import ENCODING_DIM
+from ai_modules.face_index import ExactIndex, IVFIndex
+
+
+def make_gallery(size, rng):
+    """Synthetic unit-norm embeddings (dlib encodings have a norm close to 1)"""
+    encodings = rng.normal(size=(size, ENCODING_DIM)).astype(np.float32)
+    encodings /= np.linalg.norm(encodings, axis=1, keepdims=True)
+    return encodings
+
+
+def make_probes(encodings, count, noise, rng):
+    """New captures of enrolled people: known encoding + capture noise"""
+    rows = rng.choice(len(encodings), count, replace=False)
+    jitter = rng.normal(size=(count, ENCODING_DIM)).astype(np.float32)
+    jitter *= noise / np.linalg.norm(jitter, axis=1, keepdims=True)
+    return encodings[rows] + jitter
+
+
+def timed_search(index, probes, batch):
+    start = time.perf_counter()
+    results = [index.search(probes[i:i + batch], k=1)[0] for i in range(0, len(probes), batch)]
+    elapsed = time.perf_counter() - start
+    return np.concatenate(results)[:, 0], elapsed * 1000 / len(probes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=50000, help="number of enrolled faces")
+    parser.add_argument("--probes", type=int, default=500, help="number of query faces")
+    parser.add_argument("--batch", type=int, default=1, help="faces matched per call (faces per frame)")
+    parser.add_argument("--noise", type=float, default=0.35, help="distance between probe and enrolled face")
+    parser.add_argument("--nlist", type=int, default=0, help="IVF partitions (0 = sqrt(size))")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    encodings = make_gallery(args.size, rng)
+    sq_norms = np.einsum("ij,ij->i", encodings, encodings)
+    probes = make_probes(encodings, args.probes, args.noise, rng)
+
+    print(f"📊 Gallery: {args.size} faces | Probes: {args.probes} | Batch: {args.batch}")
+
+    exact = ExactIndex(encodings, sq_norms)
+    truth, exact_ms = timed_search(exact, probes, args.batch)
+    print(f"{'backend':<16} | {'recall@1':>8} | {'ms/face':>8} | {'speedup':>7}")
+    print("-" * 50)
+    print(f"{'exact':<16} | {1.0:>8.3f} | {exact_ms:>8.3f} | {1.0:>6.1f}x")
+
+    start = time.perf_counter()
+    ivf = IVFIndex(encodings, sq_norms, n_lists=args.nlist, seed=args.seed)
+    build_s = time.perf_counter() - start
+
+    for n_probe in args.nprobe:
+        ivf.n_probe = n_probe
+        found, ivf_ms = timed_search(ivf, probes, args.batch)
+        recall = float(np.mean(found == truth))
+        label = f"ivf nprobe={n_probe}"
+        print(f"{label:<16} | {recall:>8.3f} | {ivf_ms:>8.3f} | {exact_ms / ivf_ms:>6.1f}x")
+
+    print(f"\nℹ️  IVF build: {ivf.n_lists} partitions in {build_s:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
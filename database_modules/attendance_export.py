@@ -0,0 +1,156 @@
+# name file: database_modules/attendance_export.py
+import csv
+import io
+import os
+import zlib
+
+from .storage import get_storage
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional
+    pa = None
+    pq = None
+
+# Attendance rows per request (keep at or below PostgREST's max-rows)
+EXPORT_PAGE_SIZE = int(os.environ.get("EXPORT_PAGE_SIZE", "1000"))
+# Rows per Parquet row group (pages are buffered up to this many)
+PARQUET_ROW_GROUP = 50000
+
+# Department comes last so the original column positions stay unchanged
+EXPORT_HEADER = ['Employee Name', 'ID Code', 'Date', 'Time', 'Status', 'Department']
+
+# format -> (mimetype, file extension)
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "csv.gz": ("application/gzip", "csv.gz"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+def parquet_available():
+    return pq is not None
+
+
+def iter_attendance_pages(date_from=None, date_to=None, department=None, employee_code=None,
+                          employee_id=None, page_size=EXPORT_PAGE_SIZE):
+    """
+    Stream attendance joined with employees, newest first, one page at a time.
+    Keyset pagination on (marked_at, id): every page is an index range
+    scan and PostgREST's max-rows limit never truncates the export.
+    Filters: date range (inclusive, YYYY-MM-DD), department, employee.
+    Raises on network errors.
+    """
+    storage = get_storage()
+    last = None
+    while True:
+        rows = storage.attendance_page(date_from, date_to, department, employee_code, employee_id,
+                                       after=last, limit=page_size)
+        if not rows:
+            return
+
+        yield rows
+        last = rows[-1]
+
+
+def _records(rows):
+    for row in rows:
+        yield [
+            row['name'] or 'Unknown',
+            row['employee_code'] or '-',
+            row['date'],
+            row['time'],
+            row['status'],
+            row['department'] or ''
+        ]
+
+
+def iter_csv(pages):
+    """CSV text, one chunk per page"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_HEADER)
+
+    for rows in pages:
+        writer.writerows(_records(rows))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def iter_csv_gzip(pages):
+    """Gzip-compressed CSV bytes, compressed on the fly"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+    for chunk in iter_csv(pages):
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands out what was written so far"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_parquet(pages):
+    """Parquet bytes: pages are buffered into row groups and written as they fill"""
+    if pq is None:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow).")
+
+    schema = pa.schema([(name, pa.string()) for name in EXPORT_HEADER])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    buffered = []
+
+    def write_group():
+        columns = list(zip(*buffered)) if buffered else [[] for _ in EXPORT_HEADER]
+        writer.write_table(pa.table([pa.array(column, pa.string()) for column in columns], schema=schema))
+        buffered.clear()
+
+    try:
+        for rows in pages:
+            buffered.extend(_records(rows))
+            if len(buffered) >= PARQUET_ROW_GROUP:
+                write_group()
+                yield sink.drain()
+        if buffered:
+            write_group()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def iter_export(fmt, pages):
+    """Encoded chunks of the export in the given format (see EXPORT_FORMATS)"""
+    if fmt == "csv":
+        return iter_csv(pages)
+    if fmt == "csv.gz":
+        return iter_csv_gzip(pages)
+    if fmt == "parquet":
+        return iter_parquet(pages)
+    raise ValueError(f"Unknown export format: '{fmt}'")
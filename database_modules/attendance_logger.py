@@ -2,67 +2,64 @@
 import datetime
 import os
 import sys
-from .supabase_client import get_supabase_client
+from .storage import get_storage
+from .dashboard_stats import invalidate_dashboard_stats
 
 # Add path to import notifications
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils.notifications import send_attendance_email 
+from utils.notifications import queue_attendance_email
 
 def mark_attendance(employee_id):
     """
-    Mark attendance + send email (using Supabase)
+    Mark attendance for one employee through the process-wide AttendanceWriter
+    (journaled locally, synced and emailed in the background).
+    Returns True for the first mark today, False for repeats.
     """
-    supabase = get_supabase_client()
-    if not supabase:
-        print("❌ Error: Supabase client not initialized.")
-        return False
-
-    now = datetime.datetime.now()
-    date_today = now.strftime("%Y-%m-%d")
-    time_now = now.strftime("%H:%M:%S")
+    # Imported here: the writer itself imports notify_attendance from this module
+    from .attendance_writer import get_attendance_writer
+    return get_attendance_writer().mark(employee_id)
 
+def notify_attendance(rows):
+    """One employees query for a batch of new attendance rows, then the emails"""
     try:
-        # 1. Check for duplicates (Already marked today?)
-        # Select * from attendance where employee_id = ? and date = ?
-        response = supabase.table("attendance") \
-            .select("*") \
-            .eq("employee_id", employee_id) \
-            .eq("date", date_today) \
-            .execute()
+        ids = list({row['employee_id'] for row in rows})
+        employees = {employee['id']: employee for employee in get_storage().employees_by_ids(ids, "id, name, email")}
+    except Exception as e:
+        print(f"⚠️ Could not load employees for notifications: {e}")
+        return
 
-        if response.data and len(response.data) > 0:
-             return False # Already marked
+    for row in rows:
+        employee = employees.get(row['employee_id'])
+        if employee:
+            queue_attendance_email(employee['email'], employee['name'], row['time'], row['date'])
 
-        # 2. Mark Attendance
-        data = {
-            "employee_id": employee_id,
-            "date": date_today,
-            "time": time_now,
-            "status": "Present"
-        }
-        
-        insert_response = supabase.table("attendance").insert(data).execute()
-        
-        if insert_response.data:
-            print(f"✅ Success: Attendance marked for Employee ID: {employee_id} at {time_now}")
-            
-            # 3. Fetch Employee data for notification
-            # We can do a join in Supabase, or just a simple fetch
-            emp_response = supabase.table("employees").select("name, email").eq("id", employee_id).single().execute()
-            
-            if emp_response.data:
-                employee_name = emp_response.data['name']
-                email = emp_response.data['email']
+def mark_attendance_batch(employee_ids):
+    """
+    Mark many employees present with a single write (e.g. one group scan).
+    Employees already marked today are skipped by the database through the
+    unique (employee_id, date) constraint. Emails go out for new marks only.
+    Returns the set of newly marked ids, or None if the write failed.
+    """
+    employee_ids = list(dict.fromkeys(employee_ids))
+    if not employee_ids:
+        return set()
 
-                # 🔥 Send Email in background
-                print("⏳ Sending notification email...")
-                send_attendance_email(email, employee_name, time_now, date_today)
-            
-            return True
-        else:
-            print("❌ Error marking attendance: Insert failed.")
-            return False
+    now = datetime.datetime.now()
+    date_today = now.strftime("%Y-%m-%d")
+    time_now = now.strftime("%H:%M:%S")
+    rows = [
+        {"employee_id": employee_id, "date": date_today, "time": time_now, "status": "Present"}
+        for employee_id in employee_ids
+    ]
 
+    try:
+        inserted = get_storage().insert_attendance(rows)
     except Exception as e:
-        print(f"❌ Error marking attendance: {e}")
-        return False
\ No newline at end of file
+        print(f"❌ Error marking attendance for {len(rows)} employees: {e}")
+        return None
+
+    print(f"✅ Success: Attendance marked for {len(inserted)} of {len(rows)} employees at {time_now}")
+    if inserted:
+        invalidate_dashboard_stats()
+        notify_attendance(inserted)
+    return {row['employee_id'] for row in inserted}
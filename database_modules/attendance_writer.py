@@ -0,0 +1,213 @@
+# name file: database_modules/attendance_writer.py
+import datetime
+import os
+import threading
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+from .storage import get_storage
+from .offline_journal import AttendanceJournal
+from .attendance_logger import notify_attendance
+from .dashboard_stats import invalidate_dashboard_stats
+
+# Queued marks are written at least this often (seconds) ...
+ATTENDANCE_FLUSH_SECONDS = float(os.environ.get("ATTENDANCE_FLUSH_SECONDS", "2"))
+# ... or as soon as this many are waiting
+ATTENDANCE_BATCH_SIZE = int(os.environ.get("ATTENDANCE_BATCH_SIZE", "50"))
+# Wait before retrying a failed batch (doubles up to the max)
+ATTENDANCE_RETRY_SECONDS = 2
+ATTENDANCE_RETRY_MAX_SECONDS = 60
+# A mark the database rejects this many times (e.g. unknown employee) is retired
+JOURNAL_MAX_ATTEMPTS = int(os.environ.get("JOURNAL_MAX_ATTEMPTS", "5"))
+# Synced journal entries older than this are deleted at start
+JOURNAL_KEEP_DAYS = 30
+
+
+class AttendanceWriter:
+    """
+    Non-blocking attendance service for the camera loop.
+    mark() answers repeats from an in-memory "already marked today" set
+    (no I/O) and writes new marks to the local SQLite journal first.
+    A background thread replays unsynced journal entries to the database
+    in batches, skipping duplicates through the unique (employee_id, date) constraint,
+    and retries with backoff while the network is down. A batch the
+    database rejects is replayed row by row, so one bad mark never holds up
+    the others. Marks survive restarts and outages; the frame loop never
+    waits on the network.
+    """
+
+    def __init__(self, flush_interval=ATTENDANCE_FLUSH_SECONDS, batch_size=ATTENDANCE_BATCH_SIZE,
+                 notify=True, journal=None):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.notify = notify
+        self.journal = journal or AttendanceJournal()
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._seen_date = None
+        self._seen = set()
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    def start(self):
+        self._load_today()
+        self._thread = threading.Thread(target=self._run, name="AttendanceWriter", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=10):
+        """Stop the worker; unsynced marks stay in the journal for the next start"""
+        self._stop_event.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _load_today(self):
+        """Seed the seen-set with marks already stored today (e.g. after a restart)"""
+        today = datetime.date.today().strftime("%Y-%m-%d")
+        keep_from = (datetime.date.today() - datetime.timedelta(days=JOURNAL_KEEP_DAYS)).strftime("%Y-%m-%d")
+        self.journal.purge_synced(keep_from)
+        seen = self.journal.marked_on(today)
+        with self._lock:
+            self._seen_date = today
+            self._seen = seen
+
+        try:
+            employee_ids = get_storage().attendance_employee_ids(today)
+            with self._lock:
+                self._seen.update(employee_ids)
+        except Exception as e:
+            # Not fatal: the journal and the unique constraint still prevent duplicates
+            print(f"⚠️ Could not preload today's attendance: {e}")
+
+    def mark(self, employee_id):
+        """
+        Record attendance for an employee.
+        Returns True for the first sighting today, False for repeats.
+        """
+        now = datetime.datetime.now()
+        date_today = now.strftime("%Y-%m-%d")
+
+        with self._lock:
+            if date_today != self._seen_date:
+                # New day: everybody can be marked again
+                self._seen_date = date_today
+                self._seen = set()
+
+            if employee_id in self._seen:
+                return False
+            self._seen.add(employee_id)
+
+        is_new = self.journal.record({
+            "employee_id": employee_id,
+            "date": date_today,
+            "time": now.strftime("%H:%M:%S"),
+            "status": "Present"
+        })
+        if is_new and self.journal.pending_count() >= self.batch_size:
+            self._wakeup.set()
+        return is_new
+
+    def pending(self):
+        return self.journal.pending_count()
+
+    def _run(self):
+        retry_delay = ATTENDANCE_RETRY_SECONDS
+        wait = self.flush_interval
+
+        while True:
+            self._wakeup.wait(wait)
+            self._wakeup.clear()
+
+            while True:
+                batch = self.journal.pending(self.batch_size)
+                if not batch:
+                    wait = self.flush_interval
+                    retry_delay = ATTENDANCE_RETRY_SECONDS
+                    break
+
+                if not self.flush(batch):
+                    # Offline or rejected rows: the rest stays in the journal, back off
+                    wait = retry_delay
+                    retry_delay = min(retry_delay * 2, ATTENDANCE_RETRY_MAX_SECONDS)
+                    break
+
+            if self._stop_event.is_set():
+                break
+
+    def flush(self, batch):
+        """Replay one batch with a single write. Returns False to retry later."""
+        rows = [
+            {key: row[key] for key in ("employee_id", "date", "time", "status")}
+            for row in batch
+        ]
+        try:
+            # Rows that already exist for (employee_id, date) are skipped by the database
+            inserted = get_storage().insert_attendance(rows)
+        except Exception as e:
+            if _is_connection_error(e):
+                print(f"❌ Error writing attendance batch ({len(rows)} kept in offline journal): {e}")
+                return False
+            print(f"⚠️ Attendance batch rejected, retrying row by row: {e}")
+            return self._flush_rows(batch)
+
+        self.journal.mark_synced([row['journal_id'] for row in batch])
+        self._report(inserted)
+        return True
+
+    def _flush_rows(self, batch):
+        """Write a rejected batch one mark at a time; failing marks count an attempt"""
+        inserted = []
+        ok = True
+        for row in batch:
+            try:
+                inserted.extend(get_storage().insert_attendance(
+                    [{key: row[key] for key in ("employee_id", "date", "time", "status")}]
+                ))
+            except Exception as e:
+                if _is_connection_error(e):
+                    print(f"❌ Error writing attendance (kept in offline journal): {e}")
+                    ok = False
+                    break
+                ok = False
+                if self.journal.mark_failed(row['journal_id'], JOURNAL_MAX_ATTEMPTS):
+                    print(f"❌ Attendance for Employee ID {row['employee_id']} on {row['date']} "
+                          f"dropped after {JOURNAL_MAX_ATTEMPTS} attempts: {e}")
+                else:
+                    print(f"❌ Error writing attendance for Employee ID {row['employee_id']}: {e}")
+                continue
+            self.journal.mark_synced([row['journal_id']])
+
+        self._report(inserted)
+        return ok
+
+    def _report(self, inserted):
+        for row in inserted:
+            print(f"✅ Success: Attendance marked for Employee ID: {row['employee_id']} at {row['time']}")
+
+        if inserted:
+            invalidate_dashboard_stats()
+        if self.notify and inserted:
+            notify_attendance(inserted)
+
+
+def _is_connection_error(e):
+    """Network/transport failures (retry the whole queue later) vs. rejected rows"""
+    if isinstance(e, (ConnectionError, TimeoutError)):
+        return True
+    return httpx is not None and isinstance(e, httpx.TransportError)
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_attendance_writer():
+    """Process-wide AttendanceWriter, started on first use"""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = AttendanceWriter()
+            _writer.start()
+        return _writer
@@ -0,0 +1,68 @@
+# name file: database_modules/dashboard_stats.py
+import datetime
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from .storage import get_storage
+from .query_cache import get_cache
+
+# Dashboard numbers are reused for this long (seconds) across page views
+DASHBOARD_CACHE_SECONDS = float(os.environ.get("DASHBOARD_CACHE_SECONDS", "10"))
+
+# Days shown in the dashboard chart (today included)
+CHART_DAYS = 8
+RECENT_ROWS = 10
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="DashboardStats")
+_cache = get_cache("dashboard", maxsize=1, ttl=DASHBOARD_CACHE_SECONDS)
+
+
+def _recent_attendance(storage):
+    """Last RECENT_ROWS marks with the employee's name and code"""
+    return [
+        {
+            'name': row['name'] or 'Unknown',
+            'employee_code': row['employee_code'] or '-',
+            'time': row['time'],
+            'status': row['status']
+        }
+        for row in storage.recent_attendance(RECENT_ROWS)
+    ]
+
+
+def get_dashboard_stats(force=False):
+    """
+    Everything the dashboard shows, computed in the database:
+    {"recent": [...], "today_count": int, "chart_dates": [...], "chart_counts": [...]}
+    The feed and the per-day counts (today's included) are fetched
+    concurrently, with one GROUP BY query for the counts, and the result
+    is cached for DASHBOARD_CACHE_SECONDS. Raises on network errors.
+    """
+    if force:
+        _cache.invalidate()
+    return _cache.get_or_load("stats", _load_stats)
+
+
+def _load_stats():
+    storage = get_storage()
+    today = datetime.date.today()
+    dates = [(today - datetime.timedelta(days=offset)).strftime("%Y-%m-%d") for offset in range(CHART_DAYS - 1, -1, -1)]
+
+    # Feed in the background while this thread gets the counts
+    recent_future = _executor.submit(_recent_attendance, storage)
+    counts = storage.attendance_counts(dates)
+    recent = recent_future.result()
+
+    # Days without attendance are left out of the chart
+    chart_dates = [date for date in dates if counts.get(date)]
+    return {
+        "recent": recent,
+        "today_count": counts.get(dates[-1], 0),
+        "chart_dates": chart_dates,
+        "chart_counts": [counts[date] for date in chart_dates],
+    }
+
+
+def invalidate_dashboard_stats():
+    """Drop the cached numbers (e.g. right after attendance was written)"""
+    _cache.invalidate()
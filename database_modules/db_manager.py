@@ -4,13 +4,97 @@ import os
 
 # the name of the database file
 DB_NAME = "attendance_system.db"
+# ...kept in the project root, whatever the working directory of the process
+DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), DB_NAME)
+
+# Local write-ahead journal of attendance marks (replayed to Supabase)
+# Same columns as the attendance table, plus sync bookkeeping
+SQL_CREATE_ATTENDANCE_JOURNAL_TABLE = """
+CREATE TABLE IF NOT EXISTS attendance_journal (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    employee_id INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    time TEXT NOT NULL,
+    status TEXT DEFAULT 'Present',
+    synced INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (employee_id, date)
+);
+CREATE INDEX IF NOT EXISTS idx_attendance_journal_pending ON attendance_journal (synced, id);
+"""
+
+# Versioned schema changes: migrations/<backend>/NNN_name.sql, applied in order
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+DEFAULT_ADMIN = ("admin", "1234")
+
+def migration_files(backend):
+    """[(version, name, path)] of a backend's migrations, oldest first"""
+    folder = os.path.join(MIGRATIONS_DIR, backend)
+    migrations = []
+    for file_name in sorted(os.listdir(folder)):
+        if file_name.endswith(".sql"):
+            version, _, name = file_name[:-4].partition("_")
+            migrations.append((int(version), name, os.path.join(folder, file_name)))
+    return sorted(migrations)
+
+def _sql_statements(sql):
+    """Split a migration script into statements (trigger bodies included)"""
+    statement = ""
+    for line in sql.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            yield statement
+            statement = ""
+
+def migrate_sqlite(conn):
+    """
+    Bring a SQLite database up to the latest schema.
+    The applied version is kept in PRAGMA user_version. Each migration runs
+    in its own write transaction together with the version bump, so
+    processes starting at the same time apply it only once.
+    Returns the versions applied.
+    """
+    migrations = migration_files("sqlite")
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= migrations[-1][0]:
+        return []
+
+    isolation_level = conn.isolation_level
+    conn.isolation_level = None  # explicit transactions
+    # Table rebuilds must not cascade deletes (cannot change inside a transaction)
+    conn.execute("PRAGMA foreign_keys=OFF")
+    applied = []
+    try:
+        for version, name, path in migrations:
+            with open(path, encoding="utf-8") as f:
+                sql = f.read()
+
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if conn.execute("PRAGMA user_version").fetchone()[0] >= version:
+                    conn.execute("ROLLBACK")
+                    continue
+                for statement in _sql_statements(sql):
+                    conn.execute(statement)
+                conn.execute(f"PRAGMA user_version = {version}")
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+            applied.append(version)
+            print(f"✅ Schema migration {version:03d} ({name}) applied.")
+    finally:
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.isolation_level = isolation_level
+    return applied
 
 # function to create a database connection
 def create_connection():
     conn = None
     try:
-        conn = sqlite3.connect(DB_NAME)
-        print(f"✅ The database connection was successful: {DB_NAME}")
+        conn = sqlite3.connect(DB_PATH)
+        print(f"✅ The database connection was successful: {DB_PATH}")
     except sqlite3.Error as e:
         print(f"❌ Database connection error: {e}")
     
@@ -18,40 +102,6 @@ def create_connection():
 
 # function to create the necessary tables
 def create_tables():
-    # 1. SQL for Employees Table
-    sql_create_employees_table = """
-    CREATE TABLE IF NOT EXISTS employees (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL,
-        employee_code TEXT UNIQUE,
-        email TEXT,
-        face_encoding BLOB NOT NULL,
-        department TEXT DEFAULT 'General',
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    );
-    """
-
-    # 2. SQL for Attendance Table
-    sql_create_attendance_table = """
-    CREATE TABLE IF NOT EXISTS attendance (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        employee_id INTEGER NOT NULL,
-        date TEXT NOT NULL,
-        time TEXT NOT NULL,
-        status TEXT DEFAULT 'Present',
-        FOREIGN KEY (employee_id) REFERENCES employees (id)
-    );
-    """
-    
-    # 3. SQL for Admins Table (New)
-    sql_create_admins_table = """
-    CREATE TABLE IF NOT EXISTS admins (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT NOT NULL UNIQUE,
-        password TEXT NOT NULL
-    );
-    """
-    
     # --- التنفيذ (Execution) ---
     conn = create_connection()
     
@@ -59,15 +109,14 @@ def create_tables():
         try:
             cursor = conn.cursor()
             
-            # تنفيذ إنشاء الجداول
-            cursor.execute(sql_create_employees_table)
-            cursor.execute(sql_create_attendance_table)
-            cursor.execute(sql_create_admins_table) # إنشاء جدول الأدمن
+            # تنفيذ إنشاء الجداول (schema migrations)
+            migrate_sqlite(conn)
+            cursor.executescript(SQL_CREATE_ATTENDANCE_JOURNAL_TABLE)
             
             # إضافة أدمن افتراضي (Default Admin)
             try:
-                cursor.execute("INSERT INTO admins (username, password) VALUES ('admin', '1234')")
-                print("✅ Default Admin created: user=admin, pass=1234")
+                cursor.execute("INSERT INTO admins (username, password) VALUES (?, ?)", DEFAULT_ADMIN)
+                print(f"✅ Default Admin created: user={DEFAULT_ADMIN[0]}, pass={DEFAULT_ADMIN[1]}")
             except sqlite3.IntegrityError:
                 pass # الأدمن موجود مسبقاً، لا داعي لإعادة إضافته
             
@@ -1,65 +1,116 @@
 # name file: database_modules/employee_crud.py
+import base64
 import json
+import os
+import sys
+import threading
 import numpy as np
-import face_recognition
-from .supabase_client import get_supabase_client
+from .storage import get_storage
+from .encoding_codec import decode_face_encoding
+from .query_cache import get_cache
 
-def add_new_employee(name, code, email, face_encoding, department="General"):
+# Add path to import the face gallery
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ai_modules.face_gallery import DEFAULT_TOLERANCE, ENCODING_DIM
+
+# Column projections: recognition never needs contact details,
+# the employees page never needs encodings
+GALLERY_COLUMNS = "id, name, face_encoding, updated_at"
+LIST_COLUMNS = "id, name, employee_code, email, department"
+
+# Rows per request (keep at or below PostgREST's max-rows, 1000 by default)
+EMPLOYEE_PAGE_SIZE = int(os.environ.get("EMPLOYEE_PAGE_SIZE", "1000"))
+
+# Rows per bulk insert / per "in" filter (keeps request URLs and bodies small)
+EMPLOYEE_INSERT_BATCH = int(os.environ.get("EMPLOYEE_INSERT_BATCH", "200"))
+
+# Nearest existing employees reported by the duplicate-face check
+DUPLICATE_TOP_K = int(os.environ.get("DUPLICATE_TOP_K", "3"))
+
+# Employees page: rows per page, and the columns it can be sorted by
+# (all NOT NULL, so keyset pagination on (column, id) is well defined)
+EMPLOYEE_LIST_PAGE_SIZE = int(os.environ.get("EMPLOYEE_LIST_PAGE_SIZE", "50"))
+EMPLOYEE_SORT_COLUMNS = ("name", "employee_code", "id")
+# Admin pages read employees through these (see query_cache); every write
+# below invalidates them
+_employee_cache = get_cache("employees")
+_employee_list_cache = get_cache("employee_lists")
+
+# Duplicate check + insert of one enrollment at a time, so two quick uploads
+# of the same face cannot both pass the check (per web process; reentrant so
+# bulk enrollment can hold it from its batch check through add_employees_bulk)
+_enroll_lock = threading.RLock()
+
+def enrollment_lock():
+    """Hold while checking faces for duplicates and inserting the new employees"""
+    return _enroll_lock
+
+def invalidate_employee_cache(employee_id=None):
+    """Forget cached employee lists, and one cached employee (all when None)"""
+    _employee_list_cache.invalidate()
+    _employee_cache.invalidate(employee_id)
+
+def find_similar_faces(face_encoding, k=DUPLICATE_TOP_K):
+    """
+    The k existing employees nearest to a face, through the shared in-process
+    gallery index (no download of the employees table per call).
+    Returns [{"id", "name", "distance"}] sorted by distance.
+    Raises on network errors while the gallery is first loaded.
+    """
+    # Imported here: the gallery sync itself reads employees through this module
+    from ai_modules.shared_gallery import get_shared_gallery
+
+    return [
+        {"id": employee_id, "name": name, "distance": distance}
+        # Exact search: the approximate index could miss a real duplicate
+        for employee_id, name, distance in get_shared_gallery().nearest(face_encoding, k, exact=True)
+    ]
+
+def add_new_employee(name, code, email, face_encoding, department="General", matches=None):
     """
     Function to add a new employee with duplicate face check.
     face_encoding: numpy array or list from face_recognition
+    matches: optional list, filled with the nearest existing employees
+             ({"id", "name", "distance"}) so callers can explain a rejection
     """
-    supabase = get_supabase_client()
-    if not supabase:
-        print("❌ Error: Supabase client not initialized.")
-        return False
+    # Imported here: the gallery sync itself reads employees through this module
+    from ai_modules.shared_gallery import remember_employees
 
     try:
-        # 1. Fetch all existing employees to check for duplicate faces
-        # Note: For very large databases, this should be optimized (e.g., pgvector), 
-        # but for now we fetch all and compare in Python as per request.
-        
-        print("🔍 Checking for duplicate faces...")
-        all_employees = get_all_employees()
-        
-        if all_employees:
-            existing_encodings = [e['encoding'] for e in all_employees]
-            existing_names = [e['name'] for e in all_employees]
-            
-            # Compare the new face with all existing faces
-            matches = face_recognition.compare_faces(existing_encodings, face_encoding, tolerance=0.5)
-            
-            if True in matches:
-                first_match_index = matches.index(True)
-                matched_name = existing_names[first_match_index]
-                print(f"⚠️ Error: Possible duplicate detected! Face matches with existing employee: {matched_name}")
+        with _enroll_lock:
+            # 1. Nearest existing faces through the shared gallery index
+            print("🔍 Checking for duplicate faces...")
+            nearest = find_similar_faces(face_encoding)
+            if matches is not None:
+                matches.extend(nearest)
+
+            if nearest and nearest[0]["distance"] <= DEFAULT_TOLERANCE:
+                print(f"⚠️ Error: Possible duplicate detected! Face matches with existing employee: "
+                      f"{nearest[0]['name']} (distance {nearest[0]['distance']:.3f})")
                 return False
 
-        # 2. Prepare data for insertion
-        # Convert numpy array to list for JSON serialization
-        if isinstance(face_encoding, np.ndarray):
-            encoding_list = face_encoding.tolist()
-        else:
-            encoding_list = face_encoding
+            # 2. Prepare data for insertion
+            data = {
+                "name": name,
+                "employee_code": code,
+                "email": email,
+                "department": department,
+                # Stored in the backend's format (see storage)
+                "face_encoding": face_encoding
+            }
 
-        data = {
-            "name": name,
-            "employee_code": code,
-            "email": email,
-            "department": department,
-            "face_encoding": encoding_list # Store as JSON array
-        }
-        
-        # 3. Insert into Supabase
-        response = supabase.table("employees").insert(data).execute()
-        
-        # Supabase-py v2 returns an object with 'data'
-        if response.data:
-            print(f"✅ Employee {name} has been added successfully!")
-            return True
-        else:
-             print("❌ Error adding employee: No data returned.")
-             return False
+            # 3. Insert into the database
+            inserted = get_storage().insert_employees([data])
+
+            if inserted:
+                # Searchable at once, before the next gallery sync
+                remember_employees([{"id": inserted[0]['id'], "name": name, "encoding": face_encoding}])
+                _employee_list_cache.invalidate()
+                print(f"✅ Employee {name} has been added successfully!")
+                return True
+            else:
+                 print("❌ Error adding employee: No data returned.")
+                 return False
 
     except Exception as e:
         print(f"❌ Error during add_employee: {e}")
@@ -68,60 +119,190 @@ def add_new_employee(name, code, email, face_encoding, department="General"):
              print(f"⚠️ Error: Employee code or Email likely already exists.")
         return False
 
-def get_all_employees():
+def get_existing_employee_codes(codes):
+    """Subset of the given employee codes that are already taken. Raises on network errors."""
+    return get_storage().existing_employee_codes(dict.fromkeys(codes))
+
+def add_employees_bulk(employees):
+    """
+    Insert many employees with one request per EMPLOYEE_INSERT_BATCH rows.
+    employees: dicts with name, code, email, department and encoding
+    (duplicate faces/codes must already be filtered out by the caller).
+    Returns one (employee_id, error) pair per input, in order.
+    A rejected batch is retried row by row so one bad row only fails itself.
+    Added employees are searchable in the shared gallery at once.
+    """
+    # Imported here: the gallery sync itself reads employees through this module
+    from ai_modules.shared_gallery import remember_employees
+
+    storage = get_storage()
+
+    def to_row(employee):
+        return {
+            "name": employee['name'],
+            "employee_code": employee['code'],
+            "email": employee.get('email'),
+            "department": employee.get('department') or "General",
+            "face_encoding": employee['encoding']
+        }
+
+    with _enroll_lock:
+        results = []
+        for start in range(0, len(employees), EMPLOYEE_INSERT_BATCH):
+            chunk = employees[start:start + EMPLOYEE_INSERT_BATCH]
+            rows = [to_row(employee) for employee in chunk]
+
+            try:
+                ids = {row['employee_code']: row['id'] for row in storage.insert_employees(rows)}
+                results.extend((ids.get(row['employee_code']), None if row['employee_code'] in ids else "No data returned.")
+                               for row in rows)
+                continue
+            except Exception as e:
+                print(f"⚠️ Bulk insert of {len(rows)} employees failed ({e}), retrying one by one...")
+
+            for row in rows:
+                try:
+                    inserted = storage.insert_employees([row])
+                    results.append((inserted[0]['id'], None) if inserted else (None, "No data returned."))
+                except Exception as e:
+                    results.append((None, str(e)))
+
+        remember_employees([
+            {"id": employee_id, "name": employee['name'], "encoding": employee['encoding']}
+            for employee, (employee_id, _) in zip(employees, results) if employee_id is not None
+        ])
+
+    added = sum(1 for employee_id, _ in results if employee_id is not None)
+    if added:
+        _employee_list_cache.invalidate()
+    print(f"✅ Bulk insert: {added}/{len(employees)} employees added.")
+    return results
+
+def _parse_employee_rows(rows):
     """
-    Function to retrieve all employees and their face encodings.
-    Used for loading faces into system memory at startup and duplicate checking.
+    Convert Supabase employees rows into the dicts used by the rest of the system.
+    All encodings are decoded into one preallocated float32 matrix; each
+    dict's 'encoding' is a row view of it (no per-row array allocation).
     """
-    supabase = get_supabase_client()
+    encodings = np.empty((len(rows), ENCODING_DIM), dtype=np.float32)
     employees_data = []
     
-    if not supabase:
-         return employees_data
+    for row in rows:
+        try:
+            # JSON list or base64 float32/float16 (see encoding_codec)
+            encoding = decode_face_encoding(row['face_encoding'], out=encodings[len(employees_data)])
+        except Exception as e:
+            print(f"❌ Error parsing encoding for employee {row.get('name')}: {e}")
+            continue
+        
+        employees_data.append({
+            "id": row['id'],
+            "name": row['name'],
+            "employee_code": row.get('employee_code'),
+            "email": row.get('email'),
+            "department": row.get('department'),
+            "updated_at": row.get('updated_at'),
+            "encoding": encoding
+        })
+    
+    return employees_data
+
+def iter_employee_pages(columns=LIST_COLUMNS, page_size=EMPLOYEE_PAGE_SIZE, updated_since=None):
+    """
+    Stream the employees table one page (list of raw rows) at a time.
+    Keyset pagination on id: every page is an indexed range scan, and
+    PostgREST's max-rows limit never truncates the result.
+    Only the requested columns are read. Raises on network errors.
+    """
+    storage = get_storage()
+    last_id = None
+    while True:
+        rows = storage.employee_page(columns, last_id, page_size, updated_since)
+        if not rows:
+            return
+
+        yield rows
+        last_id = rows[-1]['id']
 
+def iter_gallery_pages(updated_since=None, page_size=EMPLOYEE_PAGE_SIZE):
+    """
+    Encodings-only projection for recognition: yields pages of parsed
+    employees (id, name, updated_at, encoding), each page decoded into
+    one matrix. Raises on network errors.
+    """
+    for rows in iter_employee_pages(GALLERY_COLUMNS, page_size, updated_since):
+        yield _parse_employee_rows(rows)
+
+def _encode_list_cursor(row, sort):
+    payload = json.dumps([row[sort], row['id']]).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+def _decode_list_cursor(cursor):
+    """(sort value, id) of the last row of the previous page; ValueError if malformed"""
     try:
-        # Fetch all columns including department and email for the list view
-        response = supabase.table("employees").select("*").execute()
-        
-        rows = response.data
-        
-        for row in rows:
-            try:
-                # Supabase returns JSON automatically parsed as list/dict
-                encoding_list = row['face_encoding']
-                
-                # Convert back to numpy array for face_recognition
-                encoding_np = np.array(encoding_list)
-                
-                employees_data.append({
-                    "id": row['id'],
-                    "name": row['name'],
-                    "employee_code": row.get('employee_code'),
-                    "email": row.get('email'),
-                    "department": row.get('department'),
-                    "encoding": encoding_np
-                })
-            except Exception as e:
-                    print(f"❌ Error parsing encoding for employee {row.get('name')}: {e}")
+        padded = cursor + "=" * (-len(cursor) % 4)
+        value, last_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return value, int(last_id)
+    except Exception:
+        raise ValueError(f"Invalid employees cursor: '{cursor}'")
 
-    except Exception as e:
-        print(f"❌ Error retrieving employees: {e}")
-            
+def search_employees(search=None, department=None, sort="name", descending=False,
+                     cursor=None, page_size=EMPLOYEE_LIST_PAGE_SIZE):
+    """Cached _search_employees(): same arguments, same (rows, next_cursor)"""
+    key = ((search or "").strip(), department or None, sort, bool(descending), cursor or None, page_size)
+    return _employee_list_cache.get_or_load(
+        key, lambda: _search_employees(search, department, sort, descending, cursor, page_size))
+
+def _search_employees(search=None, department=None, sort="name", descending=False,
+                      cursor=None, page_size=EMPLOYEE_LIST_PAGE_SIZE):
+    """
+    One page of the employees list, filtered and sorted by the database.
+    search: case-insensitive substring of name, code or department
+    department: exact department
+    cursor: opaque value returned for the previous page (None = first page)
+    Keyset pagination on (sort column, id): every page costs the same no
+    matter how deep it is. Only display columns are downloaded.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    Raises ValueError for a bad sort/cursor and on network errors.
+    """
+    if sort not in EMPLOYEE_SORT_COLUMNS:
+        raise ValueError(f"Cannot sort employees by '{sort}'")
+
+    after = _decode_list_cursor(cursor) if cursor else None
+
+    # One extra row tells whether another page exists
+    rows = get_storage().search_employees(LIST_COLUMNS, search, department, sort, descending, after, page_size + 1)
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = _encode_list_cursor(rows[-1], sort)
+
+    return rows, next_cursor
+
+def get_employees_updated_since(watermark):
+    """
+    Employees inserted or updated at or after the given `updated_at` watermark
+    (all employees when watermark is None).
+    Raises on network errors so callers can fall back to their local cache.
+    """
+    employees_data = []
+    for page in iter_gallery_pages(updated_since=watermark):
+        employees_data.extend(page)
     return employees_data
 
+def get_employee_ids():
+    """IDs of all current employees (used to detect deletions). Raises on network errors."""
+    return [row['id'] for rows in iter_employee_pages("id") for row in rows]
+
 def delete_employee_by_id(employee_id):
     """Delete an employee by ID"""
-    supabase = get_supabase_client()
-    if not supabase:
-        return False
-        
     try:
-        # Delete attendance records first (if no cascade delete setup)
-        # supabase.table("attendance").delete().eq("employee_id", employee_id).execute()
-        
-        response = supabase.table("employees").delete().eq("id", employee_id).execute()
-        
-        if response.data:
+        # Attendance records are deleted with the employee (cascade)
+        if get_storage().delete_employee(employee_id):
+            invalidate_employee_cache(employee_id)
+            from ai_modules.shared_gallery import forget_employee
+            forget_employee(employee_id)
             print(f"🗑️ Deleted employee ID: {employee_id}")
             return True
         else:
@@ -134,10 +315,6 @@ def delete_employee_by_id(employee_id):
 
 def update_employee_data(employee_id, name, code, email, department="General"):
     """Update employee data (excluding face encoding)"""
-    supabase = get_supabase_client()
-    if not supabase:
-        return False
-
     try:
         data = {
             "name": name,
@@ -146,9 +323,8 @@ def update_employee_data(employee_id, name, code, email, department="General"):
             "department": department
         }
         
-        response = supabase.table("employees").update(data).eq("id", employee_id).execute()
-        
-        if response.data:
+        if get_storage().update_employee(employee_id, data):
+            invalidate_employee_cache(employee_id)
             print(f"✏️ Updated employee ID: {employee_id}")
             return True
         else:
@@ -160,14 +336,9 @@ def update_employee_data(employee_id, name, code, email, department="General"):
         return False
 
 def get_employee_by_id(employee_id):
-    """Get a single employee's data by ID"""
-    supabase = get_supabase_client()
-    if not supabase:
-        return None
-
+    """Get a single employee's display data by ID (cached, without the face encoding)"""
     try:
-        response = supabase.table("employees").select("*").eq("id", employee_id).single().execute()
-        return response.data
+        return _employee_cache.get_or_load(employee_id, lambda: get_storage().get_employee(employee_id, LIST_COLUMNS))
     except Exception as e:
         print(f"❌ Error fetching employee: {e}")
         return None
@@ -0,0 +1,76 @@
+# name file: database_modules/encoding_codec.py
+import base64
+import binascii
+import os
+import sys
+import numpy as np
+
+# Add path to import the face gallery (single definition of the embedding size)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ai_modules.face_gallery import ENCODING_DIM
+
+# How new encodings are written to `employees.face_encoding`:
+#   json - JSON list of float64 (original format, ~2.5 KB per face)
+#   f32  - "f32:" + base64 float32 bytes (~690 bytes, lossless for dlib)
+#   f16  - "f16:" + base64 float16 bytes (~350 bytes, ~1e-3 precision)
+# Readers accept every format, so rows can be migrated gradually.
+FACE_ENCODING_FORMAT = os.environ.get("FACE_ENCODING_FORMAT", "f32").strip().lower()
+
+_DTYPES = {"f32": np.dtype("<f4"), "f16": np.dtype("<f2")}
+
+
+def encode_face_encoding(encoding, fmt=None):
+    """Serialize a 128-d encoding for storage in the employees table"""
+    fmt = (fmt or FACE_ENCODING_FORMAT).lower()
+    vector = np.asarray(encoding, dtype=np.float64).reshape(ENCODING_DIM)
+
+    if fmt == "json":
+        return vector.tolist()
+
+    if fmt not in _DTYPES:
+        raise ValueError(f"Unknown face encoding format: '{fmt}'")
+
+    raw = vector.astype(_DTYPES[fmt]).tobytes()
+    return f"{fmt}:{base64.b64encode(raw).decode('ascii')}"
+
+
+def encoding_format(value):
+    """Storage format of a stored value: json | f32 | f16 | blob"""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return "blob"
+    if isinstance(value, str) and value[:4] in ("f32:", "f16:"):
+        return value[:3]
+    if isinstance(value, str) and value.startswith("\\x"):
+        return "blob"  # Postgres bytea (hex)
+    return "json"
+
+
+def decode_face_encoding(value, out=None):
+    """
+    Decode any stored format into a float32 vector.
+    When `out` (a row of a preallocated matrix) is given the result is
+    written there and no new array is allocated.
+    """
+    if out is None:
+        out = np.empty(ENCODING_DIM, dtype=np.float32)
+
+    fmt = encoding_format(value)
+
+    if fmt in _DTYPES:
+        raw = binascii.a2b_base64(value[4:])
+        out[:] = np.frombuffer(raw, dtype=_DTYPES[fmt])
+    elif fmt == "blob":
+        if isinstance(value, str):
+            value = bytes.fromhex(value[2:])
+        # SQLite BLOB / bytea: raw float32 if 512 bytes, else float64
+        dtype = np.dtype("<f4") if len(value) == ENCODING_DIM * 4 else np.dtype("<f8")
+        out[:] = np.frombuffer(value, dtype=dtype)
+    else:
+        out[:] = value
+
+    return out
+
+
+def encode_blob(encoding):
+    """Raw little-endian float32 bytes (SQLite BLOB / Postgres bytea)"""
+    return np.asarray(encoding, dtype="<f4").reshape(ENCODING_DIM).tobytes()
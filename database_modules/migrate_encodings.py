@@ -0,0 +1,65 @@
+# name file: database_modules/migrate_encodings.py
+"""
+Re-encode stored face encodings into another storage format.
+Supabase storage only: the SQLite backend always stores float32 BLOBs.
+
+Usage (from the project root):
+    python -m database_modules.migrate_encodings --format f32
+    python -m database_modules.migrate_encodings --format f16 --dry-run
+"""
+import argparse
+from .supabase_client import get_supabase_client
+from .encoding_codec import encoding_format, decode_face_encoding, encode_face_encoding
+
+PAGE_SIZE = 500
+
+def migrate_encodings(target_format, dry_run=False):
+    """Rewrite every employee whose encoding is not yet in target_format"""
+    supabase = get_supabase_client()
+    if not supabase:
+        print("❌ Error: Supabase client not initialized.")
+        return False
+
+    last_id = 0
+    scanned = converted = failed = 0
+
+    while True:
+        # Keyset pagination on id (stable while rows are being updated)
+        response = supabase.table("employees") \
+            .select("id, name, face_encoding") \
+            .gt("id", last_id) \
+            .order("id") \
+            .limit(PAGE_SIZE) \
+            .execute()
+        rows = response.data
+        if not rows:
+            break
+
+        for row in rows:
+            scanned += 1
+            last_id = row['id']
+            value = row['face_encoding']
+
+            if value is None or encoding_format(value) == target_format:
+                continue
+
+            try:
+                new_value = encode_face_encoding(decode_face_encoding(value), target_format)
+                if not dry_run:
+                    supabase.table("employees").update({"face_encoding": new_value}).eq("id", row['id']).execute()
+                converted += 1
+            except Exception as e:
+                failed += 1
+                print(f"❌ Error migrating employee {row.get('name')} (ID {row['id']}): {e}")
+
+    action = "Would convert" if dry_run else "Converted"
+    print(f"✅ Scanned {scanned} employees. {action} {converted} to '{target_format}', {failed} failed.")
+    return failed == 0
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--format", choices=["json", "f32", "f16"], default="f32")
+    parser.add_argument("--dry-run", action="store_true", help="only count rows that would change")
+    args = parser.parse_args()
+
+    migrate_encodings(args.format, args.dry_run)
@@ -0,0 +1,94 @@
+# name file: database_modules/migrate_schema.py
+"""
+Apply the versioned schema migrations in database_modules/migrations/.
+
+Usage (from the project root):
+    python -m database_modules.migrate_schema sqlite             # SQLITE_DB_PATH
+    python -m database_modules.migrate_schema postgres           # DATABASE_URL (needs psycopg)
+    python -m database_modules.migrate_schema postgres --print   # SQL for the Supabase SQL editor
+
+Every Postgres migration is safe to run again, so the printed script can be
+pasted as a whole; versions already applied are skipped by the runner.
+"""
+import argparse
+import os
+import sqlite3
+from .db_manager import DB_PATH, migration_files, migrate_sqlite
+
+try:
+    import psycopg
+except ImportError:  # only needed to apply Postgres migrations from here
+    psycopg = None
+
+SQL_CREATE_SCHEMA_MIGRATIONS = """
+create table if not exists schema_migrations (
+  version integer primary key,
+  name text not null,
+  applied_at timestamptz not null default now()
+);
+"""
+
+
+def postgres_script():
+    """All Postgres migrations as one script, recording their versions"""
+    parts = [SQL_CREATE_SCHEMA_MIGRATIONS]
+    for version, name, path in migration_files("postgres"):
+        with open(path, encoding="utf-8") as f:
+            parts.append(f.read())
+        parts.append(f"insert into schema_migrations (version, name) values ({version}, '{name}') "
+                     f"on conflict (version) do nothing;\n")
+    return "\n".join(parts)
+
+
+def migrate_postgres(dsn):
+    """Apply the pending Postgres migrations, one transaction each. Returns the versions applied."""
+    if psycopg is None:
+        raise RuntimeError("Applying Postgres migrations needs psycopg (pip install psycopg), "
+                           "or run the --print output in the Supabase SQL editor.")
+
+    applied = []
+    with psycopg.connect(dsn) as conn:
+        conn.execute(SQL_CREATE_SCHEMA_MIGRATIONS)
+        conn.commit()
+        for version, name, path in migration_files("postgres"):
+            with open(path, encoding="utf-8") as f:
+                sql = f.read()
+            with conn.transaction():
+                # Serializes concurrent runners; the loser sees the version and skips it
+                conn.execute("lock table schema_migrations in exclusive mode")
+                if conn.execute("select 1 from schema_migrations where version = %s", (version,)).fetchone():
+                    continue
+                conn.execute(sql)
+                conn.execute("insert into schema_migrations (version, name) values (%s, %s)", (version, name))
+            applied.append(version)
+            print(f"✅ Schema migration {version:03d} ({name}) applied.")
+    return applied
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("backend", choices=["sqlite", "postgres"])
+    parser.add_argument("--print", action="store_true", dest="print_sql", help="print the SQL instead of applying it")
+    parser.add_argument("--database", help="SQLite file or Postgres URL (default: SQLITE_DB_PATH / DATABASE_URL)")
+    args = parser.parse_args()
+
+    if args.backend == "sqlite":
+        if args.print_sql:
+            for version, name, path in migration_files("sqlite"):
+                with open(path, encoding="utf-8") as f:
+                    print(f.read())
+        else:
+            conn = sqlite3.connect(args.database or os.environ.get("SQLITE_DB_PATH", DB_PATH))
+            try:
+                applied = migrate_sqlite(conn)
+            finally:
+                conn.close()
+            print(f"✅ SQLite schema up to date ({len(applied)} migration(s) applied).")
+    elif args.print_sql:
+        print(postgres_script())
+    else:
+        dsn = args.database or os.environ.get("DATABASE_URL")
+        if not dsn:
+            parser.error("set DATABASE_URL or pass --database (or use --print)")
+        applied = migrate_postgres(dsn)
+        print(f"✅ Postgres schema up to date ({len(applied)} migration(s) applied).")
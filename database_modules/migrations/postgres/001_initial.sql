@@ -0,0 +1,57 @@
+-- 001: employees, attendance and admins (safe to run on an existing database)
+create table if not exists employees (
+  id bigint generated by default as identity primary key,
+  name text not null,
+  employee_code text unique not null,
+  email text,
+  department text,
+  face_encoding jsonb
+);
+
+-- Keep updated_at current (used by the recognizer's incremental gallery sync)
+alter table employees add column if not exists updated_at timestamptz not null default now();
+
+create or replace function set_updated_at() returns trigger as $$
+begin
+  new.updated_at = now();
+  return new;
+end;
+$$ language plpgsql;
+
+drop trigger if exists employees_set_updated_at on employees;
+create trigger employees_set_updated_at
+  before update on employees
+  for each row execute function set_updated_at();
+
+create index if not exists employees_updated_at_idx on employees (updated_at);
+
+-- Employees page: sorted keyset pages and substring search
+create index if not exists employees_name_id_idx on employees (name, id);
+create extension if not exists pg_trgm;
+create index if not exists employees_search_idx on employees
+  using gin (name gin_trgm_ops, employee_code gin_trgm_ops, department gin_trgm_ops);
+
+create table if not exists attendance (
+  id bigint generated by default as identity primary key,
+  employee_id bigint references employees(id) on delete cascade,
+  date text not null,
+  time text not null,
+  status text default 'Present'
+);
+
+-- Dashboard: attendance per day, counted by the database
+create or replace function attendance_daily_counts(since text)
+returns table (date text, count bigint)
+language sql stable as $$
+  select date, count(*) from attendance where date >= since group by date order by date;
+$$;
+
+create table if not exists admins (
+  id bigint generated by default as identity primary key,
+  username text not null,
+  password text not null
+);
+
+-- Default admin (first run only)
+insert into admins (username, password)
+  select 'admin', 'admin123' where not exists (select 1 from admins);
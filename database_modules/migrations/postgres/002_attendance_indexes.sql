@@ -0,0 +1,15 @@
+-- 002: one mark per employee per day, enforced by a unique index.
+-- Marks are then written with `insert ... on conflict (employee_id, date) do nothing`
+-- (the upsert used by every writer): no read-before-write, and the
+-- uniqueness check is one B-tree lookup instead of a table scan.
+
+-- Older databases may hold repeated marks: keep the earliest of each day
+delete from attendance a
+  using attendance b
+  where a.employee_id = b.employee_id and a.date = b.date and a.id > b.id;
+
+-- Same name as the table constraint of newer schemas, so it is not built twice
+create unique index if not exists attendance_employee_id_date_key on attendance (employee_id, date);
+
+-- Per-day counts of the dashboard
+create index if not exists attendance_date_idx on attendance (date);
@@ -0,0 +1,20 @@
+-- 003: marked_at = date + time as one timestamp, kept by a trigger.
+-- Exports and the recent-attendance feed order (and page) by (marked_at, id)
+-- on a single index instead of sorting on two text columns.
+alter table attendance add column if not exists marked_at timestamp;
+
+create or replace function set_attendance_marked_at() returns trigger as $$
+begin
+  new.marked_at = (new.date || ' ' || new.time)::timestamp;
+  return new;
+end;
+$$ language plpgsql;
+
+drop trigger if exists attendance_set_marked_at on attendance;
+create trigger attendance_set_marked_at
+  before insert or update of date, time on attendance
+  for each row execute function set_attendance_marked_at();
+
+update attendance set marked_at = (date || ' ' || time)::timestamp where marked_at is null;
+
+create index if not exists attendance_marked_at_idx on attendance (marked_at, id);
@@ -0,0 +1,25 @@
+-- 002: employees.updated_at (incremental gallery sync) and the list-order index.
+-- SQLite cannot add a column with a non-constant default: the table is rebuilt.
+CREATE TABLE employees_new (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    employee_code TEXT UNIQUE,
+    email TEXT,
+    face_encoding BLOB NOT NULL,
+    department TEXT DEFAULT 'General',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+);
+INSERT INTO employees_new (id, name, employee_code, email, face_encoding, department, created_at)
+    SELECT id, name, employee_code, email, face_encoding, department, created_at FROM employees;
+DROP TABLE employees;
+ALTER TABLE employees_new RENAME TO employees;
+
+CREATE INDEX idx_employees_updated_at ON employees (updated_at);
+CREATE INDEX idx_employees_name_id ON employees (name, id);
+CREATE TRIGGER employees_set_updated_at
+    AFTER UPDATE OF name, employee_code, email, face_encoding, department ON employees
+    FOR EACH ROW
+BEGIN
+    UPDATE employees SET updated_at = strftime('%Y-%m-%dT%H:%M:%f', 'now') WHERE id = NEW.id;
+END;
@@ -0,0 +1,20 @@
+-- 003: one mark per employee per day (unique index, so INSERT OR IGNORE needs
+-- no read-before-write), attendance deleted with its employee, per-day index.
+-- Rebuilt to change the foreign key; repeated marks keep the earliest row.
+CREATE TABLE attendance_new (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    employee_id INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    time TEXT NOT NULL,
+    status TEXT DEFAULT 'Present',
+    FOREIGN KEY (employee_id) REFERENCES employees (id) ON DELETE CASCADE
+);
+INSERT INTO attendance_new (id, employee_id, date, time, status)
+    SELECT id, employee_id, date, time, status FROM attendance
+    WHERE id IN (SELECT MIN(id) FROM attendance GROUP BY employee_id, date)
+      AND employee_id IN (SELECT id FROM employees);
+DROP TABLE attendance;
+ALTER TABLE attendance_new RENAME TO attendance;
+
+CREATE UNIQUE INDEX idx_attendance_employee_date ON attendance (employee_id, date);
+CREATE INDEX idx_attendance_date ON attendance (date);
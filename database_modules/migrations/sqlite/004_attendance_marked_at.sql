@@ -0,0 +1,5 @@
+-- 004: marked_at = date + time as one sortable value. A virtual generated
+-- column costs nothing per insert; its index serves exports and the
+-- recent-attendance feed, which order (and page) by (marked_at, id).
+ALTER TABLE attendance ADD COLUMN marked_at TEXT GENERATED ALWAYS AS (date || ' ' || time) VIRTUAL;
+CREATE INDEX idx_attendance_marked_at ON attendance (marked_at, id);
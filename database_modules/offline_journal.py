@@ -0,0 +1,99 @@
+# name file: database_modules/offline_journal.py
+import os
+import sqlite3
+import threading
+from .db_manager import DB_PATH, SQL_CREATE_ATTENDANCE_JOURNAL_TABLE
+
+# SQLite file holding the journal (defaults to the local attendance database)
+ATTENDANCE_JOURNAL_DB = os.environ.get("ATTENDANCE_JOURNAL_DB", DB_PATH)
+
+
+class AttendanceJournal:
+    """
+    Durable local record of every attendance mark.
+    A mark is written here first (one local SQLite insert) and flagged as
+    synced once Supabase has accepted it, so nothing is lost while offline.
+    UNIQUE (employee_id, date) makes repeated marks a no-op.
+    A mark the database keeps rejecting is retired (synced = -1) after
+    JOURNAL_MAX_ATTEMPTS so it cannot hold up the ones behind it.
+    """
+
+    def __init__(self, path=ATTENDANCE_JOURNAL_DB):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        # WAL: cheap appends and readers never block the writer
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SQL_CREATE_ATTENDANCE_JOURNAL_TABLE)
+        self._conn.commit()
+
+    def record(self, row):
+        """Store a mark. Returns False if it was already journaled."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO attendance_journal (employee_id, date, time, status) VALUES (?, ?, ?, ?)",
+                (row['employee_id'], row['date'], row['time'], row.get('status', 'Present'))
+            )
+            self._conn.commit()
+            return cursor.rowcount == 1
+
+    def marked_on(self, date):
+        """Employee ids journaled for a date (synced or not)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT employee_id FROM attendance_journal WHERE date = ?", (date,)
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def pending(self, limit):
+        """Oldest marks not yet accepted by Supabase"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, employee_id, date, time, status FROM attendance_journal "
+                "WHERE synced = 0 ORDER BY id LIMIT ?", (limit,)
+            ).fetchall()
+        return [
+            {"journal_id": r[0], "employee_id": r[1], "date": r[2], "time": r[3], "status": r[4]}
+            for r in rows
+        ]
+
+    def pending_count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM attendance_journal WHERE synced = 0").fetchone()[0]
+
+    def mark_synced(self, journal_ids):
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE attendance_journal SET synced = 1 WHERE id = ?", [(i,) for i in journal_ids]
+            )
+            self._conn.commit()
+
+    def mark_failed(self, journal_id, max_attempts):
+        """Count a rejected write. Returns True if the mark was retired (max_attempts reached)."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE attendance_journal SET attempts = attempts + 1, "
+                "synced = CASE WHEN attempts + 1 >= ? THEN -1 ELSE synced END WHERE id = ?",
+                (max_attempts, journal_id)
+            )
+            row = self._conn.execute("SELECT synced FROM attendance_journal WHERE id = ?", (journal_id,)).fetchone()
+            self._conn.commit()
+        return row is not None and row[0] == -1
+
+    def dead_count(self):
+        """Marks retired after too many rejected writes"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM attendance_journal WHERE synced = -1").fetchone()[0]
+
+    def purge_synced(self, before_date):
+        """Delete synced and retired marks older than a date (keeps the file small)"""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM attendance_journal WHERE synced != 0 AND date < ?", (before_date,)
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,94 @@
+# name file: database_modules/query_cache.py
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Query results are reused for this long (seconds)...
+QUERY_CACHE_SECONDS = float(os.environ.get("QUERY_CACHE_SECONDS", "30"))
+# ...and each cache keeps at most this many of them (least recently used go first)
+QUERY_CACHE_SIZE = int(os.environ.get("QUERY_CACHE_SIZE", "256"))
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+class QueryCache:
+    """
+    Thread-safe TTL + LRU cache for database query results.
+    get_or_load() returns a fresh cached value or calls the loader; loader
+    exceptions are not cached. A load that overlaps an invalidate() is
+    returned to its caller but not stored, so writes are never undone by a
+    slower read that started before them.
+    Cached values are shared between callers: treat them as read-only.
+    """
+
+    def __init__(self, name, maxsize=QUERY_CACHE_SIZE, ttl=QUERY_CACHE_SECONDS):
+        self.name = name
+        self.maxsize = max(1, maxsize)
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires, value)
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_load(self, key, loader):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generation
+
+        value = loader()
+
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = (time.monotonic() + self.ttl, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return value
+
+    def invalidate(self, key=None):
+        """Drop one entry, or everything when key is None"""
+        with self._lock:
+            self._generation += 1
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            }
+
+
+def get_cache(name, maxsize=QUERY_CACHE_SIZE, ttl=QUERY_CACHE_SECONDS):
+    """The process-wide cache with this name (created on first use)"""
+    with _caches_lock:
+        cache = _caches.get(name)
+        if cache is None:
+            cache = _caches[name] = QueryCache(name, maxsize, ttl)
+        return cache
+
+
+def cache_stats():
+    """{cache name: hit/miss/size counters} for every cache in this process"""
+    with _caches_lock:
+        caches = list(_caches.values())
+    return {cache.name: cache.stats() for cache in caches}
@@ -0,0 +1,217 @@
+# name file: database_modules/sqlite_storage.py
+import os
+import sqlite3
+import threading
+
+from .db_manager import DB_PATH, DEFAULT_ADMIN, migrate_sqlite
+from .encoding_codec import encode_blob
+from .storage import Storage, day_after
+
+# SQLite file of the local backend (defaults to the local attendance database)
+SQLITE_DB_PATH = os.environ.get("SQLITE_DB_PATH", DB_PATH)
+# Compiled statements kept per connection (every query here is parameterized)
+SQLITE_STATEMENT_CACHE = 256
+
+EMPLOYEE_COLUMNS = frozenset(("id", "name", "employee_code", "email", "department",
+                              "face_encoding", "created_at", "updated_at"))
+SEARCH_COLUMNS = ("name", "employee_code", "department")
+
+
+def _columns(columns):
+    """Validated column list of a comma-separated spec (column names cannot be bound)"""
+    names = [name.strip() for name in columns.split(",")]
+    unknown = [name for name in names if name not in EMPLOYEE_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown employee column(s): {', '.join(unknown)}")
+    return ", ".join(names)
+
+
+def _like_pattern(text):
+    """LIKE '%text%' with the wildcards in text matched literally (ESCAPE '\\')"""
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+class SqliteStorage(Storage):
+    """
+    Storage in a local SQLite file: no network round trip, so writes take
+    well under a millisecond.
+    One connection per thread (WAL lets readers run while a write commits),
+    each with a prepared statement cache. The schema comes from the
+    versioned migrations (migrations/sqlite): indexes cover the attendance
+    (employee_id, date) uniqueness check, the per-day counts, the
+    (marked_at, id) order of exports and the feed, and the employees list order.
+    """
+
+    def __init__(self, path=SQLITE_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        migrate_sqlite(conn)
+        with conn:
+            conn.execute("INSERT OR IGNORE INTO admins (username, password) VALUES (?, ?)", DEFAULT_ADMIN)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, cached_statements=SQLITE_STATEMENT_CACHE)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            self._local.conn = conn
+        return conn
+
+    def _query(self, sql, params=()):
+        return [dict(row) for row in self._conn().execute(sql, params).fetchall()]
+
+    # --- Employees ---
+    def insert_employees(self, rows):
+        conn = self._conn()
+        inserted = []
+        with conn:
+            for row in rows:
+                cursor = conn.execute(
+                    "INSERT INTO employees (name, employee_code, email, department, face_encoding) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (row['name'], row['employee_code'], row.get('email'), row.get('department') or "General",
+                     encode_blob(row['face_encoding']))
+                )
+                inserted.append({"id": cursor.lastrowid, "employee_code": row['employee_code']})
+        return inserted
+
+    def existing_employee_codes(self, codes):
+        conn = self._conn()
+        return {
+            code for code in codes
+            if conn.execute("SELECT 1 FROM employees WHERE employee_code = ?", (code,)).fetchone()
+        }
+
+    def employee_page(self, columns, after_id=None, limit=1000, updated_since=None):
+        sql = f"SELECT {_columns(columns)} FROM employees WHERE id > ?"
+        params = [after_id if after_id is not None else -1]
+        if updated_since:
+            sql += " AND updated_at >= ?"
+            params.append(updated_since)
+        return self._query(sql + " ORDER BY id LIMIT ?", params + [limit])
+
+    def search_employees(self, columns, search, department, sort, descending, after, limit):
+        if sort not in ("name", "employee_code", "id"):
+            raise ValueError(f"Cannot sort employees by '{sort}'")
+
+        where = []
+        params = []
+        if department:
+            where.append("department = ?")
+            params.append(department)
+
+        search = (search or "").strip()
+        if search:
+            # LIKE is case-insensitive for ASCII, like ilike
+            pattern = _like_pattern(search)
+            where.append("(" + " OR ".join(f"{column} LIKE ? ESCAPE '\\'" for column in SEARCH_COLUMNS) + ")")
+            params.extend([pattern] * len(SEARCH_COLUMNS))
+
+        op = "<" if descending else ">"
+        if after is not None:
+            value, last_id = after
+            if sort == "id":
+                where.append(f"id {op} ?")
+                params.append(last_id)
+            else:
+                where.append(f"({sort}, id) {op} (?, ?)")
+                params.extend([value, last_id])
+
+        direction = "DESC" if descending else "ASC"
+        order = f"id {direction}" if sort == "id" else f"{sort} {direction}, id {direction}"
+        sql = f"SELECT {_columns(columns)} FROM employees"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        return self._query(f"{sql} ORDER BY {order} LIMIT ?", params + [limit])
+
+    def get_employee(self, employee_id, columns):
+        rows = self._query(f"SELECT {_columns(columns)} FROM employees WHERE id = ?", (employee_id,))
+        return rows[0] if rows else None
+
+    def employees_by_ids(self, employee_ids, columns):
+        employee_ids = list(employee_ids)
+        if not employee_ids:
+            return []
+        placeholders = ", ".join("?" * len(employee_ids))
+        return self._query(f"SELECT {_columns(columns)} FROM employees WHERE id IN ({placeholders})", employee_ids)
+
+    def update_employee(self, employee_id, data):
+        names = _columns(", ".join(data)).split(", ")
+        conn = self._conn()
+        with conn:
+            cursor = conn.execute(
+                f"UPDATE employees SET {', '.join(f'{name} = ?' for name in names)} WHERE id = ?",
+                [data[name] for name in names] + [employee_id]
+            )
+        return cursor.rowcount > 0
+
+    def delete_employee(self, employee_id):
+        conn = self._conn()
+        with conn:
+            # Attendance goes with it (ON DELETE CASCADE)
+            cursor = conn.execute("DELETE FROM employees WHERE id = ?", (employee_id,))
+        return cursor.rowcount > 0
+
+    # --- Attendance ---
+    def insert_attendance(self, rows):
+        conn = self._conn()
+        inserted = []
+        with conn:
+            for row in rows:
+                # Skipped through the unique (employee_id, date) index
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO attendance (employee_id, date, time, status) VALUES (?, ?, ?, ?)",
+                    (row['employee_id'], row['date'], row['time'], row.get('status', 'Present'))
+                )
+                if cursor.rowcount == 1:
+                    inserted.append({"id": cursor.lastrowid, **row})
+        return inserted
+
+    def attendance_employee_ids(self, date):
+        return [row[0] for row in self._conn().execute("SELECT employee_id FROM attendance WHERE date = ?", (date,))]
+
+    def recent_attendance(self, limit):
+        return self._query(
+            "SELECT e.name, e.employee_code, a.time, a.status FROM attendance a "
+            "LEFT JOIN employees e ON e.id = a.employee_id ORDER BY a.marked_at DESC, a.id DESC LIMIT ?", (limit,)
+        )
+
+    def attendance_counts(self, dates):
+        counts = dict(self._conn().execute(
+            "SELECT date, COUNT(*) FROM attendance WHERE date >= ? GROUP BY date", (dates[0],)
+        ).fetchall())
+        return {date: counts.get(date, 0) for date in dates}
+
+    def attendance_page(self, date_from=None, date_to=None, department=None, employee_code=None,
+                        employee_id=None, after=None, limit=1000):
+        where = []
+        params = []
+        # Date range on marked_at: one index serves the filter and the order
+        for condition, value in (("a.marked_at >= ?", date_from), ("a.marked_at < ?", day_after(date_to)),
+                                 ("a.employee_id = ?", employee_id), ("e.department = ?", department),
+                                 ("e.employee_code = ?", employee_code)):
+            if value:
+                where.append(condition)
+                params.append(value)
+        if after is not None:
+            where.append("(a.marked_at, a.id) < (?, ?)")
+            params.extend([after['marked_at'], after['id']])
+
+        sql = ("SELECT a.id, a.date, a.time, a.status, a.marked_at, e.name, e.employee_code, e.department "
+               "FROM attendance a LEFT JOIN employees e ON e.id = a.employee_id")
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        return self._query(sql + " ORDER BY a.marked_at DESC, a.id DESC LIMIT ?", params + [limit])
+
+    # --- Admins ---
+    def check_admin(self, username, password):
+        row = self._conn().execute(
+            "SELECT 1 FROM admins WHERE username = ? AND password = ? LIMIT 1", (username, password)
+        ).fetchone()
+        return row is not None
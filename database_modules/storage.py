@@ -0,0 +1,121 @@
+# name file: database_modules/storage.py
+import datetime
+import os
+import threading
+
+try:
+    from dotenv import load_dotenv
+except ImportError:  # settings then come from the environment only
+    load_dotenv = None
+
+if load_dotenv is not None:
+    load_dotenv()
+
+# Where employees, attendance and admins live:
+#   supabase - the hosted Postgres database (default)
+#   sqlite   - a local file (SQLITE_DB_PATH), e.g. a kiosk running fully offline
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "supabase").strip().lower()
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+class Storage:
+    """
+    The queries the system runs, one method each.
+    Rows are plain dicts keyed by column name. `columns` arguments are
+    comma-separated employee column names. Face encodings are passed in as
+    vectors and come back in the backend's stored form (decode them with
+    encoding_codec.decode_face_encoding). Methods raise on connection and
+    database errors; callers decide how to report them.
+    """
+
+    # --- Employees ---
+    def insert_employees(self, rows):
+        """Insert rows (name, employee_code, email, department, face_encoding) in one
+        transaction. Returns the inserted rows' {"id", "employee_code"}."""
+        raise NotImplementedError
+
+    def existing_employee_codes(self, codes):
+        """Subset of the given codes that are already taken"""
+        raise NotImplementedError
+
+    def employee_page(self, columns, after_id=None, limit=1000, updated_since=None):
+        """Employees with id > after_id (and updated_at >= updated_since), ordered by id"""
+        raise NotImplementedError
+
+    def search_employees(self, columns, search, department, sort, descending, after, limit):
+        """Employees list rows matching search/department, ordered by (sort, id);
+        after: (sort value, id) of the previous page's last row, or None"""
+        raise NotImplementedError
+
+    def get_employee(self, employee_id, columns):
+        """One employee, or None if there is no such id"""
+        raise NotImplementedError
+
+    def employees_by_ids(self, employee_ids, columns):
+        raise NotImplementedError
+
+    def update_employee(self, employee_id, data):
+        """Update the given columns. Returns False if the employee does not exist."""
+        raise NotImplementedError
+
+    def delete_employee(self, employee_id):
+        """Delete an employee (and their attendance). Returns False if not found."""
+        raise NotImplementedError
+
+    # --- Attendance ---
+    def insert_attendance(self, rows):
+        """Insert (employee_id, date, time, status) rows, skipping employees already
+        marked on that date. Returns the rows actually inserted."""
+        raise NotImplementedError
+
+    def attendance_employee_ids(self, date):
+        """Ids of the employees marked on a date"""
+        raise NotImplementedError
+
+    def recent_attendance(self, limit):
+        """Latest marks first: [{"name", "employee_code", "time", "status"}]"""
+        raise NotImplementedError
+
+    def attendance_counts(self, dates):
+        """{date: number of marks} for the given dates (ascending)"""
+        raise NotImplementedError
+
+    def attendance_page(self, date_from=None, date_to=None, department=None, employee_code=None,
+                        employee_id=None, after=None, limit=1000):
+        """Attendance joined with employees, newest first, ordered by (marked_at, id):
+        [{"id", "date", "time", "status", "marked_at", "name", "employee_code", "department"}];
+        after: the previous page's last row, or None"""
+        raise NotImplementedError
+
+    # --- Admins ---
+    def check_admin(self, username, password):
+        raise NotImplementedError
+
+
+def day_after(date):
+    """'YYYY-MM-DD' of the next day (None stays None): upper bound of a date range"""
+    if not date:
+        return None
+    return (datetime.date.fromisoformat(date) + datetime.timedelta(days=1)).isoformat()
+
+
+def create_storage(backend=STORAGE_BACKEND):
+    if backend == "supabase":
+        from .supabase_storage import SupabaseStorage
+        return SupabaseStorage()
+    if backend == "sqlite":
+        from .sqlite_storage import SqliteStorage
+        return SqliteStorage()
+    raise ValueError(f"Unknown STORAGE_BACKEND: '{backend}' (use 'supabase' or 'sqlite')")
+
+
+def get_storage():
+    """Process-wide storage backend chosen by STORAGE_BACKEND (thread-safe)"""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                _storage = create_storage()
+    return _storage
@@ -1,7 +1,19 @@
 import os
+import threading
+import time
 from supabase import create_client, Client
 from dotenv import load_dotenv
 
+try:
+    from supabase import ClientOptions
+except ImportError:  # very old supabase-py
+    ClientOptions = None
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -13,14 +25,116 @@ load_dotenv()
 SUPABASE_URL = os.environ.get("SUPABASE_URL", "YOUR_SUPABASE_URL_HERE")
 SUPABASE_KEY = os.environ.get("SUPABASE_KEY", "YOUR_SUPABASE_KEY_HERE")
 
-def get_supabase_client() -> Client:
-    if not SUPABASE_URL or "YOUR_SUPABASE_URL_HERE" in SUPABASE_URL or not SUPABASE_KEY or "YOUR_SUPABASE_KEY_HERE" in SUPABASE_KEY:
-        print("❌ Error: Supabase credentials not set in .env file or environment variables.")
-        return None
-        
+# HTTP settings of the shared client
+SUPABASE_TIMEOUT = float(os.environ.get("SUPABASE_TIMEOUT", "10"))
+SUPABASE_MAX_CONNECTIONS = int(os.environ.get("SUPABASE_MAX_CONNECTIONS", "20"))
+SUPABASE_KEEPALIVE_SECONDS = float(os.environ.get("SUPABASE_KEEPALIVE_SECONDS", "60"))
+
+# The shared client is probed at most this often, and replaced if the probe fails
+SUPABASE_HEALTH_CHECK_SECONDS = float(os.environ.get("SUPABASE_HEALTH_CHECK_SECONDS", "60"))
+
+_client = None
+_http_client = None
+_last_check = 0.0
+_client_lock = threading.Lock()
+_check_lock = threading.Lock()
+
+def _credentials_ok():
+    return not (not SUPABASE_URL or "YOUR_SUPABASE_URL_HERE" in SUPABASE_URL or not SUPABASE_KEY or "YOUR_SUPABASE_KEY_HERE" in SUPABASE_KEY)
+
+def _build_client():
+    """create_client with timeouts and a pooled keep-alive HTTP session (when supported)"""
+    global _http_client
+
+    if ClientOptions is None:
+        return create_client(SUPABASE_URL, SUPABASE_KEY)
+
+    if httpx is not None:
+        http_client = httpx.Client(
+            timeout=SUPABASE_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=SUPABASE_MAX_CONNECTIONS,
+                max_keepalive_connections=SUPABASE_MAX_CONNECTIONS,
+                keepalive_expiry=SUPABASE_KEEPALIVE_SECONDS,
+            ),
+        )
+        try:
+            options = ClientOptions(postgrest_client_timeout=SUPABASE_TIMEOUT, httpx_client=http_client)
+            client = create_client(SUPABASE_URL, SUPABASE_KEY, options=options)
+            _http_client = http_client
+            return client
+        except TypeError:
+            # supabase-py without httpx_client support: it keeps its own session
+            http_client.close()
+
+    options = ClientOptions(postgrest_client_timeout=SUPABASE_TIMEOUT)
+    return create_client(SUPABASE_URL, SUPABASE_KEY, options=options)
+
+def _is_healthy(client):
+    """Cheap round-trip on the pooled connection"""
     try:
-        supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-        return supabase
+        client.table("admins").select("id").limit(1).execute()
+        return True
     except Exception as e:
-        print(f"❌ Error initializing Supabase client: {e}")
+        print(f"⚠️ Supabase health check failed: {e}")
+        return False
+
+def reset_supabase_client():
+    """Drop the shared client; the next get_supabase_client() builds a fresh one"""
+    global _client, _http_client
+    with _client_lock:
+        if _http_client is not None:
+            try:
+                _http_client.close()
+            except Exception:
+                pass
+        _client = None
+        _http_client = None
+
+def _maybe_health_check(client):
+    global _last_check
+    if time.time() - _last_check < SUPABASE_HEALTH_CHECK_SECONDS:
+        return client
+
+    # Only one thread probes; the others keep using the current client
+    if not _check_lock.acquire(blocking=False):
+        return client
+    try:
+        _last_check = time.time()
+        if _is_healthy(client):
+            return client
+        print("🔄 Recycling Supabase client...")
+        reset_supabase_client()
+    finally:
+        _check_lock.release()
+
+    return get_supabase_client()
+
+def quote_filter_value(value):
+    """Double-quote a value for a PostgREST logic tree (commas, dots, parentheses)"""
+    text = str(value).replace('\\', '\\\\').replace('"', '\\"')
+    return f'"{text}"'
+
+def get_supabase_client() -> Client:
+    """
+    Process-wide Supabase client (thread-safe, reused by every caller so
+    HTTP connections are kept alive between requests).
+    """
+    global _client, _last_check
+    if not _credentials_ok():
+        print("❌ Error: Supabase credentials not set in .env file or environment variables.")
         return None
+
+    client = _client
+    if client is not None:
+        return _maybe_health_check(client)
+
+    with _client_lock:
+        if _client is None:
+            try:
+                _client = _build_client()
+                _last_check = time.time()
+            except Exception as e:
+                print(f"❌ Error initializing Supabase client: {e}")
+                return None
+        return _client
@@ -0,0 +1,214 @@
+# name file: database_modules/supabase_storage.py
+from concurrent.futures import ThreadPoolExecutor
+
+from .supabase_client import get_supabase_client, quote_filter_value
+from .encoding_codec import encode_face_encoding
+from .storage import Storage, day_after
+
+# Codes per `in` filter (keeps the request URL short)
+CODE_LOOKUP_BATCH = 200
+
+# Columns matched by the employees page search box
+SEARCH_COLUMNS = ("name", "employee_code", "department")
+
+
+class SupabaseStorage(Storage):
+    """Storage on Supabase (PostgREST) through the shared client"""
+
+    def __init__(self):
+        self._rpc_available = True
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="SupabaseCounts")
+
+    def _client(self):
+        supabase = get_supabase_client()
+        if not supabase:
+            raise ConnectionError("Supabase client not initialized.")
+        return supabase
+
+    # --- Employees ---
+    def insert_employees(self, rows):
+        rows = [
+            # Compact base64 float32 by default (FACE_ENCODING_FORMAT)
+            {**row, "face_encoding": encode_face_encoding(row['face_encoding'])}
+            for row in rows
+        ]
+        response = self._client().table("employees").insert(rows).execute()
+        return [{"id": row['id'], "employee_code": row['employee_code']} for row in response.data or []]
+
+    def existing_employee_codes(self, codes):
+        supabase = self._client()
+        codes = list(codes)
+        existing = set()
+        for start in range(0, len(codes), CODE_LOOKUP_BATCH):
+            chunk = codes[start:start + CODE_LOOKUP_BATCH]
+            response = supabase.table("employees").select("employee_code").in_("employee_code", chunk).execute()
+            existing.update(row['employee_code'] for row in response.data)
+        return existing
+
+    def employee_page(self, columns, after_id=None, limit=1000, updated_since=None):
+        # Keyset pagination on id: an indexed range scan, never cut by max-rows
+        query = self._client().table("employees").select(columns)
+        if updated_since:
+            query = query.gte("updated_at", updated_since)
+        if after_id is not None:
+            query = query.gt("id", after_id)
+        return query.order("id").limit(limit).execute().data or []
+
+    def search_employees(self, columns, search, department, sort, descending, after, limit):
+        query = self._client().table("employees").select(columns)
+        if department:
+            query = query.eq("department", department)
+
+        conditions = []
+
+        # '*' is PostgREST's wildcard; user input is matched literally
+        search = (search or "").replace("*", "").replace("%", "").strip()
+        if search:
+            pattern = quote_filter_value(f"*{search}*")
+            conditions.append("or(" + ",".join(f"{column}.ilike.{pattern}" for column in SEARCH_COLUMNS) + ")")
+
+        if after is not None:
+            value, last_id = after
+            op = "lt" if descending else "gt"
+            if sort == "id":
+                conditions.append(f"id.{op}.{last_id}")
+            else:
+                value = quote_filter_value(value)
+                conditions.append(f"or({sort}.{op}.{value},and({sort}.eq.{value},id.{op}.{last_id}))")
+
+        if conditions:
+            # One logic tree (or=(and(...))): repeated or= parameters are not combined
+            query = query.or_("and(" + ",".join(conditions) + ")")
+
+        query = query.order(sort, desc=descending)
+        if sort != "id":
+            query = query.order("id", desc=descending)
+        return query.limit(limit).execute().data or []
+
+    def get_employee(self, employee_id, columns):
+        rows = self._client().table("employees").select(columns).eq("id", employee_id).limit(1).execute().data
+        return rows[0] if rows else None
+
+    def employees_by_ids(self, employee_ids, columns):
+        return self._client().table("employees").select(columns).in_("id", list(employee_ids)).execute().data or []
+
+    def update_employee(self, employee_id, data):
+        response = self._client().table("employees").update(data).eq("id", employee_id).execute()
+        return bool(response.data)
+
+    def delete_employee(self, employee_id):
+        # Attendance goes with it (on delete cascade)
+        response = self._client().table("employees").delete().eq("id", employee_id).execute()
+        return bool(response.data)
+
+    # --- Attendance ---
+    def insert_attendance(self, rows):
+        # Rows that already exist for (employee_id, date) are skipped by the database
+        response = self._client().table("attendance") \
+            .upsert(rows, on_conflict="employee_id,date", ignore_duplicates=True) \
+            .execute()
+        return response.data or []
+
+    def attendance_employee_ids(self, date):
+        response = self._client().table("attendance").select("employee_id").eq("date", date).execute()
+        return [row['employee_id'] for row in response.data]
+
+    def recent_attendance(self, limit):
+        response = self._client().table("attendance") \
+            .select("time, status, employees(name, employee_code)") \
+            .order("marked_at", desc=True) \
+            .order("id", desc=True) \
+            .limit(limit) \
+            .execute()
+
+        recent = []
+        for row in response.data:
+            emp = row.get('employees') or {}
+            recent.append({
+                'name': emp.get('name'),
+                'employee_code': emp.get('employee_code'),
+                'time': row['time'],
+                'status': row['status']
+            })
+        return recent
+
+    def _count_on(self, supabase, date):
+        """Rows on one date; only the count travels (Content-Range), not the rows"""
+        response = supabase.table("attendance").select("id", count="exact").eq("date", date).limit(1).execute()
+        return response.count or 0
+
+    def attendance_counts(self, dates):
+        """
+        Uses the attendance_daily_counts() GROUP BY function when it exists,
+        otherwise one concurrent count-only query per day.
+        """
+        supabase = self._client()
+
+        if self._rpc_available:
+            try:
+                response = supabase.rpc("attendance_daily_counts", {"since": dates[0]}).execute()
+                counts = {row['date']: row['count'] for row in response.data}
+                return {date: counts.get(date, 0) for date in dates}
+            except Exception as e:
+                if not _missing_function(e):
+                    # Network hiccup etc.: the next call tries the function again
+                    raise
+                # Function not installed (see README): stop trying until restart
+                print(f"⚠️ attendance_daily_counts() unavailable, counting per day: {e}")
+                self._rpc_available = False
+
+        counts = self._executor.map(lambda date: self._count_on(supabase, date), dates)
+        return dict(zip(dates, counts))
+
+    def attendance_page(self, date_from=None, date_to=None, department=None, employee_code=None,
+                        employee_id=None, after=None, limit=1000):
+        # !inner: filters on the embedded employee also filter attendance rows
+        join = "employees!inner" if department or employee_code else "employees"
+        query = self._client().table("attendance") \
+            .select(f"id, date, time, status, marked_at, {join}(name, employee_code, department)")
+        # Date range on marked_at: one index serves the filter and the order
+        if date_from:
+            query = query.gte("marked_at", date_from)
+        if date_to:
+            query = query.lt("marked_at", day_after(date_to))
+        if employee_id:
+            query = query.eq("employee_id", employee_id)
+        if department:
+            query = query.eq("employees.department", department)
+        if employee_code:
+            query = query.eq("employees.employee_code", employee_code)
+
+        if after is not None:
+            marked_at = quote_filter_value(after['marked_at'])
+            query = query.or_(f"marked_at.lt.{marked_at},and(marked_at.eq.{marked_at},id.lt.{after['id']})")
+
+        rows = query.order("marked_at", desc=True) \
+            .order("id", desc=True) \
+            .limit(limit) \
+            .execute().data or []
+
+        page = []
+        for row in rows:
+            emp = row.get('employees') or {}
+            page.append({
+                "id": row['id'],
+                "date": row['date'],
+                "time": row['time'],
+                "status": row['status'],
+                "marked_at": row['marked_at'],
+                "name": emp.get('name'),
+                "employee_code": emp.get('employee_code'),
+                "department": emp.get('department'),
+            })
+        return page
+
+    # --- Admins ---
+    def check_admin(self, username, password):
+        response = self._client().table('admins').select("id").eq('username', username).eq('password', password).execute()
+        return bool(response.data)
+
+
+def _missing_function(e):
+    """PostgREST's "function not found" (PGRST202, HTTP 404; 42883 from Postgres itself)"""
+    code = str(getattr(e, "code", "") or "")
+    return code in ("PGRST202", "42883", "404") or "PGRST202" in str(e)
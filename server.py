@@ -2,7 +2,10 @@ from waitress import serve
 from web_interface.app import app
 import os
 
+# Worker threads; all of them share one pooled Supabase client
+WAITRESS_THREADS = int(os.environ.get("WAITRESS_THREADS", "8"))
+
 if __name__ == "__main__":
     print("🚀 Starting Production Server for Smart Attendance...")
     print("🌍 Server running on http://localhost:8080")
-    serve(app, host='localhost', port=8080)
+    serve(app, host='localhost', port=8080, threads=WAITRESS_THREADS)
@@ -0,0 +1,127 @@
+# name file: tests/test_notifications.py
+"""
+NotificationDispatcher against a stand-in SMTP server (smtplib.SMTP mocked).
+
+Usage (from the project root):
+    python -m unittest tests.test_notifications
+"""
+import os
+import smtplib
+import sys
+import time
+import unittest
+from unittest import mock
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import notifications
+from utils.notifications import NotificationDispatcher, build_attendance_message
+
+
+class FakeSMTP:
+    """Records what is sent; `failures` maps an address to the errors to raise, in order"""
+
+    def __init__(self, failures=None, login_errors=()):
+        self.failures = failures or {}
+        self.login_errors = list(login_errors)
+        self.sent = []
+        self.connections = 0
+        self.quits = 0
+
+    def connect(self, host, port, timeout=None):
+        self.connections += 1
+        return self
+
+    def starttls(self):
+        pass
+
+    def login(self, user, password):
+        if self.login_errors:
+            raise self.login_errors.pop(0)
+
+    def sendmail(self, sender, to_email, body):
+        errors = self.failures.get(to_email)
+        if errors:
+            raise errors.pop(0)
+        self.sent.append(to_email)
+
+    def quit(self):
+        self.quits += 1
+
+
+class NotificationDispatcherTest(unittest.TestCase):
+
+    def run_dispatcher(self, server, addresses, wait_for, timeout=5, **kwargs):
+        patches = [
+            mock.patch.object(notifications.smtplib, "SMTP", side_effect=server.connect),
+            mock.patch.object(notifications, "NOTIFY_RETRY_SECONDS", 0.05),
+            mock.patch.object(notifications, "SENDER_PASSWORD", "secret"),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+        dispatcher = NotificationDispatcher(use_tls=False, **kwargs)
+        dispatcher.start()
+        for to_email in addresses:
+            dispatcher.submit(to_email, build_attendance_message(to_email, "Test", "09:00:00", "2026-01-01"))
+
+        deadline = time.time() + timeout
+        while not wait_for(dispatcher) and time.time() < deadline:
+            time.sleep(0.02)
+        dispatcher.stop()
+        return dispatcher.metrics()
+
+    def test_one_session_for_many_emails(self):
+        server = FakeSMTP()
+        addresses = [f"user{i}@example.com" for i in range(5)]
+        metrics = self.run_dispatcher(server, addresses, lambda d: d.metrics()['sent'] == 5)
+
+        self.assertEqual(server.sent, addresses)
+        self.assertEqual(server.connections, 1)
+        self.assertEqual(metrics['failed'], 0)
+
+    def test_refused_recipient_is_dropped_without_reconnecting(self):
+        server = FakeSMTP(failures={
+            "gone@example.com": [smtplib.SMTPRecipientsRefused({"gone@example.com": (550, b"no such user")})],
+        })
+        metrics = self.run_dispatcher(server, ["gone@example.com", "ok@example.com"],
+                                      lambda d: d.metrics()['sent'] == 1)
+
+        self.assertEqual(server.sent, ["ok@example.com"])
+        self.assertEqual(server.connections, 1)
+        self.assertEqual(metrics['failed'], 1)
+
+    def test_temporary_failure_is_retried_without_holding_up_the_queue(self):
+        server = FakeSMTP(failures={"busy@example.com": [smtplib.SMTPDataError(451, b"try again later")]})
+        metrics = self.run_dispatcher(server, ["busy@example.com", "ok@example.com"],
+                                      lambda d: d.metrics()['sent'] == 2)
+
+        self.assertEqual(server.sent, ["ok@example.com", "busy@example.com"])
+        self.assertEqual(metrics['failed'], 0)
+
+    def test_refused_login_pauses_the_queue_instead_of_dropping_it(self):
+        auth_error = smtplib.SMTPAuthenticationError(535, b"bad credentials")
+        server = FakeSMTP(login_errors=[auth_error] * 3)
+        addresses = [f"user{i}@example.com" for i in range(3)]
+        metrics = self.run_dispatcher(server, addresses, lambda d: d.metrics()['sent'] == 3, max_attempts=1)
+
+        # Three refused logins cost no email its (single) attempt
+        self.assertEqual(sorted(server.sent), addresses)
+        self.assertEqual(server.connections, 4)
+        self.assertEqual(metrics['failed'], 0)
+
+    def test_server_disconnect_reconnects_once(self):
+        server = FakeSMTP(failures={"user@example.com": [smtplib.SMTPServerDisconnected("idle timeout")]})
+        metrics = self.run_dispatcher(server, ["first@example.com"], lambda d: d.metrics()['sent'] == 1)
+        self.assertEqual(metrics['sent'], 1)
+
+        dispatcher = NotificationDispatcher(use_tls=False)
+        dispatcher._server = server  # a pooled session the server has since closed
+        self.assertEqual(dispatcher._send("user@example.com", build_attendance_message(
+            "user@example.com", "Test", "09:00:00", "2026-01-01")), "sent")
+        self.assertEqual(server.connections, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,50 +1,88 @@
 # File: utils/notifications.py
+import heapq
+import itertools
+import os
+import queue
 import smtplib
+import threading
+import time
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
 # --- Email Settings ---
 # Replace with your real data or use environment variables
-SENDER_EMAIL = "aboodymaji@gmail.com"  
-SENDER_PASSWORD = "vusn mqqh qvrw pouv" # App Password (16 chars)
+SENDER_EMAIL = os.environ.get("SENDER_EMAIL", "aboodymaji@gmail.com")
+SENDER_PASSWORD = os.environ.get("SENDER_PASSWORD", "vusn mqqh qvrw pouv") # App Password (16 chars)
+
+# SMTP server (point at a local smtpd/aiosmtpd with SMTP_USE_TLS=0 for testing)
+SMTP_HOST = os.environ.get("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.environ.get("SMTP_PORT", "587"))
+SMTP_USE_TLS = os.environ.get("SMTP_USE_TLS", "1") not in ("0", "false", "False")
+SMTP_TIMEOUT = float(os.environ.get("SMTP_TIMEOUT", "15"))
+
+# Background dispatcher
+NOTIFY_QUEUE_SIZE = int(os.environ.get("NOTIFY_QUEUE_SIZE", "500"))
+NOTIFY_BATCH_SIZE = int(os.environ.get("NOTIFY_BATCH_SIZE", "20"))
+NOTIFY_MAX_ATTEMPTS = int(os.environ.get("NOTIFY_MAX_ATTEMPTS", "4"))
+NOTIFY_RETRY_SECONDS = 2
+# While the SMTP server is unreachable or refuses the login, the whole queue
+# waits (doubling up to this) instead of spending the emails' attempts
+NOTIFY_OFFLINE_MAX_SECONDS = 300
+# Queue depth and counters are printed this often (seconds) while mail flows
+NOTIFY_STATS_SECONDS = float(os.environ.get("NOTIFY_STATS_SECONDS", "300"))
+# Close the pooled SMTP session after this long without mail
+NOTIFY_IDLE_SECONDS = 60
+
+def build_attendance_message(to_email, employee_name, time, date):
+    """Build the attendance notification email"""
+    # Prepare content
+    subject = f"🔔 Attendance Alert: {employee_name}"
+    body = f"""
+    Dear {employee_name},
+
+    This is an automated notification from the Smart Attendance System.
+
+    ✅ Employee Name: {employee_name}
+    🕒 Time: {time}
+    📅 Date: {date}
+    Status: Present
+
+    Best Regards,
+    HR Administration
+    """
+
+    # Prepare structure
+    msg = MIMEMultipart()
+    msg['From'] = SENDER_EMAIL
+    msg['To'] = to_email
+    msg['Subject'] = subject
+    msg.attach(MIMEText(body, 'plain'))
+    return msg
+
+def _open_smtp(host, port, use_tls, timeout):
+    """Connect (+ STARTTLS + login) to the SMTP server"""
+    server = smtplib.SMTP(host, port, timeout=timeout)
+    if use_tls:
+        server.starttls() # Enable encryption
+    if SENDER_PASSWORD:
+        server.login(SENDER_EMAIL, SENDER_PASSWORD)
+    return server
 
 def send_attendance_email(to_email, employee_name, time, date):
     """
     Function to send email notification to the employee
+    (synchronous, one connection per email; see queue_attendance_email)
     """
     if not to_email or "@" not in to_email:
         print("⚠️ Warning: Invalid email address.")
         return
 
     try:
-        # Prepare content
-        subject = f"🔔 Attendance Alert: {employee_name}"
-        body = f"""
-        Dear {employee_name},
-        
-        This is an automated notification from the Smart Attendance System.
-        
-        ✅ Employee Name: {employee_name}
-        🕒 Time: {time}
-        📅 Date: {date}
-        Status: Present
-        
-        Best Regards,
-        HR Administration
-        """
-
-        # Prepare structure
-        msg = MIMEMultipart()
-        msg['From'] = SENDER_EMAIL
-        msg['To'] = to_email
-        msg['Subject'] = subject
-        msg.attach(MIMEText(body, 'plain'))
+        msg = build_attendance_message(to_email, employee_name, time, date)
 
         # Connect to Gmail Server
-        server = smtplib.SMTP('smtp.gmail.com', 587)
-        server.starttls() # Enable encryption
-        server.login(SENDER_EMAIL, SENDER_PASSWORD)
-        
+        server = _open_smtp(SMTP_HOST, SMTP_PORT, SMTP_USE_TLS, SMTP_TIMEOUT)
+
         # Send
         text = msg.as_string()
         server.sendmail(SENDER_EMAIL, to_email, text)
@@ -55,4 +93,268 @@ def send_attendance_email(to_email, employee_name, time, date):
 
     except Exception as e:
         print(f"❌ Failed to send email: {e}")
-        return False
\ No newline at end of file
+        return False
+
+
+class NotificationDispatcher:
+    """
+    Background email sender.
+    Emails are queued (bounded, never blocks the caller) and sent in batches
+    over one authenticated SMTP session that is reused between batches.
+    Transient failures are rescheduled with backoff (a due time, so the rest
+    of the queue keeps flowing) and retried on a fresh connection; permanent
+    ones (5xx replies, refused recipients) are dropped at once. When the
+    server itself is unusable (unreachable, login refused) the whole queue
+    pauses with backoff and no email loses an attempt.
+    """
+
+    def __init__(self, host=SMTP_HOST, port=SMTP_PORT, use_tls=SMTP_USE_TLS, timeout=SMTP_TIMEOUT,
+                 queue_size=NOTIFY_QUEUE_SIZE, batch_size=NOTIFY_BATCH_SIZE, max_attempts=NOTIFY_MAX_ATTEMPTS):
+        self.host = host
+        self.port = port
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self._queue = queue.Queue(maxsize=queue_size)
+        # (due time, seq, to_email, msg, attempt), only touched by the dispatcher thread
+        self._retries = []
+        self._retry_seq = itertools.count()
+        self._server = None
+        self._last_used = 0.0
+        self._offline_until = 0.0
+        self._offline_delay = NOTIFY_RETRY_SECONDS
+        self._last_report = time.time()
+        self._reported = None
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._metrics_lock = threading.Lock()
+        self._sent = 0
+        self._failed = 0
+        self._dropped = 0
+        self._latency_total = 0.0
+        self._latency_last = 0.0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="NotificationDispatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=10):
+        """Send what is queued, then close the SMTP session"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def submit(self, to_email, msg):
+        """Queue a message. Returns False if the queue is full or the address invalid."""
+        if not to_email or "@" not in to_email:
+            print("⚠️ Warning: Invalid email address.")
+            return False
+        try:
+            self._queue.put_nowait((to_email, msg, 1))
+            return True
+        except queue.Full:
+            with self._metrics_lock:
+                self._dropped += 1
+            print(f"⚠️ Notification queue full, dropping email to {to_email}")
+            return False
+
+    def metrics(self):
+        """Queue depth, counters and send latency (ms)"""
+        with self._metrics_lock:
+            sent = self._sent
+            return {
+                "queue_depth": self._queue.qsize(),
+                "sent": sent,
+                "failed": self._failed,
+                "dropped": self._dropped,
+                "retrying": len(self._retries),
+                "offline": time.time() < self._offline_until,
+                "avg_send_ms": (self._latency_total / sent * 1000) if sent else 0.0,
+                "last_send_ms": self._latency_last * 1000,
+            }
+
+    def _connection(self):
+        if self._server is not None:
+            return self._server
+        self._server = _open_smtp(self.host, self.port, self.use_tls, self.timeout)
+        return self._server
+
+    def _close(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except Exception:
+                pass
+            self._server = None
+
+    def _due_retries(self):
+        """Rescheduled sends whose backoff has elapsed (all of them when stopping)"""
+        now = time.time()
+        due = []
+        while self._retries and len(due) < self.batch_size \
+                and (self._retries[0][0] <= now or self._stop_event.is_set()):
+            _, _, to_email, msg, attempt = heapq.heappop(self._retries)
+            due.append((to_email, msg, attempt))
+        return due
+
+    def _reschedule(self, to_email, msg, attempt, due):
+        heapq.heappush(self._retries, (due, next(self._retry_seq), to_email, msg, attempt))
+
+    def _next_batch(self):
+        wait = self._offline_until - time.time()
+        if wait > 0:
+            # Server unusable: leave everything queued until the backoff ends
+            self._stop_event.wait(min(wait, 1.0))
+            return []
+
+        batch = self._due_retries()
+        if not batch:
+            # Wake up in time for the next retry even if nothing new is queued
+            timeout = 1.0
+            if self._retries:
+                timeout = min(timeout, max(0.0, self._retries[0][0] - time.time()))
+            try:
+                batch = [self._queue.get(timeout=timeout)]
+            except queue.Empty:
+                return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _report_metrics(self):
+        """Print queue depth and counters every NOTIFY_STATS_SECONDS when they changed"""
+        if time.time() - self._last_report < NOTIFY_STATS_SECONDS:
+            return
+        self._last_report = time.time()
+        metrics = self.metrics()
+        counters = (metrics['sent'], metrics['failed'], metrics['dropped'], metrics['queue_depth'], metrics['retrying'])
+        if counters == self._reported:
+            return
+        self._reported = counters
+        print(f"📊 Notifications: {metrics['queue_depth']} queued, {metrics['retrying']} retrying, "
+              f"{metrics['sent']} sent, {metrics['failed']} failed, {metrics['dropped']} dropped, "
+              f"avg {metrics['avg_send_ms']:.0f} ms" + (" (SMTP server unavailable)" if metrics['offline'] else ""))
+
+    def _run(self):
+        while not (self._stop_event.is_set() and self._queue.empty() and not self._retries):
+            self._report_metrics()
+            if self._stop_event.is_set() and time.time() < self._offline_until:
+                break  # shutting down while the server is unusable
+
+            batch = self._next_batch()
+
+            if not batch:
+                if self._server is not None and time.time() - self._last_used > NOTIFY_IDLE_SECONDS:
+                    self._close()
+                continue
+
+            for position, (to_email, msg, attempt) in enumerate(batch):
+                result = self._send(to_email, msg)
+                if result == "sent":
+                    self._offline_delay = NOTIFY_RETRY_SECONDS
+                    continue
+                if result == "offline":
+                    # Keep this email and the rest of the batch, with their attempts
+                    self._offline_until = time.time() + self._offline_delay
+                    print(f"⚠️ SMTP server unavailable, pausing notifications for {self._offline_delay:.0f}s.")
+                    self._offline_delay = min(self._offline_delay * 2, NOTIFY_OFFLINE_MAX_SECONDS)
+                    for item in batch[position:]:
+                        self._reschedule(*item, due=self._offline_until)
+                    break
+                if result == "retry" and attempt < self.max_attempts:
+                    self._reschedule(to_email, msg, attempt + 1,
+                                     due=time.time() + NOTIFY_RETRY_SECONDS * 2 ** (attempt - 1))
+                    continue
+
+                with self._metrics_lock:
+                    self._failed += 1
+                if result == "retry":
+                    print(f"❌ Failed to send email to {to_email} after {attempt} attempts.")
+
+        pending = self._queue.qsize() + len(self._retries)
+        if pending:
+            print(f"⚠️ Notification dispatcher stopped with {pending} emails unsent.")
+        self._close()
+
+    def _send(self, to_email, msg):
+        """
+        Returns "sent", "retry" (this email failed, try it again later),
+        "permanent" (drop it) or "offline" (the server is unusable right now).
+        """
+        start = time.perf_counter()
+        # A pooled session may have been closed by the server: reconnect once at once
+        for fresh in ((False, True) if self._server is not None else (True,)):
+            try:
+                server = self._connection()
+            except (smtplib.SMTPException, OSError) as e:
+                # Unreachable, TLS failure or login refused (e.g. a wrong password)
+                print(f"⚠️ SMTP connection problem: {e}")
+                self._close()
+                return "offline"
+
+            try:
+                server.sendmail(SENDER_EMAIL, to_email, msg.as_string())
+                break
+            except smtplib.SMTPRecipientsRefused as e:
+                # The session is still fine (smtplib already reset the transaction)
+                print(f"❌ Email to {to_email} refused, not retrying: {e.recipients}")
+                return "permanent"
+            except smtplib.SMTPResponseException as e:
+                if e.smtp_code >= 500:
+                    print(f"❌ Email to {to_email} rejected ({e.smtp_code}), not retrying: {e.smtp_error}")
+                    return "permanent"
+                print(f"⚠️ Email to {to_email} deferred ({e.smtp_code}): {e.smtp_error}")
+                self._close()
+                return "retry"
+            except smtplib.SMTPException as e:
+                if not isinstance(e, smtplib.SMTPServerDisconnected):
+                    print(f"❌ Failed to send email: {e}")
+                    self._close()
+                    return "retry"
+                error = e
+            except OSError as e:  # after the SMTP errors, which are OSErrors too
+                error = e
+
+            # The connection is gone
+            self._close()
+            if fresh:
+                print(f"⚠️ SMTP connection problem: {error}")
+                return "offline"
+
+        elapsed = time.perf_counter() - start
+        self._last_used = time.time()
+        with self._metrics_lock:
+            self._sent += 1
+            self._latency_total += elapsed
+            self._latency_last = elapsed
+        print(f"📧 Email sent successfully to {to_email}")
+        return "sent"
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+def get_notification_dispatcher():
+    """Process-wide NotificationDispatcher, started on first use"""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = NotificationDispatcher()
+            _dispatcher.start()
+        return _dispatcher
+
+def stop_notification_dispatcher():
+    """Flush queued emails and close the SMTP session (call at shutdown)"""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is not None:
+            _dispatcher.stop()
+            _dispatcher = None
+
+def queue_attendance_email(to_email, employee_name, time, date):
+    """Non-blocking version of send_attendance_email (background dispatcher)"""
+    msg = build_attendance_message(to_email, employee_name, time, date)
+    return get_notification_dispatcher().submit(to_email, msg)
@@ -1,25 +1,11 @@
 # name file: view_attendance.py
-from database_modules.supabase_client import get_supabase_client
-
-# Connect to database
-supabase = get_supabase_client()
+from database_modules.storage import get_storage
 
 print("\n--- 📋 HR Attendance Report (Today & Recent) ---")
 
-if not supabase:
-    print("❌ Error: Supabase connection failed.")
-    exit()
-
 try:
-    # Fetch data joining attendance and employees
-    # Note: Assuming 'employees' FK relationship exists on 'employee_id'
-    response = supabase.table("attendance") \
-        .select("time, status, employees(name, employee_code)") \
-        .order("time", desc=True) \
-        .limit(20) \
-        .execute()
-    
-    rows = response.data
+    # Latest marks joined with their employees (Supabase or local SQLite)
+    rows = get_storage().recent_attendance(20)
 
     if len(rows) == 0:
         print("No attendance records found yet.")
@@ -27,9 +13,8 @@ try:
         print(f"{'Name':<20} | {'ID':<10} | {'Time':<10} | {'Status'}")
         print("-" * 55)
         for row in rows:
-            emp = row.get('employees') or {}
-            name = emp.get('name', 'Unknown')
-            code = emp.get('employee_code', '-')
+            name = row['name'] or 'Unknown'
+            code = row['employee_code'] or '-'
             
             # Truncate long names
             if len(name) > 19:
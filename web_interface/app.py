@@ -1,16 +1,10 @@
 # File: web_interface/app.py
-from flask import Flask, render_template, request, redirect, url_for, flash, session, make_response
+from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, Response, stream_with_context
 import os
 import sys
-import face_recognition
-import numpy as np
-import base64
-import cv2
-import csv
-from io import StringIO
+import shutil
+import tempfile
 from functools import wraps
-import datetime
-from collections import Counter
 
 # Setup Paths
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -23,10 +17,19 @@ from database_modules.employee_crud import (
     delete_employee_by_id, 
     get_employee_by_id, 
     update_employee_data,
-    get_all_employees
+    search_employees,
+    EMPLOYEE_LIST_PAGE_SIZE,
+    EMPLOYEE_SORT_COLUMNS
 )
-from database_modules.attendance_logger import mark_attendance
-from database_modules.supabase_client import get_supabase_client
+from database_modules.storage import get_storage
+from database_modules.dashboard_stats import get_dashboard_stats
+from database_modules.query_cache import cache_stats
+from database_modules.attendance_export import EXPORT_FORMATS, iter_attendance_pages, iter_export, parquet_available
+from ai_modules.face_gallery import DEFAULT_TOLERANCE
+from ai_modules.image_io import data_url_bytes
+from ai_modules.enrollment import encode_photos
+from ai_modules.scan_jobs import ScanJobQueue
+from ai_modules.enroll_jobs import EnrollJobQueue, ENROLL_ARCHIVE_NAME, ENROLL_MANIFEST_NAME
 
 # App Config
 app = Flask(__name__)
@@ -39,6 +42,11 @@ os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(PROCESSED_FOLDER, exist_ok=True)
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 
+# Background group scans (annotated results are written to PROCESSED_FOLDER)
+scan_jobs = ScanJobQueue(PROCESSED_FOLDER)
+# Background bulk enrollments (photos encoded in the shared face worker pool)
+enroll_jobs = EnrollJobQueue()
+
 # --- Security Decorator ---
 def login_required(f):
     @wraps(f)
@@ -56,16 +64,8 @@ def login():
         username = request.form['username']
         password = request.form['password']
         
-        supabase = get_supabase_client()
-        if not supabase:
-             flash('❌ Database connection error.', 'danger')
-             return render_template('login.html')
-
         try:
-            response = supabase.table('admins').select("*").eq('username', username).eq('password', password).execute()
-            
-            # response.data is a list
-            if response.data and len(response.data) > 0:
+            if get_storage().check_admin(username, password):
                 session['admin_logged_in'] = True
                 session['username'] = username
                 flash('✅ Welcome back, Admin!', 'success')
@@ -87,62 +87,21 @@ def logout():
 @app.route('/')
 @login_required
 def index():
-    supabase = get_supabase_client()
     attendance_data = []
     today_count = 0
     chart_dates = []
     chart_counts = []
 
-    if supabase:
-        try:
-            # 1. Last 10 records
-            # Note: This assumes a foreign key 'employee_id' in 'attendance' points to 'employees.id'
-            att_response = supabase.table("attendance") \
-                .select("*, employees(name, employee_code)") \
-                .order("id", desc=True) \
-                .limit(10) \
-                .execute()
-            
-            raw_data = att_response.data
-            
-            # Flatten/Clean data for template
-            for row in raw_data:
-                emp = row.get('employees') or {}
-                attendance_data.append({
-                    'name': emp.get('name', 'Unknown'),
-                    'employee_code': emp.get('employee_code', '-'),
-                    'time': row['time'],
-                    'status': row['status']
-                })
-            
-            # 2. Today's count
-            today = datetime.datetime.now().strftime("%Y-%m-%d")
-            count_response = supabase.table("attendance") \
-                .select("*", count="exact") \
-                .eq("date", today) \
-                .execute()
-            today_count = count_response.count
-
-            # 3. Chart Data (Last 7 Days)
-            # Fetch last 7 days of data and aggregate in Python
-            # This is simpler than complex RPCs for now
-            seven_days_ago = (datetime.datetime.now() - datetime.timedelta(days=7)).strftime("%Y-%m-%d")
-            chart_response = supabase.table("attendance") \
-                .select("date") \
-                .gte("date", seven_days_ago) \
-                .execute()
-            
-            dates = [r['date'] for r in chart_response.data]
-            date_counts = Counter(dates)
-            
-            # Sort by date
-            sorted_dates = sorted(date_counts.keys())
-            chart_dates = sorted_dates
-            chart_counts = [date_counts[d] for d in sorted_dates]
-
-        except Exception as e:
-            print(f"Error loading index: {e}")
-            flash(f"Error loading data: {e}", "warning")
+    try:
+        # Aggregated in the database, fetched concurrently, cached briefly
+        stats = get_dashboard_stats()
+        attendance_data = stats['recent']
+        today_count = stats['today_count']
+        chart_dates = stats['chart_dates']
+        chart_counts = stats['chart_counts']
+    except Exception as e:
+        print(f"Error loading index: {e}")
+        flash(f"Error loading data: {e}", "warning")
 
     return render_template('index.html', 
                            attendance=attendance_data, 
@@ -153,10 +112,43 @@ def index():
 @app.route('/employees')
 @login_required
 def employees_list():
-    employees = get_all_employees()
-    # Ensure all keys exist for template even if Supabase returns partial
-    # Template likely uses: id, name, employee_code, department, email
-    return render_template('employees.html', employees=employees)
+    # Filtering, sorting and paging happen in the database (display columns only)
+    search = request.args.get('q', '').strip()
+    department = request.args.get('department', '').strip()
+    sort = request.args.get('sort', 'name')
+    if sort not in EMPLOYEE_SORT_COLUMNS:
+        sort = 'name'
+    order = 'desc' if request.args.get('order') == 'desc' else 'asc'
+    per_page = request.args.get('per_page', EMPLOYEE_LIST_PAGE_SIZE, type=int)
+    per_page = max(1, min(per_page, 200))
+    cursor = request.args.get('cursor') or None
+
+    employees = []
+    next_cursor = None
+    try:
+        employees, next_cursor = search_employees(search, department, sort, order == 'desc', cursor, per_page)
+    except ValueError:
+        # Stale or edited page link: start over
+        flash("Invalid page link, showing the first page.", "warning")
+        cursor = None
+        try:
+            employees, next_cursor = search_employees(search, department, sort, order == 'desc', None, per_page)
+        except Exception as e:
+            flash(f"Error loading employees: {e}", "danger")
+    except Exception as e:
+        print(f"Error loading employees: {e}")
+        flash(f"Error loading employees: {e}", "danger")
+
+    # Query string shared by the sort links and the pager
+    filters = {'q': search, 'department': department, 'per_page': per_page}
+
+    return render_template('employees.html',
+                           employees=employees,
+                           next_cursor=next_cursor,
+                           cursor=cursor,
+                           filters=filters,
+                           sort=sort,
+                           order=order)
 
 # --- Employee Management ---
 @app.route('/add_employee', methods=['GET', 'POST'])
@@ -168,60 +160,106 @@ def add_employee():
         email = request.form['email']
         department = request.form.get('department', 'General')
         
-        all_encodings = []
+        photos = []
         
-        # 1. Process Uploaded Photos
-        files = request.files.getlist('photos')
-        for file in files:
+        # 1. Uploaded Photos (raw bytes, decoded by the workers)
+        for file in request.files.getlist('photos'):
             if file and file.filename != '':
-                filepath = os.path.join(app.config['UPLOAD_FOLDER'], file.filename)
-                file.save(filepath)
-                try:
-                    img = face_recognition.load_image_file(filepath)
-                    encs = face_recognition.face_encodings(img)
-                    if len(encs) > 0:
-                        all_encodings.append(encs[0])
-                    os.remove(filepath)
-                except:
-                    pass
-
-        # 2. Process Captured Photos
-        captured_list = request.form.getlist('captured_photos') 
-        if captured_list:
-            for i, item in enumerate(captured_list):
-                try:
-                    if "," in item:
-                        header, encoded = item.split(",", 1)
-                        data = base64.b64decode(encoded)
-                        temp_path = os.path.join(app.config['UPLOAD_FOLDER'], f"capture_{code}_{i}.jpg")
-                        with open(temp_path, "wb") as f:
-                            f.write(data)
-                        
-                        img = face_recognition.load_image_file(temp_path)
-                        encs = face_recognition.face_encodings(img)
-                        if len(encs) > 0:
-                            all_encodings.append(encs[0])
-                        os.remove(temp_path)
-                except Exception as e:
-                    print(f"❌ Error in image {i}: {e}")
+                photos.append(file.read())
+
+        # 2. Captured Photos
+        for i, item in enumerate(request.form.getlist('captured_photos')):
+            try:
+                if "," in item:
+                    photos.append(data_url_bytes(item))
+            except ValueError as e:
+                print(f"❌ Error in image {i}: {e}")
+
+        # 3. Downscale, quality checks and encoding for all photos in parallel;
+        #    outliers are dropped before averaging
+        avg_encoding, used, notes = encode_photos(photos) if photos else (None, 0, [])
+        for note in notes:
+            print(f"⚠️ {note}")
 
         # Save to DB
-        if len(all_encodings) > 0:
-            avg_encoding = np.mean(all_encodings, axis=0)
+        if avg_encoding is not None:
+            if notes:
+                flash(f'ℹ️ Used {used} of {len(photos)} photos ({"; ".join(notes)}).', 'info')
             
             # Pass to CRUD (which now handles Supabase + Duplicate Check)
-            success = add_new_employee(name, code, email, avg_encoding, department)
+            nearest = []
+            success = add_new_employee(name, code, email, avg_encoding, department, matches=nearest)
             
             if success:
                 flash(f'✅ Successfully added {name}.', 'success')
                 return redirect(url_for('employees_list'))
+            elif nearest and nearest[0]['distance'] <= DEFAULT_TOLERANCE:
+                closest = ", ".join(f"{m['name']} (#{m['id']}, distance {m['distance']:.3f})" for m in nearest)
+                flash(f'❌ Face already registered! Closest employees: {closest}. '
+                      f'Faces within {DEFAULT_TOLERANCE} are treated as the same person.', 'danger')
             else:
                 flash('❌ Error: Employee ID already exists OR Face already registered!', 'danger')
         else:
-            flash('⚠️ No face detected! Please ensure face is visible.', 'warning')
+            reasons = f' ({"; ".join(notes)})' if notes else ''
+            flash(f'⚠️ No usable face detected{reasons}! Please ensure face is visible, sharp and looking at the camera.', 'warning')
 
     return render_template('add_employee.html')
 
+@app.route('/bulk_enroll', methods=['GET', 'POST'])
+@login_required
+def bulk_enroll():
+    if request.method == 'POST':
+        archive = request.files.get('archive')
+        manifest = request.files.get('manifest')
+
+        if not archive or archive.filename == '':
+            flash('⚠️ Please choose a ZIP archive.', 'warning')
+            return render_template('bulk_enroll.html', job=None)
+
+        # The encoding workers open the archive themselves, so it needs a path;
+        # a private temp folder, never static/ (staff photos and personal data)
+        upload_dir = tempfile.mkdtemp(prefix="bulk_enroll_")
+        archive.save(os.path.join(upload_dir, ENROLL_ARCHIVE_NAME))
+        if manifest and manifest.filename != '':
+            manifest.save(os.path.join(upload_dir, ENROLL_MANIFEST_NAME))
+
+        # The enrollment runs in the background (the job deletes the folder); the browser polls it
+        job_id = enroll_jobs.submit(upload_dir, request.form.get('dry_run') == '1')
+        if job_id:
+            return redirect(url_for('bulk_enroll_job', job_id=job_id))
+        shutil.rmtree(upload_dir, ignore_errors=True)
+        flash('⏳ Too many enrollments in progress, please try again in a moment.', 'warning')
+
+    return render_template('bulk_enroll.html', job=None)
+
+@app.route('/bulk_enroll/<job_id>')
+@login_required
+def bulk_enroll_job(job_id):
+    job = enroll_jobs.get(job_id)
+    if job is None:
+        flash('⚠️ Enrollment not found (it may have expired).', 'warning')
+        return redirect(url_for('bulk_enroll'))
+    if job['status'] == 'failed':
+        flash(f"❌ Bulk enrollment failed: {job['error']}", 'danger')
+    return render_template('bulk_enroll.html', job=job)
+
+@app.route('/bulk_enroll/<job_id>/status')
+@login_required
+def bulk_enroll_status(job_id):
+    job = enroll_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "not found"}), 404
+    return jsonify({key: job[key] for key in ("id", "status", "stage", "progress", "error")})
+
+@app.route('/bulk_enroll/<job_id>/report.csv')
+@login_required
+def bulk_enroll_report(job_id):
+    job = enroll_jobs.get(job_id)
+    if job is None or job['status'] != 'done':
+        return jsonify({"error": "not found"}), 404
+    return Response(job['result']['report_csv'], mimetype='text/csv',
+                    headers={'Content-Disposition': 'attachment; filename=bulk_enrollment_report.csv'})
+
 @app.route('/edit_employee/<int:id>', methods=['GET', 'POST'])
 @login_required
 def edit_employee(id):
@@ -255,99 +293,89 @@ def delete_employee(id):
 @app.route('/hr_scan', methods=['GET', 'POST'])
 @login_required
 def hr_scan():
-    processed_image_name = None
-    present_names = []
-    present_count = 0
-
     if request.method == 'POST':
-        file = request.files['group_photo']
-        if file:
-            filename = "class_temp.jpg"
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(filepath)
-
-            # Process Image
-            image = face_recognition.load_image_file(filepath)
-            face_locations = face_recognition.face_locations(image)
-            face_encodings = face_recognition.face_encodings(image, face_locations)
-
-            # Get data for comparison
-            all_employees = get_all_employees()
-            known_encodings = [s['encoding'] for s in all_employees]
-            known_names = [s['name'] for s in all_employees]
-            known_ids = [s['id'] for s in all_employees]
-
-            # Prepare OpenCV
-            opencv_image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
-
-            for (top, right, bottom, left), face_encoding in zip(face_locations, face_encodings):
-                matches = face_recognition.compare_faces(known_encodings, face_encoding, tolerance=0.5)
-                name = "Unknown"
-                color = (0, 0, 255)
-
-                face_distances = face_recognition.face_distance(known_encodings, face_encoding)
-                if len(face_distances) > 0:
-                    best_match_index = np.argmin(face_distances)
-                    if matches[best_match_index]:
-                        name = known_names[best_match_index]
-                        student_id = known_ids[best_match_index]
-                        color = (0, 255, 0)
-                        
-                        if mark_attendance(student_id):
-                            print(f"✅ Marked present via Group Scan: {name}")
-                        present_names.append(name)
-
-                cv2.rectangle(opencv_image, (left, top), (right, bottom), color, 2)
-                cv2.putText(opencv_image, name, (left, bottom + 20), cv2.FONT_HERSHEY_DUPLEX, 0.6, (255, 255, 255), 1)
-
-            # Save Result
-            result_filename = f"result_{datetime.datetime.now().strftime('%H%M%S')}.jpg"
-            result_path = os.path.join(PROCESSED_FOLDER, result_filename)
-            cv2.imwrite(result_path, opencv_image)
-            
-            processed_image_name = result_filename
-            present_count = len(present_names)
-            os.remove(filepath)
+        file = request.files.get('group_photo')
+        if file and file.filename != '':
+            # The scan runs in the background; the browser polls the job
+            job_id = scan_jobs.submit(file.read())
+            if job_id:
+                return redirect(url_for('hr_scan_job', job_id=job_id))
+            flash('⏳ Too many scans in progress, please try again in a moment.', 'warning')
+        else:
+            flash('⚠️ Please choose a group photo.', 'warning')
 
-    return render_template('scan_result.html', 
-                           processed_image=processed_image_name, 
-                           present_names=present_names,
-                           present_count=present_count)
+    return render_template('scan_result.html', job=None)
+
+@app.route('/hr_scan/<job_id>')
+@login_required
+def hr_scan_job(job_id):
+    job = scan_jobs.get(job_id)
+    if job is None:
+        flash('⚠️ Scan not found (it may have expired).', 'warning')
+        return redirect(url_for('hr_scan'))
+    if job['status'] == 'failed':
+        flash(f"❌ Scan failed: {job['error']}", 'danger')
+    elif job['status'] == 'done' and not job['result']['attendance_saved']:
+        flash('⚠️ Faces were recognized but attendance could not be saved.', 'warning')
+    return render_template('scan_result.html', job=job)
+
+@app.route('/hr_scan/<job_id>/status')
+@login_required
+def hr_scan_status(job_id):
+    job = scan_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "not found"}), 404
+    return jsonify({key: job[key] for key in ("id", "status", "stage", "progress", "error")})
+
+@app.route('/cache_stats')
+@login_required
+def query_cache_stats():
+    # Hit rate, size and evictions of each query cache in this process
+    return jsonify(cache_stats())
 
 @app.route('/export_attendance')
 @login_required
 def export_attendance():
-    supabase = get_supabase_client()
-    rows = []
-    
-    if supabase:
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        fmt = 'csv'
+    if fmt == 'parquet' and not parquet_available():
+        flash("Parquet export needs pyarrow (pip install pyarrow).", "warning")
+        return redirect(url_for('index'))
+
+    filters = {
+        'date_from': request.args.get('date_from') or None,
+        'date_to': request.args.get('date_to') or None,
+        'department': request.args.get('department', '').strip() or None,
+        'employee_code': request.args.get('code', '').strip() or None,
+    }
+
+    # Fetch the first page up front so connection errors still get a proper page
+    pages = iter_attendance_pages(**filters)
+    try:
+        first = next(pages, None)
+    except Exception as e:
+        flash(f"Error fetching export data: {e}", "danger")
+        return redirect(url_for('index'))
+
+    def all_pages():
+        if first is not None:
+            yield first
+            yield from pages
+
+    def generate():
         try:
-             response = supabase.table("attendance") \
-                .select("*, employees(name, employee_code)") \
-                .order("date", desc=True) \
-                .order("time", desc=True) \
-                .execute()
-             rows = response.data
+            yield from iter_export(fmt, all_pages())
         except Exception as e:
-            flash(f"Error fetching export data: {e}", "danger")
-
-    si = StringIO()
-    cw = csv.writer(si)
-    cw.writerow(['Employee Name', 'ID Code', 'Date', 'Time', 'Status'])
-    
-    for row in rows:
-        emp = row.get('employees') or {}
-        cw.writerow([
-            emp.get('name', 'Unknown'), 
-            emp.get('employee_code', '-'), 
-            row['date'], 
-            row['time'], 
-            row['status']
-        ])
-
-    output = make_response(si.getvalue())
-    output.headers["Content-Disposition"] = "attachment; filename=attendance_report.csv"
-    output.headers["Content-type"] = "text/csv"
+            # Headers are already sent: re-raise so the server drops the
+            # connection mid-transfer and the download visibly fails
+            # instead of ending as a complete-looking, truncated file
+            print(f"❌ Export aborted: {e}")
+            raise
+
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    output = Response(stream_with_context(generate()), mimetype=mimetype)
+    output.headers["Content-Disposition"] = f"attachment; filename=attendance_report.{extension}"
     return output
 
 if __name__ == '__main__':